@@ -0,0 +1,115 @@
+"""
+Registry of the users this process is serving, with idle eviction.
+
+Every user is served by the same Runner; what is per user is the session ID
+their turns are routed to and the caches that hold their data (the session in
+the session service, the Calendar event mirror). A user idle for longer than
+SESSION_IDLE_SECONDS, or the least recently active one once more than
+ACTIVE_USERS_MAX are registered, is dropped and their caches are released, so
+memory follows the number of active users rather than everyone who ever
+logged in.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from calendar_assistant.utils.logs import get_logger
+
+SESSION_IDLE_SECONDS = float(os.environ.get("SESSION_IDLE_SECONDS", 1800))
+ACTIVE_USERS_MAX = int(os.environ.get("ACTIVE_USERS_MAX", 10000))
+
+logger = get_logger(__name__)
+
+
+class ActiveSessions:
+    """
+    LRU/TTL map of user ID -> session ID.
+
+    Args:
+        on_evict: Called as on_evict(user_id, session_id) for every dropped user,
+            outside the registry lock.
+        idle_seconds (float): Inactivity after which a user is dropped.
+        max_users (int): Users kept at most.
+    """
+
+    def __init__(self, on_evict, idle_seconds=SESSION_IDLE_SECONDS, max_users=ACTIVE_USERS_MAX):
+        self._on_evict = on_evict
+        self._idle_seconds = idle_seconds
+        self._max_users = max_users
+        self._users = OrderedDict()  # user_id -> (session_id, last_seen), least recent first
+        self._lock = threading.Lock()
+        self._stats = {"registered": 0, "evicted_idle": 0, "evicted_capacity": 0}
+
+    def _collect(self, now):
+        """Pop the users to evict; the caller runs on_evict after releasing the lock."""
+        evicted = []
+        while self._users:
+            user_id, (session_id, last_seen) = next(iter(self._users.items()))
+            if now - last_seen > self._idle_seconds:
+                self._stats["evicted_idle"] += 1
+            elif len(self._users) > self._max_users:
+                self._stats["evicted_capacity"] += 1
+            else:
+                break
+            del self._users[user_id]
+            evicted.append((user_id, session_id))
+        return evicted
+
+    def _evict(self, evicted):
+        for user_id, session_id in evicted:
+            try:
+                self._on_evict(user_id, session_id)
+            except Exception:
+                logger.exception("Error releasing the session", extra={"fields": {"user_id": user_id}})
+
+    def get(self, user_id: str):
+        """
+        Get the session ID of an active user and mark them as active now.
+
+        Returns:
+            str: The session ID, or None if the user is not registered.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                self._users[user_id] = (entry[0], now)
+                self._users.move_to_end(user_id)
+            evicted = self._collect(now)
+        self._evict(evicted)
+        return entry[0] if entry is not None else None
+
+    def set(self, user_id: str, session_id: str):
+        """Register the session a user's turns are routed to."""
+        now = time.monotonic()
+        with self._lock:
+            previous = self._users.pop(user_id, None)
+            self._users[user_id] = (session_id, now)
+            self._stats["registered"] += 1
+            evicted = self._collect(now)
+        if previous is not None and previous[0] != session_id:
+            evicted.append((user_id, previous[0]))
+        self._evict(evicted)
+
+    def users(self) -> dict:
+        """Snapshot of user ID -> session ID."""
+        with self._lock:
+            return {user_id: session_id for user_id, (session_id, _) in self._users.items()}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._users)
+
+    def stats(self) -> dict:
+        """
+        Get registry counters.
+
+        Returns:
+            dict: active_users, registered, evicted_idle and evicted_capacity.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["active_users"] = len(self._users)
+        return stats
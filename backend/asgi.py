@@ -0,0 +1,140 @@
+"""
+ASGI entry point for the backend.
+
+Run it with:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8080
+
+The chat endpoints (POST / and its server-sent events variant POST /stream)
+are served natively as coroutines on the server's event loop, so a turn
+waiting on the LLM or on tools does not hold a worker thread and many users'
+turns interleave on one process. Every other route is
+delegated to the Flask app, whose handlers submit their coroutines to the same
+loop through ``event_loop.run_coroutine``.
+
+Importing the backend (main.py: the ADK, the agents, googleapiclient) takes
+seconds, so this module does not: GET /health is answered right away, and
+main.py is imported in a thread when the server starts. Other requests wait
+for it; /health reports "ready" once it is loaded.
+"""
+
+import asyncio
+import importlib
+import json
+import time
+
+import event_loop
+
+_backend = None  # future of the loaded main module
+_flask_asgi = None
+
+
+def _import_backend():
+    global _flask_asgi
+    from asgiref.wsgi import WsgiToAsgi
+
+    backend = importlib.import_module("main")
+    _flask_asgi = WsgiToAsgi(backend.app)
+    return backend
+
+
+def _load_backend() -> asyncio.Future:
+    """Start importing main.py in a thread, once; the future resolves to the module."""
+    global _backend
+    if _backend is None:
+        _backend = asyncio.get_running_loop().run_in_executor(None, _import_backend)
+    return _backend
+
+
+async def _read_json(receive) -> dict:
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def _send_json(send, payload, status: int):
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            # Same policy flask-cors applies to the Flask routes
+            (b"access-control-allow-origin", b"*"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_stream(send, updates, backend):
+    """
+    Send chat updates as server-sent events, flushing each one as it comes.
+
+    Returns:
+        int: The response status code.
+    """
+    try:
+        first = await anext(updates)
+        if first["type"] == "error":
+            await _send_json(send, {"error": first["error"]}, first["status"])
+            return first["status"]
+        headers = [(b"content-type", b"text/event-stream"), (b"access-control-allow-origin", b"*")]
+        headers += [(k.lower().encode("ascii"), v.encode("ascii")) for k, v in backend.SSE_HEADERS.items()]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": backend.format_sse(first), "more_body": True})
+        async for update in updates:
+            await send({"type": "http.response.body", "body": backend.format_sse(update), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+        return 200
+    finally:
+        await updates.aclose()
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Share the server's loop with the Flask routes running in threads
+            event_loop.set_loop(asyncio.get_running_loop())
+            _load_backend()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+
+    loading = _load_backend()
+    if scope["type"] == "http" and scope["method"] == "GET" and scope["path"] == "/health":
+        await _send_json(send, {"status": "ok", "ready": loading.done() and loading.exception() is None}, 200)
+        return
+    backend = await loading
+
+    if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == "/":
+        started = time.perf_counter()
+        data = await _read_json(receive)
+        payload, status = await backend.handle_chat(data)
+        await _send_json(send, payload, status)
+        backend.metrics.observe_request("/", "POST", status, time.perf_counter() - started)
+        return
+
+    if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == "/stream":
+        started = time.perf_counter()
+        status = await _send_stream(send, backend.stream_chat(await _read_json(receive)), backend)
+        backend.metrics.observe_request("/stream", "POST", status, time.perf_counter() - started)
+        return
+
+    await _flask_asgi(scope, receive, send)
@@ -0,0 +1,190 @@
+"""
+The backend end to end, offline: /login, / and /get_next_events for N users.
+
+Everything outside the process is replaced by an in-process stand-in with an
+injected latency:
+
+- Google Calendar: ``FakeCalendar``, an HTTP server on localhost reached
+  through CALENDAR_API_ROOT, so googleapiclient, the service pool and the
+  event mirror run as in production,
+- Firestore: ``FakeFirestore``, installed with ``firebase_config.set_db``,
+- the agents' LiteLlm: ``StubAgentModel``, whose turns call list_events or
+  create_event and then answer (create_recurrent_events is left out: its
+  research step runs a smolagents agent against Google search),
+- the helpers' ChatOpenAI: ``StubChatModel``.
+
+Each simulated user logs in, then runs --turns chat turns, each followed by a
+/get_next_events, through Flask's test client from --workers threads, after
+one warm-up user whose requests are not counted. The
+report gives throughput and p50/p99 latency per route, and where a chat turn's
+time goes according to its trace (see /traces/<trace_id>): the agent LLM,
+tools (with their Calendar requests and helper LLM calls) and the rest, which
+is the backend's own work. With the default zero latencies every number is
+backend overhead, which is what regressions in the pure-Python paths move.
+
+Run from the backend directory (logs go to stderr):
+
+    python -m benchmarks.bench_backend --users 50 --turns 3 --workers 8 2>/dev/null
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import firebase_config
+from benchmarks.fake_calendar import FakeCalendar
+from benchmarks.fake_firestore import FakeFirestore
+
+MESSAGES = [
+    "What do I have this week?",
+    "Create 10K race on {date} at 08:00",
+    "Anything planned for the next days?",
+]
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def _install(args, tmp):
+    """Point the backend at the stand-ins; must run before main is imported."""
+    calendar = FakeCalendar(latency=args.calendar_latency).start()
+    os.environ["CALENDAR_API_ROOT"] = calendar.root_url
+    os.environ["CACHE_DB_PATH"] = os.path.join(tmp, "cache.db")
+    os.environ["SESSION_DB_PATH"] = os.path.join(tmp, "sessions.db")
+    os.environ["TRACE_KEEP"] = str(max(500, args.users * args.turns * 4))
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    db = FakeFirestore(latency=args.firestore_latency)
+    firebase_config.set_db(db)
+
+    now = datetime.now(timezone.utc)
+    for day in range(1, 8):
+        calendar.add_event(f"Easy run {day}", now + timedelta(days=day))
+    for user in range(args.users + 1):  # the last one warms up
+        db.collection("users").document(f"user{user}").set({
+            "accessToken": f"token-{user}",
+            "general_questions": {"level": "intermediate", "availability": "mornings"},
+        })
+    return calendar, db
+
+
+def _turn_components(waterfall) -> dict:
+    """Milliseconds of a turn per component, from its waterfall."""
+    by_name = waterfall["by_name"]
+
+    def total(prefix):
+        return sum(t["total_ms"] for name, t in by_name.items() if name.startswith(prefix))
+
+    components = {
+        "agent LLM": total("call_llm"),
+        "tools": total("execute_tool"),
+        "  Calendar requests": total("calendar."),
+        "  helper LLM": total("llm."),
+    }
+    components["backend (the rest)"] = waterfall["duration_ms"] - components["agent LLM"] - components["tools"]
+    return components
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="simulated users")
+    parser.add_argument("--turns", type=int, default=3, help="chat turns per user")
+    parser.add_argument("--workers", type=int, default=8, help="client threads")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per agent or helper LLM call")
+    parser.add_argument("--calendar-latency", type=float, default=0.0, help="seconds per Calendar HTTP request")
+    parser.add_argument("--firestore-latency", type=float, default=0.0, help="seconds per Firestore round-trip")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        calendar, db = _install(args, tmp)
+        from benchmarks.stub_llm import StubAgentModel, StubChatModel
+        from calendar_assistant.utils import llm, tracing
+        import main as backend
+
+        agent_model = StubAgentModel(latency=args.llm_latency)
+        backend.calendar_assistant.model = agent_model
+        for agent in backend.calendar_assistant.sub_agents:
+            agent.model = agent_model
+        llm.set_chat_model(StubChatModel(latency=args.llm_latency))
+
+        latencies = defaultdict(list)
+        trace_ids = []
+        failures = defaultdict(int)
+        local = threading.local()
+        lock = threading.Lock()
+        race_day = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+
+        def request(route, call, *call_args, **kwargs):
+            started = time.perf_counter()
+            response = call(*call_args, **kwargs)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[route].append(elapsed)
+                if response.status_code >= 500 or (route != "/get_next_events" and response.status_code != 200):
+                    failures[route] += 1
+            return response
+
+        def user(n):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = backend.app.test_client()
+            user_id = f"user{n}"
+            request("/login", client.post, "/login", json={"user_id": user_id})
+            for turn in range(args.turns):
+                message = MESSAGES[(n + turn) % len(MESSAGES)].format(date=race_day)
+                response = request("/", client.post, "/", json={"user_id": user_id, "message": message})
+                trace_id = (response.get_json() or {}).get("trace_id")
+                if trace_id:
+                    with lock:
+                        trace_ids.append(trace_id)
+                request("/get_next_events", client.get, "/get_next_events", query_string={"user_id": user_id})
+
+        user(args.users)
+        latencies.clear()
+        trace_ids.clear()
+        failures.clear()
+        calendar.reset_counters()
+        db.reset_stats()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(user, range(args.users)))
+        wall = time.perf_counter() - started
+        # Write the sessions out while the temporary directory still exists
+        if hasattr(backend.session_service, "flush_now"):
+            backend.session_service.flush_now()
+        calendar.stop()
+
+        requests = sum(len(v) for v in latencies.values())
+        print(f"{args.users} users x {args.turns} turns, {args.workers} workers; latency: LLM {args.llm_latency}s, "
+              f"Calendar {args.calendar_latency}s, Firestore {args.firestore_latency}s")
+        print(f"  {requests} requests in {wall:.2f}s: {requests / wall:.1f} requests/s, "
+              f"{len(latencies['/']) / wall:.1f} turns/s")
+        for route, values in latencies.items():
+            print(f"  {route:<18} {len(values):5d} requests  p50 {_percentile(values, 0.5) * 1000:8.1f} ms  "
+                  f"p99 {_percentile(values, 0.99) * 1000:8.1f} ms  failures {failures[route]}")
+
+        components = defaultdict(float)
+        traced = 0
+        for trace_id in trace_ids:
+            waterfall = tracing.get_waterfall(trace_id)
+            if waterfall is None:
+                continue
+            traced += 1
+            for name, ms in _turn_components(waterfall).items():
+                components[name] += ms
+        if traced:
+            print(f"  chat turn time per component ({traced} traced turns, mean):")
+            for name, ms in components.items():
+                print(f"    {name:<22} {ms / traced:8.2f} ms")
+        print(f"  Calendar: {calendar.round_trips} HTTP requests, {calendar.calls} API calls; "
+              f"Firestore: {db.stats['reads']} reads, {db.stats['writes']} writes, {db.stats['batches']} batches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+clean_user_events round-trips: serial gets vs the current reconciliation.
+
+Seeds the fake Calendar server with training plans (one parent event plus seven
+weekly recurring sessions each), cancels a few instances and removes one parent,
+then reconciles the same user_events with the old serial algorithm and with
+``clean_user_events`` (event mirror plus batched lookups and deletes). Both see
+the same injected latency per HTTP round-trip.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_clean_user_events --plans 1 --weeks 12 --latency 0.03
+"""
+
+import argparse
+import copy
+import os
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.fake_calendar import FakeCalendar
+
+
+def _seed(fake, plans, weeks):
+    user_events = []
+    today = datetime.now().replace(hour=7, minute=0, second=0, microsecond=0)
+    start = today + timedelta(days=(6 - today.weekday()) % 7)  # next Sunday
+    until = (start + timedelta(weeks=weeks) - timedelta(days=1)).strftime("%Y%m%dT050000Z")
+    for plan in range(plans):
+        parent = fake.add_event(f"10K race #{plan}", start + timedelta(weeks=weeks))
+        instances = []
+        for day in range(7):
+            series = fake.add_event(f"Training day {day}", start + timedelta(days=day),
+                                    recurrence=[f"RRULE:FREQ=WEEKLY;UNTIL={until}"])
+            instances += fake.instance_ids(series["id"])
+        user_events.append({"alias": parent["summary"], "parent_event_id": parent["id"], "instances": instances})
+
+    # Drift since the last turn: a few sessions cancelled, one whole plan removed
+    for instance_id in user_events[0]["instances"][::10]:
+        fake.cancel(instance_id)
+    if plans > 1:
+        fake.cancel(user_events[-1]["parent_event_id"])
+    return user_events
+
+
+def _serial_clean(user_events, token):
+    """The reconciliation loop as it was before batching (one call per event)."""
+    from calendar_assistant.utils.calendar_utils import get_calendar_service
+
+    service = get_calendar_service(token)
+    cleaned = []
+    for event in user_events:
+        parent_id = event.get("parent_event_id")
+        instances = event.get("instances", [])
+        try:
+            parent = service.events().get(calendarId="primary", eventId=parent_id).execute()
+            if parent.get("status") == "cancelled":
+                service.events().delete(calendarId="primary", eventId=parent_id).execute()
+                raise Exception("Parent event is cancelled")
+            valid = []
+            for instance_id in instances:
+                try:
+                    inst = service.events().get(calendarId="primary", eventId=instance_id).execute()
+                    if inst.get("status") != "cancelled":
+                        valid.append(instance_id)
+                except Exception:
+                    continue
+            event["instances"] = valid
+            cleaned.append(event)
+        except Exception:
+            for instance_id in instances:
+                try:
+                    service.events().delete(calendarId="primary", eventId=instance_id).execute()
+                except Exception:
+                    continue
+    return cleaned
+
+
+def _run(fake, name, fn, user_events):
+    fake.reset_counters()
+    start = time.perf_counter()
+    cleaned = fn(copy.deepcopy(user_events), "bench-token")
+    elapsed = time.perf_counter() - start
+    kept = sum(len(e["instances"]) for e in cleaned)
+    print(f"  {name:<10} {fake.round_trips:4d} round-trips {fake.calls:5d} calls {elapsed:7.3f}s"
+          f"  -> {len(cleaned)} plans, {kept} instances kept")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=1, help="training plans tracked in user_events")
+    parser.add_argument("--weeks", type=int, default=12, help="weeks per plan")
+    parser.add_argument("--latency", type=float, default=0.03, help="seconds per HTTP round-trip")
+    args = parser.parse_args()
+
+    fake = FakeCalendar(latency=args.latency).start()
+    os.environ["CALENDAR_API_ROOT"] = fake.root_url
+    from calendar_assistant.utils.clean_user_events import clean_user_events
+
+    try:
+        user_events = _seed(fake, args.plans, args.weeks)
+        total = sum(len(e["instances"]) + 1 for e in user_events)
+        print(f"{args.plans} plan(s), {total} tracked events, {args.latency * 1000:.0f} ms per round-trip")
+        snapshot = copy.deepcopy(fake.events)
+        _run(fake, "serial", _serial_clean, user_events)
+        fake.events = snapshot
+        _run(fake, "current", clean_user_events, user_events)
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
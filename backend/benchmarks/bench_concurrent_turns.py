@@ -0,0 +1,159 @@
+"""
+Concurrent chat-turn throughput: asyncio.run per request vs one shared loop.
+
+Every turn is a real one: ``stream_agent_async`` runs the calendar_assistant
+agents, whose model (``StubAgentModel``) asks for list_events or create_event,
+and the tool talks to Google Calendar (``FakeCalendar``) through
+googleapiclient, a blocking call of --calendar-latency seconds. Those blocking
+tools are what a shared loop has to keep off itself: while one runs on the
+loop, every other turn on it waits.
+
+Modes:
+- before: W worker threads, each request runs its turn with ``asyncio.run``
+  (the old ``chatbot()``).
+- flask:  W worker threads submitting to the shared loop with
+  ``event_loop.run_coroutine`` (``python main.py``).
+- asgi:   every turn is a task on one loop (``uvicorn asgi:app``). A probe
+  task on the same loop measures how late a 10 ms timer fires, which is how
+  late /health or a streamed status event would be.
+
+The p50 of a lone turn is printed first: with tools on their threads, the
+shared loop modes should stay close to it. Run from the backend directory:
+
+    python -m benchmarks.bench_concurrent_turns --users 16 --calendar-latency 0.2 2>/dev/null
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from benchmarks.fake_calendar import FakeCalendar
+
+APP_NAME = "bench"
+MESSAGES = ["What do I have this week?", "Create Tempo run on {date} at 07:00"]
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+class _Bench:
+    """The agents on a stub model, with a session per simulated user."""
+
+    def __init__(self, args):
+        from google.adk.runners import Runner
+        from google.adk.sessions import InMemorySessionService
+
+        from benchmarks.stub_llm import StubAgentModel
+        from calendar_assistant.agent import calendar_assistant
+
+        model = StubAgentModel(latency=args.llm_latency)
+        calendar_assistant.model = model
+        for agent in calendar_assistant.sub_agents:
+            agent.model = model
+        self.runner = Runner(agent=calendar_assistant, app_name=APP_NAME, session_service=InMemorySessionService())
+        self.date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+        self.sessions = {}
+        self.unanswered = 0
+
+    async def create_sessions(self, users):
+        for n in range(users):
+            user_id = f"user{n}"
+            session = await self.runner.session_service.create_session(app_name=APP_NAME, user_id=user_id, state={
+                "user_id": user_id, "access_token": f"token-{n}", "interaction_history": [],
+                "user_events": [], "event_index": {}, "profile_data": {}, "timezone": "America/Mexico_City",
+                "today_date": datetime.now().strftime("%Y-%m-%d %H:%M"), "user_input": "",
+            })
+            self.sessions[n] = session.id
+
+    async def turn(self, n) -> float:
+        from utils import stream_agent_async
+
+        started = time.perf_counter()
+        message = MESSAGES[n % len(MESSAGES)].format(date=self.date)
+        async for update in stream_agent_async(self.runner, f"user{n}", self.sessions[n], message, stream_text=False):
+            if update["type"] == "final" and not update["response"]:
+                self.unanswered += 1
+        return time.perf_counter() - started
+
+
+def _run_threaded(bench, args, submit, warm_up=False):
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        if warm_up:
+            list(pool.map(lambda n: submit(bench.turn(n)), range(args.users)))
+        started = time.perf_counter()
+        latencies = list(pool.map(lambda n: submit(bench.turn(n)), range(args.users)))
+    return time.perf_counter() - started, latencies, None
+
+
+def _run_asgi(bench, args):
+    async def main():
+        # A server's loop is long-lived: start its tool threads before measuring
+        await asyncio.gather(*[bench.turn(n) for n in range(args.users)])
+        lag = 0.0
+        stop = asyncio.Event()
+
+        async def probe():
+            nonlocal lag
+            while not stop.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lag = max(lag, time.perf_counter() - started - 0.01)
+
+        probing = asyncio.create_task(probe())
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*[bench.turn(n) for n in range(args.users)])
+        wall = time.perf_counter() - started
+        stop.set()
+        await probing
+        return wall, latencies, lag
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=16, help="concurrent turns to serve")
+    parser.add_argument("--workers", type=int, default=8, help="WSGI worker threads")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per agent LLM call")
+    parser.add_argument("--calendar-latency", type=float, default=0.2, help="seconds per Calendar HTTP request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        calendar = FakeCalendar(latency=args.calendar_latency).start()
+        os.environ["CALENDAR_API_ROOT"] = calendar.root_url
+        os.environ["CACHE_DB_PATH"] = os.path.join(tmp, "cache.db")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        import event_loop
+
+        bench = _Bench(args)
+        asyncio.run(bench.create_sessions(args.users))
+        lone = [asyncio.run(bench.turn(n)) for n in range(min(args.users, 3))]
+
+        results = {
+            "before (asyncio.run per request)": _run_threaded(bench, args, asyncio.run),
+            "flask (shared loop)": _run_threaded(bench, args, event_loop.run_coroutine, warm_up=True),
+            "asgi (native coroutine)": _run_asgi(bench, args),
+        }
+        calendar.stop()
+        if bench.unanswered:
+            print(f"warning: {bench.unanswered} turns ended without an answer (see the logs)")
+
+    print(f"{args.users} turns, {args.workers} workers, {args.llm_latency}s per LLM call, "
+          f"{args.calendar_latency}s per Calendar request")
+    print(f"  lone turn p50 {_percentile(lone, 0.5) * 1000:8.1f} ms")
+    for name, (wall, latencies, lag) in results.items():
+        line = (f"  {name:<34} {wall:7.2f}s  {args.users / wall:7.1f} turns/s  "
+                f"p50 {_percentile(latencies, 0.5) * 1000:8.1f} ms  p99 {_percentile(latencies, 0.99) * 1000:8.1f} ms")
+        if lag is not None:
+            line += f"  loop lag max {lag * 1000:6.1f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Event classification: scanning user_events vs the event index.
+
+Builds a user_events list of ``--parents`` training plans with
+``--instances`` instances each and times, before (the scans the tools did)
+and with ``event_index``:
+
+- check_type_of_event for random known and unknown IDs,
+- the classification list_events runs for a page of 100 listed events,
+- index maintenance: replacing a plan's instances and deleting one instance.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_event_index --parents 40 --instances 84
+"""
+
+import argparse
+import random
+import time
+
+from calendar_assistant.utils import event_index
+
+
+def _user_events(parents, instances):
+    return [
+        {"alias": f"plan {p}", "parent_event_id": f"p{p}", "instances": [f"p{p}_i{i}" for i in range(instances)]}
+        for p in range(parents)
+    ]
+
+
+def _scan_type(user_events, event_id):
+    """The lookup check_type_of_event and list_events did before the index."""
+    for event in user_events:
+        if event_id == event.get("parent_event_id"):
+            return "parent_event" if event.get("instances") else "single_event"
+        for instance in event.get("instances", []):
+            if event_id == instance:
+                return "recurrent_event"
+    return "single_event"
+
+
+def _index_type(state, event_id):
+    entry = event_index.lookup_event(state, event_id)
+    return entry["type"] if entry else "single_event"
+
+
+def _time(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parents", type=int, default=40, help="training plans")
+    parser.add_argument("--instances", type=int, default=84, help="instances per plan")
+    parser.add_argument("--repeat", type=int, default=200, help="repetitions per measurement")
+    args = parser.parse_args()
+
+    user_events = _user_events(args.parents, args.instances)
+    all_ids = [e["parent_event_id"] for e in user_events] + [i for e in user_events for i in e["instances"]]
+    rng = random.Random(0)
+    lookups = [rng.choice(all_ids) if n % 4 else f"external{n}" for n in range(100)]
+    print(f"{args.parents} plans, {len(all_ids) - args.parents} instances")
+
+    started = time.perf_counter()
+    state = {"user_events": user_events}
+    event_index.get_event_index(state)
+    print(f"  build index once:            {(time.perf_counter() - started) * 1e3:9.2f} ms")
+
+    assert [_scan_type(user_events, i) for i in lookups] == [_index_type(state, i) for i in lookups]
+    scan = _time(lambda: _scan_type(user_events, lookups[0]), args.repeat)
+    indexed = _time(lambda: _index_type(state, lookups[0]), args.repeat)
+    print(f"  check_type_of_event:         {scan:9.1f} us scan, {indexed:7.2f} us index")
+    scan = _time(lambda: [_scan_type(user_events, i) for i in lookups], args.repeat)
+    indexed = _time(lambda: [_index_type(state, i) for i in lookups], args.repeat)
+    print(f"  list_events, 100 events:     {scan:9.1f} us scan, {indexed:7.2f} us index")
+
+    plan = user_events[-1]
+    new_instances = [f"{i}_v2" for i in plan["instances"]]
+    replace = _time(lambda: event_index.index_parent(
+        state, plan["parent_event_id"], plan["alias"], plan["instances"], previous_instances=new_instances,
+    ), args.repeat)
+    delete = _time(lambda: (
+        event_index.unindex_instance(state, plan["instances"][0]),
+        event_index.index_parent(state, plan["parent_event_id"], plan["alias"], plan["instances"]),
+    ), args.repeat)
+    print(f"  replace a plan's instances:  {replace:9.1f} us")
+    print(f"  delete + re-add an instance: {delete:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
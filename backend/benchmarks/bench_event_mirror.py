@@ -0,0 +1,68 @@
+"""
+Event mirror against the fake Calendar server: deltas fetched per read.
+
+Seeds a month of events, then reads the next 30 days the way /get_next_events
+and list_events do, across a full sync, a no-change read, a read after a few
+edits, and a read after the server expired the sync token (410 Gone). Each
+read is checked against a direct events().list call on the same server.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_event_mirror --events 300
+"""
+
+import argparse
+import os
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.fake_calendar import FakeCalendar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=300, help="events seeded over the next 30 days")
+    args = parser.parse_args()
+
+    fake = FakeCalendar().start()
+    os.environ["CALENDAR_API_ROOT"] = fake.root_url
+    from calendar_assistant.utils.calendar_utils import get_calendar_service
+    from calendar_assistant.utils.event_mirror import get_event_mirror
+
+    try:
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        for i in range(args.events):
+            fake.add_event(f"Event {i}", now + timedelta(hours=1 + i * 30 * 24 / args.events))
+        service = get_calendar_service("bench-token")
+
+        def read(label):
+            fake.reset_counters()
+            mirror = get_event_mirror("bench-user", service)
+            changes = mirror.stats["changes"]
+            got = [e["id"] for e in mirror.query(now, now + timedelta(days=30), 2500)]
+            sync_calls = fake.calls
+            direct = service.events().list(
+                calendarId="primary", timeMin=now.isoformat(), timeMax=(now + timedelta(days=30)).isoformat(),
+                maxResults=2500, singleEvents=True, orderBy="startTime",
+            ).execute()
+            expected = [e["id"] for e in direct.get("items", [])]
+            read.last_changes, previous = changes, getattr(read, "last_changes", 0)
+            print(f"  {label:<24} {sync_calls:2d} calls, {changes - previous:4d} events transferred, "
+                  f"{len(got)} listed, {'matches' if got == expected else 'MISMATCH with'} events().list")
+
+        print(f"{args.events} events in the next 30 days")
+        read("first read (full sync)")
+        read("unchanged")
+        created = fake.add_event("New session", now + timedelta(days=2))
+        fake.cancel(created["id"])
+        fake.add_event("Another session", now + timedelta(days=3))
+        service.events().delete(calendarId="primary", eventId="ev000001").execute()
+        read("after 3 changes")
+        fake.expire_sync_tokens()
+        read("after 410 (resync)")
+        print(f"  mirror stats: {get_event_mirror('bench-user', service).stats}")
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+History tokens per turn in the agents' instructions: raw list vs compacted.
+
+Replays a conversation of realistic turns (a user message and an agent answer
+of typical length) and, at every turn, compares the tokens the history took
+when the raw interaction_history list was inlined with what
+``compact_history`` renders under each agent's budget. Every LLM call of the
+turn (tool steps included) pays this cost again.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_history_tokens --turns 40 --llm-calls 3
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+from calendar_assistant.utils.history import compact_history, count_tokens
+
+QUERIES = [
+    "I have a 10K race on August 17, can you create it in my calendar?",
+    "Yes, please create a preparation plan starting next Monday.",
+    "What do I have scheduled for this week?",
+    "Move Thursday's session to Friday at 7am.",
+    "Can you make the long run on Sunday a bit shorter?",
+]
+ANSWER = (
+    "Done! I created your event and a weekly training plan: easy runs on Monday and Wednesday, "
+    "intervals on Tuesday, a tempo run on Thursday, rest on Friday and a long run on Sunday. "
+    "Let me know if you want to move any of the sessions. "
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40, help="conversation turns")
+    parser.add_argument("--llm-calls", type=int, default=3, help="LLM calls per turn (tool steps)")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[1500, 1000], help="history token budgets")
+    args = parser.parse_args()
+
+    history, start = [], datetime(2025, 6, 1, 9, 0)
+    print(f"{'turn':>4} {'raw':>7} " + " ".join(f"{f'budget {b}':>12}" for b in args.budgets))
+    totals = [0] * (len(args.budgets) + 1)
+    for turn in range(args.turns):
+        now = start + timedelta(minutes=turn * 3)
+        history.append({"action": "user_query", "query": QUERIES[turn % len(QUERIES)],
+                        "timestamp": now.strftime("%Y-%m-%d %H:%M:%S")})
+        counts = [count_tokens(str(history[-50:]))]
+        counts += [count_tokens(compact_history(history[-50:], budget)) for budget in args.budgets]
+        totals = [t + c * args.llm_calls for t, c in zip(totals, counts)]
+        if turn % 5 == 4 or turn == args.turns - 1:
+            print(f"{turn + 1:>4} {counts[0]:>7} " + " ".join(f"{c:>12}" for c in counts[1:]))
+        history.append({"action": "agent_response", "agent": "calendar_assistant",
+                        "response": ANSWER * (1 + turn % 3),
+                        "timestamp": (now + timedelta(seconds=20)).strftime("%Y-%m-%d %H:%M:%S")})
+    print(f"history tokens over {args.turns} turns x {args.llm_calls} LLM calls: raw {totals[0]}, "
+          + ", ".join(f"budget {b}: {t}" for b, t in zip(args.budgets, totals[1:])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Helper LLM calls with the prompt-hash response cache.
+
+Users plan weeks for a handful of event types: every plan calls
+``get_week_events`` and, for a day that fails validation, ``get_day_event``
+(both re-run on retries and by adjust_planning). Users with the same event
+type, availability and dates send identical prompts. The stub model answers
+after ``--latency`` seconds, like an LLM round-trip.
+
+Reports LLM calls and time per helper call for a cold cache, a warm memory
+cache and a warm disk cache (a new process reading the SQLite cache).
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_llm_cache --users 200 --plans 10 --latency 0.2
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def _requests(args):
+    sunday = datetime(2025, 6, 1)
+    for user in range(args.users):
+        plan = user % args.plans
+        yield (
+            sunday + timedelta(weeks=plan % 4), f"{6 + plan % 3}-{8 + plan % 3}",
+            f"Weekly plan #{plan}: easy runs, intervals, tempo and a long run.", "20250817",
+        )
+
+
+def _run(name, args, helpers, model):
+    calls_before = model.calls
+    started = time.perf_counter()
+    for sunday, availability, plan, until in _requests(args):
+        helpers.get_week_events(sunday, availability, plan, until, "Europe/Madrid")
+        helpers.get_day_event("monday", sunday + timedelta(days=1), availability, plan, until, "Europe/Madrid")
+    elapsed = time.perf_counter() - started
+    calls = model.calls - calls_before
+    per_call = elapsed / (2 * args.users) * 1000
+    print(f"  {name:<10} {2 * args.users:5d} helper calls, {calls:5d} LLM calls, "
+          f"{elapsed:7.2f} s total, {per_call:8.3f} ms per helper call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="users planning a week")
+    parser.add_argument("--plans", type=int, default=10, help="distinct event types / plans")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per LLM call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CACHE_DB_PATH"] = os.path.join(tmp, "cache.db")
+        from benchmarks.stub_llm import StubChatModel
+        from calendar_assistant.utils import helpers, llm
+
+        model = StubChatModel(latency=args.latency)
+        llm.set_chat_model(model)
+        _run("cold", args, helpers, model)
+        _run("warm", args, helpers, model)
+        llm._response_cache._memory.clear()  # as a new process would start
+        _run("disk", args, helpers, model)
+        print(f"  stats: {llm.get_llm_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Per-turn cost of the session state dumps: print vs structured logging.
+
+Every turn used to fetch the session twice and print every history entry and
+every other state key (user_events and the access token included) to stdout.
+This replays those dumps for a session with a realistic state and compares:
+
+- before: the old print-based dump, with stdout sent to a file,
+- current at INFO: ``log_session_state`` with DEBUG off (the default),
+- current at DEBUG for a sampled user: the record is queued and written by
+  the logging thread.
+
+Run from the backend directory (the DEBUG records go to stderr):
+
+    python -m benchmarks.bench_logging --turns 200 2>/dev/null
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import tempfile
+import time
+
+from google.adk.sessions import InMemorySessionService
+
+from calendar_assistant.utils.logs import ROOT_LOGGER, LOG_DEBUG_USERS
+from utils import log_session_state
+
+APP_NAME = "bench"
+
+
+def _state(user_id):
+    return {
+        "user_id": user_id,
+        "access_token": "ya29.secret-token",
+        "profile_data": {"level": "intermediate", "availability": "mornings " * 20},
+        "user_events": [{
+            "alias": f"plan {p}", "parent_event_id": f"{user_id}-p{p}",
+            "instances": [f"{user_id}-p{p}-ev{i}" for i in range(84)],
+        } for p in range(5)],
+        "interaction_history": [
+            {"action": "user_query", "query": "q " * 30, "timestamp": "2025-06-01 10:00:00"} for _ in range(50)
+        ],
+    }
+
+
+async def _print_state(service, user_id, session_id, label):
+    """The dump every turn did twice before."""
+    session = await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    print(f"\n{'-' * 10} {label} {'-' * 10}")
+    for idx, interaction in enumerate(session.state.get("interaction_history", []), 1):
+        print(f'  {idx}. User query at {interaction["timestamp"]}: "{interaction["query"]}"')
+    for key in session.state:
+        if key != "interaction_history":
+            print(f"  {key}: {session.state[key]}")
+
+
+async def _time(name, args, service, user_id, session_id):
+    started = time.perf_counter()
+    for _ in range(args.turns):
+        await log_session_state(service, APP_NAME, user_id, session_id, "State BEFORE processing")
+        await log_session_state(service, APP_NAME, user_id, session_id, "State AFTER processing")
+    per_turn = (time.perf_counter() - started) / args.turns * 1000
+    print(f"  {name:<24} {per_turn:8.3f} ms per turn")
+
+
+async def _main(args):
+    service = InMemorySessionService()
+    session = await service.create_session(app_name=APP_NAME, user_id="u1", state=_state("u1"))
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "stdout.log"), "w") as out, contextlib.redirect_stdout(out):
+            started = time.perf_counter()
+            for _ in range(args.turns):
+                await _print_state(service, "u1", session.id, "State BEFORE processing")
+                await _print_state(service, "u1", session.id, "State AFTER processing")
+            before = (time.perf_counter() - started) / args.turns * 1000
+            size = out.tell()
+        print(f"  {'before (print)':<24} {before:8.3f} ms per turn, {size / args.turns / 1024:.1f} KiB stdout per turn")
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(logging.INFO)
+    await _time("current, INFO", args, service, "u1", session.id)
+    root.setLevel(logging.DEBUG)
+    LOG_DEBUG_USERS.add("u1")
+    await _time("current, DEBUG sampled", args, service, "u1", session.id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200, help="turns to replay")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Memory held per logged-in user: one Runner per login vs the shared runner.
+
+Users log in in waves; only the latest wave keeps chatting. Each login
+creates a session with a realistic state (profile, a tracked training plan,
+a full interaction history).
+
+- before: a new Runner per login kept in user_runners forever, sessions in
+  InMemorySessionService.
+- current: one shared Runner, ActiveSessions evicting idle users, sessions in
+  PersistentSessionService (SQLite).
+
+Traced Python memory is reported after every wave; with eviction it should
+stay flat once the active population is stable.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_memory --waves 5 --users 500
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from active_sessions import ActiveSessions
+from session_store import PersistentSessionService, SqliteSessionStore
+
+APP_NAME = "bench"
+_agent = Agent(name="bench_agent", model="gemini-2.0-flash", instruction="Say hi.")
+
+
+def _state(user_id):
+    return {
+        "user_id": user_id,
+        "profile_data": {"level": "intermediate", "availability": "mornings " * 20},
+        "user_events": [{
+            "alias": "10K race", "parent_event_id": f"{user_id}-race",
+            "instances": [f"{user_id}-ev{i}" for i in range(84)],
+        }],
+        "interaction_history": [
+            {"action": "user_query", "query": "q " * 30, "timestamp": "2025-06-01 10:00:00"} for _ in range(50)
+        ],
+    }
+
+
+async def _before(args):
+    service = InMemorySessionService()
+    user_runners, user_session_ids = {}, {}
+    for wave in range(args.waves):
+        for i in range(args.users):
+            user_id = f"w{wave}-u{i}"
+            session = await service.create_session(app_name=APP_NAME, user_id=user_id, state=_state(user_id))
+            user_runners[user_id] = Runner(agent=_agent, app_name=APP_NAME, session_service=service)
+            user_session_ids[user_id] = session.id
+        _report("before", wave, len(user_runners))
+
+
+async def _current(args, path):
+    service = PersistentSessionService(SqliteSessionStore(path), flush_interval=0.1)
+    Runner(agent=_agent, app_name=APP_NAME, session_service=service)
+    active = ActiveSessions(
+        lambda user_id, session_id: service.forget(APP_NAME, user_id, session_id),
+        idle_seconds=args.idle_seconds,
+    )
+    for wave in range(args.waves):
+        time.sleep(args.idle_seconds)  # the previous waves go idle
+        for i in range(args.users):
+            user_id = f"w{wave}-u{i}"
+            session = await service.create_session(app_name=APP_NAME, user_id=user_id, state=_state(user_id))
+            active.set(user_id, session.id)
+        await service.flush()
+        _report("current", wave, len(active))
+    await service.flush()
+
+
+def _report(name, wave, users):
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    print(f"  {name:<8} after wave {wave + 1}: {users:5d} registered users, {current / 2**20:7.1f} MiB traced")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--waves", type=int, default=5, help="login waves")
+    parser.add_argument("--users", type=int, default=500, help="users per wave")
+    parser.add_argument("--idle-seconds", type=float, default=5, help="idle time before eviction")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    asyncio.run(_before(args))
+    gc.collect()
+    tracemalloc.stop()
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_current(args, os.path.join(tmp, "sessions.db")))
+
+
+if __name__ == "__main__":
+    main()
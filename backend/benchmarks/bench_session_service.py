@@ -0,0 +1,125 @@
+"""
+Session get/update latency under concurrent users, per session backend.
+
+Every simulated user runs a few turns the way the runner drives the session
+service: get_session, append the user's message, then append two model events
+with a state delta (a tool result and the answer). The store can be given an
+injected latency per call to stand in for a remote store such as Firestore.
+
+Backends:
+- memory:        InMemorySessionService (nothing survives a restart).
+- write-through: PersistentSessionService over SQLite, flushing on every write.
+- write-behind:  PersistentSessionService over SQLite, batched flushes.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_session_service --users 200 --turns 5 --store-latency 0.01
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from session_store import PersistentSessionService, SqliteSessionStore
+
+APP_NAME = "bench"
+
+
+class _SlowStore(SqliteSessionStore):
+    """SQLite store with a fixed delay per call, like a network round-trip."""
+
+    def __init__(self, path, latency):
+        super().__init__(path)
+        self.latency = latency
+        self.calls = 0
+
+    def _slow(self):
+        self.calls += 1
+        time.sleep(self.latency)
+
+    def load(self, *args):
+        self._slow()
+        return super().load(*args)
+
+    def list(self, *args):
+        self._slow()
+        return super().list(*args)
+
+    def write(self, writes):
+        self._slow()
+        return super().write(writes)
+
+
+def _event(author, text, state_delta=None):
+    return Event(
+        author=author,
+        invocation_id="bench",
+        content=types.Content(role="model" if author != "user" else "user", parts=[types.Part(text=text)]),
+        actions=EventActions(state_delta=state_delta or {}),
+    )
+
+
+async def _user(service, user_id, turns, get_times, update_times):
+    session = await service.create_session(
+        app_name=APP_NAME, user_id=user_id,
+        state={"interaction_history": [], "user_events": [], "profile_data": "x" * 500},
+    )
+    for turn in range(turns):
+        start = time.perf_counter()
+        session = await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session.id)
+        get_times.append(time.perf_counter() - start)
+        history = session.state["interaction_history"] + [{"action": "user_query", "query": f"turn {turn}"}]
+        for event in (
+            _event("user", f"turn {turn}"),
+            _event("calendar_assistant", "tool result", {"user_events": [{"parent_event_id": f"e{turn}"}]}),
+            _event("calendar_assistant", "answer", {"interaction_history": history}),
+        ):
+            start = time.perf_counter()
+            await service.append_event(session, event)
+            update_times.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)  # the LLM's turn
+
+
+def _ms(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] * 1000 if len(values) > 1 else 0.0
+
+
+async def _run(name, service, store, args):
+    get_times, update_times = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _user(service, f"user-{i}", args.turns, get_times, update_times) for i in range(args.users)
+    ])
+    elapsed = time.perf_counter() - start
+    await service.flush()
+    writes = store.calls if store else 0
+    print(f"  {name:<14} get p50 {_ms(get_times, 50):6.2f} ms p99 {_ms(get_times, 99):7.2f} ms | "
+          f"update p50 {_ms(update_times, 50):6.2f} ms p99 {_ms(update_times, 99):7.2f} ms | "
+          f"{elapsed:5.2f}s, {writes} store calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="concurrent users")
+    parser.add_argument("--turns", type=int, default=5, help="turns per user")
+    parser.add_argument("--store-latency", type=float, default=0.01, help="seconds per store call")
+    args = parser.parse_args()
+
+    print(f"{args.users} users x {args.turns} turns, {args.store_latency * 1000:.0f} ms per store call")
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_run("memory", InMemorySessionService(), None, args))
+        store = _SlowStore(os.path.join(tmp, "through.db"), args.store_latency)
+        asyncio.run(_run("write-through", PersistentSessionService(store, flush_interval=0), store, args))
+        store = _SlowStore(os.path.join(tmp, "behind.db"), args.store_latency)
+        asyncio.run(_run("write-behind", PersistentSessionService(store, flush_interval=0.2), store, args))
+
+
+if __name__ == "__main__":
+    main()
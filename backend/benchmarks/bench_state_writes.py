@@ -0,0 +1,86 @@
+"""
+Per-turn session state-write cost: recreate-the-session vs patches.
+
+A chat turn writes the state three times: the user's query and the agent's
+answer go into interaction_history, and the reconciliation stores the cleaned
+user_events. Before, each write read the session, copied the whole state and
+recreated the session with it. Now each write patches one key (or appends one
+history entry) in place.
+
+Both run on PersistentSessionService with flushing out of the measurement, so
+the numbers are the in-process cost of a write as the state grows.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_state_writes --turns 200
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from session_store import PersistentSessionService, SqliteSessionStore
+from utils import add_agent_response_to_history, add_user_query_to_history, update_user_events
+
+APP_NAME = "bench"
+
+
+async def _recreate_write(service, session_id, key, value_fn):
+    """One state write the way utils.py did it before (get, copy, create_session)."""
+    session = await service.get_session(app_name=APP_NAME, user_id="u", session_id=session_id)
+    updated_state = session.state.copy()
+    updated_state[key] = value_fn(updated_state.get(key, []))
+    await service.create_session(app_name=APP_NAME, user_id="u", session_id=session_id, state=updated_state)
+
+
+async def _recreate_turn(service, session_id, turn, user_events):
+    await _recreate_write(service, session_id, "interaction_history",
+                          lambda h: (h + [{"action": "user_query", "query": f"turn {turn}"}])[-50:])
+    await _recreate_write(service, session_id, "interaction_history",
+                          lambda h: (h + [{"action": "agent_response", "response": "ok " * 50}])[-50:])
+    await _recreate_write(service, session_id, "user_events", lambda _: user_events)
+
+
+async def _patch_turn(service, session_id, turn, user_events):
+    await add_user_query_to_history(service, APP_NAME, "u", session_id, f"turn {turn}")
+    await add_agent_response_to_history(service, APP_NAME, "u", session_id, "calendar_assistant", "ok " * 50)
+    await update_user_events(service, APP_NAME, "u", session_id, user_events)
+
+
+async def _run(name, turn_fn, path, args):
+    service = PersistentSessionService(SqliteSessionStore(path), flush_interval=3600)
+    user_events = [
+        {"alias": f"Plan {p}", "parent_event_id": f"parent{p}", "instances": [f"ev{p}_{i}" for i in range(84)]}
+        for p in range(args.plans)
+    ]
+    session = await service.create_session(
+        app_name=APP_NAME, user_id="u",
+        state={"interaction_history": [], "user_events": user_events, "profile_data": "x" * 2000},
+    )
+    timings = []
+    for turn in range(args.turns):
+        start = time.perf_counter()
+        await turn_fn(service, session.id, turn, user_events)
+        timings.append(time.perf_counter() - start)
+    await service.flush()
+    first, last = timings[:10], timings[-10:]
+    print(f"  {name:<9} first 10 turns {sum(first) / len(first) * 1e6:8.0f} us/turn, "
+          f"last 10 turns {sum(last) / len(last) * 1e6:8.0f} us/turn")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200, help="chat turns")
+    parser.add_argument("--plans", type=int, default=10, help="training plans in user_events (84 instances each)")
+    args = parser.parse_args()
+
+    print(f"{args.turns} turns, {args.plans} plans in user_events")
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_run("recreate", _recreate_turn, os.path.join(tmp, "recreate.db"), args))
+        asyncio.run(_run("patch", _patch_turn, os.path.join(tmp, "patch.db"), args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Firestore writes for saving user_events after chat turns.
+
+Replays chat turns for ``--users`` users on a fake Firestore. Most turns are
+plain questions that leave the events unchanged; the others create an event,
+create a training plan (84 instances) for it or delete an instance. Every
+turn saves the events, the way the reconciliation worker does.
+
+- before: the whole events array set on the user document every turn.
+- current: one document per parent, unchanged saves skipped by digest and
+  only modified parents written.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_user_events_writes --users 50 --turns 40
+"""
+
+import argparse
+import random
+
+import firebase_config
+import user_repository
+from benchmarks.fake_firestore import FakeFirestore
+
+db = FakeFirestore()
+firebase_config.set_db(db)
+
+
+def _turns(args, rng):
+    """Yield (user_id, events after the turn) for every turn."""
+    events = {f"user{u}": [] for u in range(args.users)}
+    for turn in range(args.turns):
+        for user_id, user_events in events.items():
+            roll = rng.random()
+            if roll < args.change_rate / 3 or not user_events:
+                user_events.append({"alias": f"event {turn}", "parent_event_id": f"{user_id}p{turn}", "instances": []})
+            elif roll < args.change_rate * 2 / 3:
+                parent = user_events[-1]
+                parent["instances"] = [f"{parent['parent_event_id']}i{i}" for i in range(84)]
+            elif roll < args.change_rate and any(e["instances"] for e in user_events):
+                parent = next(e for e in user_events if e["instances"])
+                parent["instances"] = parent["instances"][1:]
+            yield user_id, [dict(e, instances=list(e["instances"])) for e in user_events]
+
+
+def _report(name, args):
+    turns = args.users * args.turns
+    stats = db.stats
+    print(f"  {name:<8} {stats['writes']:6d} doc writes, {stats['deletes']:4d} deletes, "
+          f"{stats['bytes_written'] / 2**20:7.2f} MiB written, {stats['writes'] / turns:5.2f} writes per turn")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="users")
+    parser.add_argument("--turns", type=int, default=40, help="chat turns per user")
+    parser.add_argument("--change-rate", type=float, default=0.2, help="share of turns that change the events")
+    args = parser.parse_args()
+
+    # A separate collection, so the current run does not migrate these arrays
+    for user_id, user_events in _turns(args, random.Random(0)):
+        db.collection("legacy_users").document(user_id).set({"events": user_events}, merge=True)
+    _report("before", args)
+
+    db.reset_stats()
+    for user_id, user_events in _turns(args, random.Random(0)):
+        user_repository.store_user_events(user_id, user_events)
+    _report("current", args)
+    stats = user_repository.get_stats()
+    print(f"  saves: {stats['event_saves']}, skipped unchanged: {stats['event_saves_skipped']}, "
+          f"parent writes skipped: {stats['event_writes_skipped']}")
+
+
+if __name__ == "__main__":
+    main()
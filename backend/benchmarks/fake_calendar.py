@@ -0,0 +1,309 @@
+"""
+In-process fake of the Google Calendar v3 REST API.
+
+Serves the subset of endpoints the backend uses (events get/insert/update/
+delete/list/instances, incremental sync with sync tokens, settings and batch
+requests) from an in-memory store on 127.0.0.1, with an optional injected
+latency per HTTP round-trip. Point the
+backend at it by setting CALENDAR_API_ROOT to ``FakeCalendar.root_url`` before
+``calendar_assistant.utils.calendar_utils`` is imported.
+"""
+
+import email
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+_EVENT_PATH = re.compile(r"^/calendar/v3/calendars/[^/]+/events(?:/([^/]+))?(/instances)?$")
+_SETTINGS_PATH = re.compile(r"^/calendar/v3/users/me/settings(?:/([^/]+))?$")
+_UNTIL = re.compile(r"UNTIL=(\d{8}T\d{6}Z)")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Every tool thread opens its own connection; the default backlog of 5
+    # drops the rest of a burst, which then waits a second for a SYN retry
+    request_queue_size = 128
+
+
+def _parse_time(value: str) -> datetime:
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _error(status: int, message: str):
+    return status, {"error": {"code": status, "message": message}}
+
+
+class FakeCalendar:
+    """
+    A fake Calendar server holding events for a single primary calendar.
+
+    Attributes:
+        round_trips (int): HTTP requests received (a batch counts once).
+        calls (int): API calls served, counting each call inside a batch.
+        latency (float): Seconds slept before answering each HTTP request.
+    """
+
+    def __init__(self, latency: float = 0.0, time_zone: str = "America/Mexico_City"):
+        self.latency = latency
+        self.time_zone = time_zone
+        self.events = {}
+        self._changed = {}  # event ID -> sequence number of its last change
+        self._seq = 0
+        self._sync_generation = 0
+        self.round_trips = 0
+        self.calls = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = None
+
+    # --- lifecycle -------------------------------------------------------
+
+    def start(self) -> "FakeCalendar":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                fake._count_round_trip()
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if self.path.startswith("/batch/"):
+                    content_type, payload = fake._handle_batch(self.headers["Content-Type"], body)
+                    status = 200
+                else:
+                    status, obj = fake.handle(self.command, self.path, body)
+                    content_type = "application/json; charset=UTF-8"
+                    payload = b"" if obj is None else json.dumps(obj).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self._server = _Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @property
+    def root_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/"
+
+    def reset_counters(self):
+        with self._lock:
+            self.round_trips = 0
+            self.calls = 0
+
+    def _count_round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+
+    # --- seeding ---------------------------------------------------------
+
+    def add_event(self, summary: str, start: datetime, hours: float = 1, recurrence=None) -> dict:
+        """Insert an event directly into the store and return it."""
+        body = {
+            "summary": summary,
+            "start": {"dateTime": start.isoformat(), "timeZone": self.time_zone},
+            "end": {"dateTime": (start + timedelta(hours=hours)).isoformat(), "timeZone": self.time_zone},
+        }
+        if recurrence:
+            body["recurrence"] = recurrence
+        with self._lock:
+            return self._insert(body)
+
+    def instance_ids(self, recurring_event_id: str) -> list:
+        return [e["id"] for e in self._instances(recurring_event_id)]
+
+    def cancel(self, event_id: str):
+        """Cancel an event as if the user deleted it in Google Calendar."""
+        with self._lock:
+            self.events[event_id]["status"] = "cancelled"
+            self._touch(event_id)
+
+    def expire_sync_tokens(self):
+        """Make every sync token issued so far answer 410 Gone."""
+        with self._lock:
+            self._sync_generation += 1
+
+    def _touch(self, event_id):
+        self._seq += 1
+        self._changed[event_id] = self._seq
+
+    # --- REST handling ---------------------------------------------------
+
+    def handle(self, method: str, raw_path: str, body: bytes):
+        """Serve one API call; returns (status, JSON object or None)."""
+        url = urlparse(raw_path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        data = json.loads(body) if body else {}
+        with self._lock:
+            self.calls += 1
+            match = _EVENT_PATH.match(url.path)
+            if match:
+                event_id = unquote(match.group(1)) if match.group(1) else None
+                if match.group(2):
+                    return self._list_instances(event_id)
+                if event_id is None:
+                    if method == "POST":
+                        return 200, self._insert(data)
+                    return self._list(query)
+                return self._event(method, event_id, data)
+            match = _SETTINGS_PATH.match(url.path)
+            if match:
+                settings = [{"kind": "calendar#setting", "id": "timezone", "value": self.time_zone}]
+                if match.group(1):
+                    return 200, settings[0]
+                return 200, {"kind": "calendar#settings", "items": settings}
+        return _error(404, "Not Found")
+
+    def _event(self, method, event_id, data):
+        event = self.events.get(event_id)
+        if event is None:
+            return _error(404, "Not Found")
+        if method == "GET":
+            return 200, event
+        if method == "DELETE":
+            if event["status"] == "cancelled":
+                return _error(410, "Resource has been deleted")
+            event["status"] = "cancelled"
+            event["updated"] = self._now()
+            self._touch(event_id)
+            if event.get("recurrence"):
+                for instance in self._instances(event_id):
+                    instance["status"] = "cancelled"
+                    self._touch(instance["id"])
+            return 204, None
+        if method in ("PUT", "PATCH"):
+            if method == "PUT":
+                data = {k: v for k, v in data.items() if k not in ("id", "status")}
+            event.update(data)
+            event["updated"] = self._now()
+            self._touch(event_id)
+            return 200, event
+        return _error(405, "Method Not Allowed")
+
+    def _insert(self, data):
+        event_id = f"ev{next(self._ids):06d}"
+        event = dict(data, id=event_id, status="confirmed", kind="calendar#event",
+                     htmlLink=f"https://calendar.example/{event_id}", updated=self._now())
+        self.events[event_id] = event
+        self._touch(event_id)
+        until = _UNTIL.search(" ".join(data.get("recurrence", [])))
+        if until:
+            start = _parse_time(data["start"]["dateTime"])
+            end = _parse_time(data["end"]["dateTime"])
+            last = datetime.strptime(until.group(1), "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            while start <= last:
+                instance_id = f"{event_id}_{start.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}"
+                self.events[instance_id] = dict(
+                    data, id=instance_id, status="confirmed", kind="calendar#event",
+                    recurringEventId=event_id, updated=self._now(),
+                    start=dict(data["start"], dateTime=start.isoformat()),
+                    end=dict(data["end"], dateTime=end.isoformat()),
+                )
+                self.events[instance_id].pop("recurrence", None)
+                self._touch(instance_id)
+                start += timedelta(weeks=1)
+                end += timedelta(weeks=1)
+        return event
+
+    def _instances(self, recurring_event_id):
+        return sorted(
+            (e for e in self.events.values() if e.get("recurringEventId") == recurring_event_id),
+            key=lambda e: e["start"]["dateTime"],
+        )
+
+    def _list_instances(self, event_id):
+        if event_id not in self.events:
+            return _error(404, "Not Found")
+        items = [e for e in self._instances(event_id) if e["status"] != "cancelled"]
+        return 200, {"kind": "calendar#events", "items": items}
+
+    def _list(self, query):
+        if "syncToken" in query:
+            _, generation, seq = query["syncToken"].split("-")
+            seq = int(seq)
+            if int(generation) != self._sync_generation:
+                return _error(410, "Sync token is no longer valid, a full sync is required.")
+            items = [
+                self.events[event_id] for event_id, changed in self._changed.items()
+                if changed > seq and not self.events[event_id].get("recurrence")
+            ]
+            return 200, self._page(items, query)
+
+        show_deleted = query.get("showDeleted") == "true"
+        items = [
+            e for e in self.events.values()
+            if (show_deleted or e["status"] != "cancelled")
+            and not e.get("recurrence") and "dateTime" in e.get("start", {})
+        ]
+        if "timeMin" in query:
+            time_min = _parse_time(query["timeMin"])
+            items = [e for e in items if _parse_time(e["end"]["dateTime"]) > time_min]
+        if "timeMax" in query:
+            time_max = _parse_time(query["timeMax"])
+            items = [e for e in items if _parse_time(e["start"]["dateTime"]) < time_max]
+        items.sort(key=lambda e: _parse_time(e["start"]["dateTime"]))
+        if "orderBy" in query and "maxResults" in query:
+            items = items[:int(query["maxResults"])]
+            return 200, {"kind": "calendar#events", "timeZone": self.time_zone, "items": items}
+        return 200, self._page(items, query)
+
+    def _page(self, items, query, page_size=250):
+        offset = int(query.get("pageToken", 0))
+        result = {"kind": "calendar#events", "timeZone": self.time_zone, "items": items[offset:offset + page_size]}
+        if offset + page_size < len(items):
+            result["nextPageToken"] = str(offset + page_size)
+        else:
+            result["nextSyncToken"] = f"sync-{self._sync_generation}-{self._seq}"
+        return result
+
+    @staticmethod
+    def _now():
+        return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+    # --- batch -----------------------------------------------------------
+
+    def _handle_batch(self, content_type: str, body: bytes):
+        message = email.message_from_bytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+        boundary = f"batch_{uuid.uuid4().hex}"
+        chunks = []
+        for part in message.get_payload():
+            raw = part.get_payload()
+            request_line, rest = raw.split("\n", 1)
+            method, path, _ = request_line.strip().split(" ", 2)
+            _, _, sub_body = rest.replace("\r\n", "\n").partition("\n\n")
+            status, obj = self.handle(method, path, sub_body.strip().encode("utf-8"))
+            payload = "" if obj is None else json.dumps(obj)
+            chunks.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'][1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{payload}\r\n"
+            )
+        chunks.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", "".join(chunks).encode("utf-8")
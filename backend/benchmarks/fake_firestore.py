@@ -0,0 +1,160 @@
+"""
+In-memory fake of the Firestore client subset the backend uses.
+
+Documents and subcollections (get/set with merge/delete, DELETE_FIELD),
+collection streams with where/order_by, list_documents and write batches,
+with an optional injected latency per round-trip and read/write counters.
+Install it before anything uses Firestore:
+
+    firebase_config.set_db(FakeFirestore())
+"""
+
+import copy
+import threading
+import time
+
+try:
+    from firebase_admin import firestore as _firestore
+    DELETE_FIELD = _firestore.DELETE_FIELD
+except ImportError:
+    DELETE_FIELD = object()
+
+
+class _Snapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class _Document:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def get(self):
+        self._db._round_trip("reads")
+        with self._db._lock:
+            return _Snapshot(self.id, self._db._docs.get(self.path))
+
+    def _set(self, data, merge=False):
+        with self._db._lock:
+            current = dict(self._db._docs.get(self.path) or {}) if merge else {}
+            for key, value in copy.deepcopy(data).items():
+                if value is DELETE_FIELD:
+                    current.pop(key, None)
+                else:
+                    current[key] = value
+            self._db._docs[self.path] = current
+            self._db.stats["bytes_written"] += len(repr(data))
+
+    def set(self, data, merge=False):
+        self._db._round_trip("writes")
+        self._set(data, merge)
+
+    def _delete(self):
+        with self._db._lock:
+            self._db._docs.pop(self.path, None)
+
+    def delete(self):
+        self._db._round_trip("deletes")
+        self._delete()
+
+    def collection(self, name):
+        return _Query(self._db, f"{self.path}/{name}")
+
+
+class _Query:
+    def __init__(self, db, path, filters=(), order=None):
+        self._db = db
+        self._path = path
+        self._filters = filters
+        self._order = order
+
+    def document(self, doc_id):
+        return _Document(self._db, f"{self._path}/{doc_id}")
+
+    def where(self, field, op, value):
+        assert op == "==", "only equality filters are supported"
+        return _Query(self._db, self._path, self._filters + ((field, value),), self._order)
+
+    def order_by(self, field):
+        return _Query(self._db, self._path, self._filters, field)
+
+    def _matching(self):
+        with self._db._lock:
+            docs = [
+                (path.rsplit("/", 1)[-1], copy.deepcopy(data)) for path, data in self._db._docs.items()
+                if path.rsplit("/", 1)[0] == self._path
+                and all(data.get(field) == value for field, value in self._filters)
+            ]
+        if self._order:
+            docs.sort(key=lambda item: item[1].get(self._order))
+        return docs
+
+    def stream(self):
+        docs = self._matching()
+        self._db._round_trip("reads", max(len(docs), 1))
+        return [_Snapshot(doc_id, data) for doc_id, data in docs]
+
+    def list_documents(self):
+        self._db._round_trip("reads")
+        return [self.document(doc_id) for doc_id, _ in self._matching()]
+
+
+class _Batch:
+    def __init__(self, db):
+        self._db = db
+        self._ops = []
+
+    def set(self, ref, data, merge=False):
+        self._ops.append(("writes", lambda: ref._set(data, merge)))
+
+    def delete(self, ref):
+        self._ops.append(("deletes", ref._delete))
+
+    def commit(self):
+        self._db._round_trip("batches")
+        for counter, op in self._ops:
+            self._db._count(counter)
+            op()
+        self._ops = []
+
+
+class FakeFirestore:
+    """
+    A fake Firestore client.
+
+    Args:
+        latency (float): Seconds every round-trip (get, set, stream, commit) takes.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._docs = {}  # "collection/doc/collection/doc" -> data
+        self._lock = threading.Lock()
+        self.stats = {"reads": 0, "writes": 0, "deletes": 0, "batches": 0, "bytes_written": 0}
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self.stats[counter] += amount
+
+    def _round_trip(self, counter, amount=1):
+        self._count(counter, amount)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def collection(self, name):
+        return _Query(self, name)
+
+    def batch(self):
+        return _Batch(self)
+
+    def reset_stats(self):
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
@@ -0,0 +1,139 @@
+"""
+Cold start of the backend: what importing main.py costs, and how soon a fresh
+``uvicorn asgi:app`` answers /health and is ready for chat.
+
+- imports: ``python -X importtime -c "import main"`` in a fresh interpreter,
+  reported as the slowest packages (their own import time, summed) and the
+  slowest modules main.py imports directly (cumulative). The stacks that are
+  meant to load on first use (the research agent, the helper LLM, Firebase)
+  are checked to stay out of it.
+- server: a uvicorn subprocess on a free port, polled every 10 ms; the time to
+  the first GET /health, and to the first one reporting "ready" (main.py
+  imported in the background).
+
+Nothing is contacted beyond localhost: sessions are kept in memory and the
+caches go to a temporary directory. Run from the backend directory:
+
+    python -m benchmarks.profile_startup --top 15
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+
+# Must not be imported by main.py (see llm.py, research.py, firebase_config.py)
+LAZY_STACKS = ["smolagents", "langchain_openai", "langchain_google_community", "openai", "litellm", "firebase_admin"]
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _env(tmp):
+    env = dict(os.environ)
+    env.update({
+        "SESSION_BACKEND": "memory",
+        "CACHE_DB_PATH": os.path.join(tmp, "cache.db"),
+        "LOG_LEVEL": "WARNING",
+    })
+    return env
+
+
+def _package(module: str) -> str:
+    parts = module.split(".")
+    return ".".join(parts[:2]) if parts[0] == "google" and len(parts) > 1 else parts[0]
+
+
+def profile_imports(env, top: int):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit("import main failed")
+
+    rows = [m.groups() for m in map(_LINE.match, result.stderr.splitlines()) if m]
+    modules = {name for _, _, _, name in rows}
+    by_package = defaultdict(int)
+    for self_us, _, _, name in rows:
+        by_package[_package(name)] += int(self_us)
+    main_us = next(int(cumulative) for _, cumulative, _, name in rows if name == "main")
+    # Direct imports of main.py are the ones one level below it
+    direct = [(int(cumulative), name) for _, cumulative, indent, name in rows if len(indent) == 3]
+
+    print(f"import main: {main_us / 1e6:.2f}s ({wall:.2f}s with the interpreter), {len(modules)} modules")
+    print(f"  slowest packages (own import time):")
+    for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"    {package:<36} {us / 1000:8.1f} ms")
+    print(f"  slowest imports of main.py (cumulative):")
+    for us, name in sorted(direct, reverse=True)[:top]:
+        print(f"    {name:<36} {us / 1000:8.1f} ms")
+    loaded = [stack for stack in LAZY_STACKS if stack in modules]
+    print(f"  lazy stacks imported by main.py: {', '.join(loaded) or 'none'}")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _health(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return json.loads(response.read())
+    except OSError:
+        return None
+
+
+def profile_server(env, timeout: float):
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    healthy = ready = None
+    try:
+        while time.perf_counter() - started < timeout and server.poll() is None:
+            health = _health(url)
+            if health is not None and healthy is None:
+                healthy = time.perf_counter() - started
+            if health is not None and health.get("ready"):
+                ready = time.perf_counter() - started
+                break
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else f"not within {timeout:.0f}s"
+
+    print(f"uvicorn asgi:app: /health answered after {seconds(healthy)}, ready after {seconds(ready)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="packages and imports to list")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for the server")
+    parser.add_argument("--skip-server", action="store_true", help="only profile the imports")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp)
+        profile_imports(env, args.top)
+        if not args.skip_server:
+            profile_server(env, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Offline stand-ins for the helpers' chat model and the agents' model.
+
+``StubChatModel`` answers like a LangChain chat model (``invoke`` and
+``with_structured_output(include_raw=True)``) after an injected latency, with
+answers built from the prompt: a day event for ``get_day_event``, a full week
+for ``get_week_events`` and a short text otherwise. Install it with
+``calendar_assistant.utils.llm.set_chat_model(StubChatModel())``.
+
+``StubAgentModel`` replaces the agents' LiteLlm: it plays a scripted turn
+(one tool call picked from the user's message, then a short answer) after an
+injected latency. Install it with ``agent.model = StubAgentModel()``.
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_UNTIL = re.compile(r"UNTIL must be equal to: (\d{8})")
+
+
+def _prompt(messages) -> str:
+    return "\n".join(getattr(message, "content", str(message)) for message in messages)
+
+
+def _event(date: str, label: str) -> dict:
+    start = datetime.fromisoformat(f"{date}T06:30:00")
+    return {
+        "summary": f"{label} training",
+        "description": f"{label} session of the plan.",
+        "start": {"dateTime": start.strftime("%Y-%m-%dT%H:%M:00")},
+        "end": {"dateTime": (start + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:00")},
+    }
+
+
+def default_text(prompt: str) -> str:
+    """A valid day event when the prompt asks for one, a short summary otherwise."""
+    dates = _DATE.findall(prompt)
+    if "Day:" in prompt and dates:
+        event = _event(dates[0], "Day")
+        until = _UNTIL.search(prompt)
+        if until:
+            event["recurrence"] = [f"RRULE:FREQ=WEEKLY;UNTIL={until.group(1)}T050000Z"]
+        return f"```json\n{json.dumps(event)}\n```"
+    return "Training session"
+
+
+def default_structured(schema, prompt: str) -> dict:
+    """One event per field of the schema, on the dates listed in the prompt, in order."""
+    dates = _DATE.findall(prompt) or ["2025-06-01"]
+    fields = list(schema.model_fields)
+    return {name: _event(dates[i % len(dates)], name.capitalize()) for i, name in enumerate(fields)}
+
+
+class _StructuredStub:
+    def __init__(self, model, schema):
+        self._model = model
+        self._schema = schema
+
+    def invoke(self, messages):
+        prompt = self._model._call(messages)
+        data = self._model._structured(self._schema, prompt)
+        raw = SimpleNamespace(
+            content=json.dumps(data), tool_calls=[],
+            usage_metadata=self._model._usage(prompt, json.dumps(data)),
+        )
+        try:
+            return {"parsed": self._schema.model_validate(data), "raw": raw, "parsing_error": None}
+        except Exception as e:
+            return {"parsed": None, "raw": raw, "parsing_error": e}
+
+
+class StubChatModel:
+    """
+    A chat model that answers from the prompt after a fixed latency.
+
+    Args:
+        latency (float): Seconds every call takes, like an LLM round-trip.
+        text: Optional ``text(prompt) -> str`` for plain answers.
+        structured: Optional ``structured(schema, prompt) -> dict`` for
+            structured answers.
+    """
+
+    model_name = "stub"
+
+    def __init__(self, latency=0.0, text=None, structured=None):
+        self._latency = latency
+        self._text = text or default_text
+        self._structured = structured or default_structured
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _call(self, messages) -> str:
+        with self._lock:
+            self.calls += 1
+        if self._latency:
+            time.sleep(self._latency)
+        return _prompt(messages)
+
+    @staticmethod
+    def _usage(prompt: str, answer: str) -> dict:
+        return {"input_tokens": len(prompt) // 4, "output_tokens": len(answer) // 4}
+
+    def invoke(self, messages):
+        prompt = self._call(messages)
+        answer = self._text(prompt)
+        return SimpleNamespace(content=answer, usage_metadata=self._usage(prompt, answer))
+
+    def with_structured_output(self, schema, **kwargs):
+        return _StructuredStub(self, schema)
+
+
+def default_script(message: str):
+    """
+    The tool call for a user message: create_event for "create ... on
+    YYYY-MM-DD at HH:MM", list_events for the coming week otherwise.
+    """
+    date = _DATE.search(message)
+    hour = re.search(r"\b(\d{2}):(\d{2})\b", message)
+    if message.lower().startswith("create") and date:
+        start = datetime.fromisoformat(f"{date.group(0)}T{hour.group(0) if hour else '08:00'}")
+        return "create_event", {
+            "summary": message.split(" on ")[0][len("create"):].strip() or "Event",
+            "start_time": start.strftime("%Y-%m-%d %H:%M"),
+            "end_time": (start + timedelta(hours=1)).strftime("%Y-%m-%d %H:%M"),
+            "location": "",
+        }
+    return "list_events", {"start_date": "", "days": 7}
+
+
+class StubAgentModel(BaseLlm):
+    """
+    An ADK model that plays a scripted turn after a fixed latency per call.
+
+    A call whose last content is the user's message asks for the tool
+    ``script(message)`` returns (None: answer directly); a call after a tool
+    response answers with a short text.
+
+    Args:
+        latency (float): Seconds every call takes, like an LLM round-trip.
+        script: Optional ``script(message) -> (tool name, args) or None``.
+    """
+
+    model: str = "stub-agent"
+    latency: float = 0.0
+    script: Optional[Callable] = None
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        last = llm_request.contents[-1] if llm_request.contents else None
+        parts = (last.parts or []) if last else []
+        call = None
+        if not any(part.function_response for part in parts):
+            message = "".join(part.text or "" for part in parts)
+            call = (self.script or default_script)(message)
+        if call:
+            name, args = call
+            part = types.Part(function_call=types.FunctionCall(name=name, args=args))
+        else:
+            part = types.Part(text="Done, your calendar is up to date.")
+        prompt_chars = sum(len(str(content)) for content in llm_request.contents)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_chars // 4, candidates_token_count=16,
+            ),
+        )
@@ -1,6 +1,8 @@
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
 from dotenv import load_dotenv
+from calendar_assistant.utils.history import instruction_with_history
+import os
 from calendar_assistant.tools.list_events import list_events
 from calendar_assistant.tools.create_event import create_event
 from calendar_assistant.tools.create_recurrent_events import create_recurrent_events
@@ -8,11 +10,14 @@ from calendar_assistant.sub_agents.manager.agent import manager
 
 load_dotenv(".env")
 
+# Tokens the interaction history may take in the instruction
+HISTORY_TOKEN_BUDGET = int(os.environ.get("CALENDAR_ASSISTANT_HISTORY_TOKENS", 1500))
+
 calendar_assistant = Agent(
     name = "calendar_assistant",
     model=LiteLlm(model="openai/gpt-4.1"),
     description = "An assistant that can create singular and recurrent events in the user's calendar. It can also create preparation plans for fitness events.",
-    instruction = """
+    instruction = instruction_with_history("""
     You are a helpful assistant that can create singular and recurrent events.
     Here are the action tools you can use:
 
@@ -41,7 +46,7 @@ calendar_assistant = Agent(
     {interaction_history}
 
     Take into account today is {today_date}.
-    """,
+    """, "calendar_assistant", HISTORY_TOKEN_BUDGET),
     sub_agents=[manager],
     tools=[
         create_event,
@@ -1,6 +1,8 @@
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
 from dotenv import load_dotenv
+from calendar_assistant.utils.history import instruction_with_history
+import os
 from calendar_assistant.tools.list_events import list_events
 from calendar_assistant.sub_agents.tools.check_type_of_event import check_type_of_event
 from calendar_assistant.sub_agents.tools.delete_event import delete_event
@@ -10,11 +12,14 @@ from calendar_assistant.sub_agents.tools.adjust_planning import adjust_planning
 
 load_dotenv(".env")
 
+# Tokens the interaction history may take in the instruction
+HISTORY_TOKEN_BUDGET = int(os.environ.get("MANAGER_HISTORY_TOKENS", 1000))
+
 manager = Agent(
     name = "manager",
     model=LiteLlm(model="openai/gpt-4.1"),
     description = "An agent that can modify and manage calendar events in case of cancelling or rescheduling them.",
-    instruction = """
+    instruction = instruction_with_history("""
 You are a helpful sub agent that can manage calendar events.
 You are called by the calendar assistant agent when the user wants to reschedule, delete an event or adjust the planning of a parent event.
 
@@ -52,7 +57,7 @@ Here's the interaction history for you to keep track of the conversation:
 {interaction_history}
 
 Take into account today is {today_date}.
-""" ,
+""", "manager", HISTORY_TOKEN_BUDGET),
     tools=[
         check_type_of_event,
         delete_event,
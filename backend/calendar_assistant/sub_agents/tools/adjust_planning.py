@@ -1,9 +1,15 @@
 from calendar_assistant.tools.create_recurrent_events import create_recurrent_events
 from google.adk.tools.tool_context import ToolContext
 from calendar_assistant.utils import calendar_utils
+from calendar_assistant.utils.event_index import index_parent, lookup_event
+from calendar_assistant.utils.logs import get_logger
+from calendar_assistant.utils.tracing import traced
 
+logger = get_logger(__name__)
+
+@traced("tool.adjust_planning")
 def adjust_planning(parent_event_id: str, user_requirements: str, start_date:str, tool_context:ToolContext) -> dict:
-    print(f"Sub agent called to adjust planning for parent event {parent_event_id}")
+    logger.info("adjust_planning called", extra={"fields": {"parent_event_id": parent_event_id}})
     try:
         user_events = tool_context.state.get("user_events", [])
         token = tool_context.state.get("access_token")
@@ -18,23 +24,19 @@ def adjust_planning(parent_event_id: str, user_requirements: str, start_date:str
         calendar_id = "primary"
         
         # Check if the parent_event_id is valid
-        for event in user_events:
-            if parent_event_id == event.get("parent_event_id"):
-                if not event.get("instances"):
-                    event_type = "single_event"
-                    return {
-                        "status": "error",
-                        "message": "Invalid parent event ID. Ask the user to provide a valid parent event"
-                    }
-                else:
-                    event_type = "parent_event"
-                    break
-            for instance in event.get("instances", []):
-                if parent_event_id == instance:
-                    # If the parent event ID matches an instance we overwrite the parent_event_id and point to a valid parent event
-                    parent_event_id = event.get("parent_event_id")
-                    event_type = "parent_event"
-                    break
+        entry = lookup_event(tool_context.state, parent_event_id)
+        event_type = None
+        if entry is not None and entry["type"] == "recurrent_event":
+            # If the parent event ID matches an instance we overwrite the parent_event_id and point to a valid parent event
+            parent_event_id = entry["parent_event_id"]
+            event_type = "parent_event"
+        elif entry is not None and entry["type"] == "single_event":
+            return {
+                "status": "error",
+                "message": "Invalid parent event ID. Ask the user to provide a valid parent event"
+            }
+        elif entry is not None:
+            event_type = "parent_event"
         
         # If we didn't find a valid parent event ID, return an error
         if not event_type or event_type != "parent_event":
@@ -52,8 +54,9 @@ def adjust_planning(parent_event_id: str, user_requirements: str, start_date:str
                         try:
                             service.events().delete(calendarId=calendar_id, eventId=instance_id).execute()
                         except Exception as e:
-                            print(f"Warning: Failed to delete instance {instance_id}: {e}")
+                            logger.warning(f"Failed to delete instance {instance_id}: {e}")
                     # After deleting all instances, we can empty the instances list
+                    index_parent(tool_context.state, parent_event_id, event.get("alias"), previous_instances=event.get("instances", []))
                     event["instances"] = []
                     break
             
@@ -79,6 +82,12 @@ def adjust_planning(parent_event_id: str, user_requirements: str, start_date:str
                 "status": "success",
                 "message": f"Planning adjusted successfully for parent event {parent_event_id}."
             }
+        elif result["status"] == "partial_success":
+            return {
+                "status": "partial_success",
+                "message": f"Planning partially adjusted for parent event {parent_event_id}: {result['message']}",
+                "failed_days": result["failed_days"],
+            }
         else:
             return {
                 "status": "error",
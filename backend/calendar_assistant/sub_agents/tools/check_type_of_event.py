@@ -1,33 +1,25 @@
 from google.adk.tools.tool_context import ToolContext
+from calendar_assistant.utils.event_index import lookup_event
+from calendar_assistant.utils.logs import get_logger
+from calendar_assistant.utils.tracing import traced
 
+logger = get_logger(__name__)
+
+@traced("tool.check_type_of_event")
 def check_type_of_event(event_id: str, tool_context: ToolContext) -> dict:
     """
     Function to check if the event is a single event or a recurrent event.
     """
-    print(f"Sub agent called to check type of event {event_id}")
+    logger.info("check_type_of_event called", extra={"fields": {"event_id": event_id}})
     user_events = tool_context.state.get("user_events", [])
 
     if not user_events:
         return {"status": "error", "message": "No user events found in memory."}
 
-    for event in user_events:
-        if event_id == event.get("parent_event_id"):
-            if not event.get("instances"):
-                return {
-                    "status": "success",
-                    "type": "single_event",
-                    "alias": event.get("alias")
-                }
-            else:
-                return {
-                    "status": "success",
-                    "type": "parent_event",
-                    "alias": event.get("alias")
-                }
-        for instance in event.get("instances", []):
-            if event_id == instance:
-                parent_event_id = event.get("parent_event_id")
-                parent_event_alias = event.get("alias")
-                return {"status": "success", "type": "recurrent_event", "alias": event.get("alias"), "parent_event_alias": parent_event_alias}
+    entry = lookup_event(tool_context.state, event_id)
+    if entry is not None:
+        if entry["type"] == "recurrent_event":
+            return {"status": "success", "type": "recurrent_event", "alias": entry["alias"], "parent_event_alias": entry["alias"]}
+        return {"status": "success", "type": entry["type"], "alias": entry["alias"]}
 
     return {"status": "sucess","type": "single_event", "message": "Event not found in user events memory. Event was not created by this agent."}
\ No newline at end of file
@@ -1,6 +1,12 @@
 from google.adk.tools.tool_context import ToolContext
 from calendar_assistant.utils import calendar_utils
+from calendar_assistant.utils.event_index import lookup_event, unindex_instance, unindex_parent
+from calendar_assistant.utils.logs import get_logger
+from calendar_assistant.utils.tracing import traced
 
+logger = get_logger(__name__)
+
+@traced("tool.delete_event")
 def delete_event(event_id: str, event_type: str, tool_context:ToolContext) -> dict:
     """
     Delete an event from Google Calendar.
@@ -12,7 +18,7 @@ def delete_event(event_id: str, event_type: str, tool_context:ToolContext) -> di
     Returns:
         dict: Operation status and details
     """
-    print(f"Sub agent called to delete event {event_id} of type {event_type}")
+    logger.info("delete_event called", extra={"fields": {"event_id": event_id, "event_type": event_type}})
     try:
         user_events = tool_context.state.get("user_events", [])
         # Get calendar service
@@ -39,13 +45,22 @@ def delete_event(event_id: str, event_type: str, tool_context:ToolContext) -> di
             service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
             
             # Update user_events
+            entry = lookup_event(tool_context.state, event_id)
+            parent_event_id = entry["parent_event_id"] if entry else None
             updated_events = []
             for event in user_events:
                 if event_type == "single_event" and event_id == event.get("parent_event_id"):
+                    unindex_parent(tool_context.state, event_id, event.get("instances", []))
                     continue  # remove this parent event
-                elif event_type == "recurrent_event" and event_id in event.get("instances", []):
+                elif event_type == "recurrent_event" and (
+                    # An instance missing from the index is found by scanning the instances
+                    event.get("parent_event_id") == parent_event_id if parent_event_id
+                    else event_id in event.get("instances", [])
+                ):
                     event["instances"] = [i for i in event["instances"] if i != event_id]
                 updated_events.append(event)
+            if event_type == "recurrent_event":
+                unindex_instance(tool_context.state, event_id)
             
             tool_context.state["user_events"] = updated_events
 
@@ -57,13 +72,16 @@ def delete_event(event_id: str, event_type: str, tool_context:ToolContext) -> di
                         try:
                             service.events().delete(calendarId=calendar_id, eventId=instance_id).execute()
                         except Exception as e:
-                            print(f"Warning: Failed to delete instance {instance_id}: {e}")
+                            logger.warning(f"Failed to delete instance {instance_id}: {e}")
                     break
 
             # Then delete the parent event
             service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
             
             # Remove the whole dictionary from user_events
+            for event in user_events:
+                if event.get("parent_event_id") == event_id:
+                    unindex_parent(tool_context.state, event_id, event.get("instances", []))
             user_events = [event for event in user_events if event.get("parent_event_id") != event_id]
             tool_context.state["user_events"] = user_events
 
@@ -1,6 +1,11 @@
 from google.adk.tools.tool_context import ToolContext
 from calendar_assistant.utils import calendar_utils
+from calendar_assistant.utils.logs import get_logger
+from calendar_assistant.utils.tracing import traced
 
+logger = get_logger(__name__)
+
+@traced("tool.reschedule_event")
 def reschedule_event(event_id: str, start_time: str, end_time: str, location: str, event_type:str, tool_context:ToolContext) -> dict:
     """
     Edit an existing event in Google Calendar - reschedule individual event.
@@ -15,7 +20,7 @@ def reschedule_event(event_id: str, start_time: str, end_time: str, location: st
     Returns:
         dict: Information about the edited event or error details
     """
-    print(f"Sub agent called to reschedule event {event_id} of type {event_type}")
+    logger.info("reschedule_event called", extra={"fields": {"event_id": event_id, "event_type": event_type}})
     try:
         user_events = tool_context.state.get("user_events", [])
         # Get calendar service
@@ -41,8 +46,8 @@ def reschedule_event(event_id: str, start_time: str, end_time: str, location: st
                 "message": f"Event with ID {event_id} not found in primary calendar.",
             }
 
-        # Get timezone from the original event
-        timezone_id = "America/Mexico_City"  # Default
+        # Get timezone from the original event, defaulting to the user's calendar timezone
+        timezone_id = calendar_utils.get_user_timezone(tool_context.state, service)
         if "start" in event and "timeZone" in event["start"]:
             timezone_id = event["start"]["timeZone"]
 
@@ -83,7 +88,7 @@ def reschedule_event(event_id: str, start_time: str, end_time: str, location: st
                 .execute()
             )
 
-            print(f"Updated event ID: {updated_event['id']}")
+            logger.debug(f"Updated event ID: {updated_event['id']}")
 
             return {
                 "status": "success",
@@ -121,7 +126,7 @@ def reschedule_event(event_id: str, start_time: str, end_time: str, location: st
                 .execute()
             )
 
-            print(f"Updated event ID: {updated_event['id']}")
+            logger.debug(f"Updated event ID: {updated_event['id']}")
 
             return {
                 "status": "success",
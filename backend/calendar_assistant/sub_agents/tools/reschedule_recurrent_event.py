@@ -1,6 +1,11 @@
 from google.adk.tools.tool_context import ToolContext
 from calendar_assistant.utils import calendar_utils
+from calendar_assistant.utils.logs import get_logger
+from calendar_assistant.utils.tracing import traced
 
+logger = get_logger(__name__)
+
+@traced("tool.reschedule_recurrent_event")
 def reschedule_recurrent_event(event_id: str, start_time: str, end_time: str, location: str, tool_context:ToolContext) -> dict:
     """
     Edit an existing event in Google Calendar - reschedule recurrent event.
@@ -14,7 +19,7 @@ def reschedule_recurrent_event(event_id: str, start_time: str, end_time: str, lo
     Returns:
         dict: Information about the edited event or error details
     """
-    print(f"Sub agent called to reschedule recurrent event {event_id}")
+    logger.info("reschedule_recurrent_event called", extra={"fields": {"event_id": event_id}})
     try:
         # Get calendar service
         token = tool_context.state.get("access_token")
@@ -39,8 +44,8 @@ def reschedule_recurrent_event(event_id: str, start_time: str, end_time: str, lo
                 "message": f"Event with ID {event_id} not found in primary calendar.",
             }
 
-        # Get timezone from the original event
-        timezone_id = "America/Mexico_City"  # Default
+        # Get timezone from the original event, defaulting to the user's calendar timezone
+        timezone_id = calendar_utils.get_user_timezone(tool_context.state, service)
         if "start" in event and "timeZone" in event["start"]:
             timezone_id = event["start"]["timeZone"]
 
@@ -73,7 +78,7 @@ def reschedule_recurrent_event(event_id: str, start_time: str, end_time: str, lo
             .execute()
         )
 
-        print(f"Updated event ID: {updated_event['id']}")
+        logger.debug(f"Updated event ID: {updated_event['id']}")
 
         return {
             "status": "success",
@@ -2,9 +2,15 @@
 Create event tool for Google Calendar integration.
 """
 
-from calendar_assistant.utils.calendar_utils import get_calendar_service, parse_datetime
+from calendar_assistant.utils.calendar_utils import get_calendar_service, get_user_timezone, parse_datetime
+from calendar_assistant.utils.event_index import index_parent
+from calendar_assistant.utils.logs import get_logger
+from calendar_assistant.utils.tracing import traced
 from google.adk.tools.tool_context import ToolContext
 
+logger = get_logger(__name__)
+
+@traced("tool.create_event")
 def create_event(summary: str, start_time: str, end_time: str, location: str, tool_context: ToolContext) -> dict:
     """
     Create a new event in Google Calendar.
@@ -18,8 +24,8 @@ def create_event(summary: str, start_time: str, end_time: str, location: str, to
     Returns:
         dict: Information about the created event or error details
     """
-    print("Agent called create_event")
-    print(f"Summary: {summary}\nDate: {start_time} | {end_time}\nLocation: {location}")
+    logger.info("create_event called", extra={"fields": {"start_time": start_time, "end_time": end_time}})
+    logger.debug("create_event details", extra={"fields": {"summary": summary, "location": location}})
     user_events = tool_context.state.get("user_events", [])
     try:
         # Get calendar service
@@ -44,19 +50,8 @@ def create_event(summary: str, start_time: str, end_time: str, location: str, to
                 "message": "Invalid date/time format. Please use YYYY-MM-DD HH:MM format.",
             }
 
-        # Dynamically determine timezone
-        timezone_id = "America/New_York"  # Default to Eastern Time
-
-        try:
-            # Try to get the timezone from the calendar settings
-            settings = service.settings().list().execute()
-            for setting in settings.get("items", []):
-                if setting.get("id") == "timezone":
-                    timezone_id = setting.get("value")
-                    break
-        except Exception:
-            # If we can't get it from settings, we'll use the default
-            pass
+        # The user's calendar timezone, cached in the session
+        timezone_id = get_user_timezone(tool_context.state, service)
 
         # Create event body without type annotations
         event_body = {}
@@ -64,7 +59,7 @@ def create_event(summary: str, start_time: str, end_time: str, location: str, to
         # Add summary
         event_body["summary"] = summary
 
-        # Add start and end times with the dynamically determined timezone
+        # Add start and end times in the user's timezone
         event_body["start"] = {
             "dateTime": start_dt.isoformat(),
             "timeZone": timezone_id,
@@ -78,11 +73,12 @@ def create_event(summary: str, start_time: str, end_time: str, location: str, to
         event = (
             service.events().insert(calendarId=calendar_id, body=event_body).execute()
         )
-        print(f"Created event\nEvent ID:{event['id']}")
+        logger.info("Created event", extra={"fields": {"event_id": event['id']}})
         alias = summary
         parent_event_id = event['id']
         user_events.append({"alias": alias, "parent_event_id": parent_event_id, "instances": []})
         tool_context.state['user_events'] = user_events
+        index_parent(tool_context.state, parent_event_id, alias)
         return {
             "status": "success",
             "message": "Event created successfully",
@@ -1,8 +1,66 @@
 from google.adk.tools.tool_context import ToolContext
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from calendar_assistant.utils import helpers, calendar_utils, research
-import json
+from calendar_assistant.utils import helpers, calendar_utils, research, progress, event_index, tracing
+from calendar_assistant.utils.logs import get_logger
+import contextvars
+import os
+import time
 
+logger = get_logger(__name__)
+
+# Maximum number of days generated and inserted at the same time
+PLAN_CONCURRENCY = int(os.environ.get("PLAN_CONCURRENCY", 7))
+
+
+@tracing.traced("create_day_event")
+def _create_day_event(service, day, day_date, start_date_obj, schedule_preferences, content, parsed_date, timezone_id, data=None) -> dict:
+    """
+    Insert one day's recurring training event in Google Calendar.
+
+    The event body normally comes from the weekly generation; days it could not
+    produce are generated here on their own.
+
+    Returns:
+        dict: status, the IDs of the created instances (or an error message) and
+        the seconds spent on the LLM and on Google Calendar.
+    """
+    result = {"status": "error", "instances": [], "llm_seconds": 0.0, "calendar_seconds": 0.0}
+    try:
+        if data is None:
+            started = time.perf_counter()
+            day_event = helpers.get_day_event(day, day_date, schedule_preferences, content, parsed_date, timezone_id)
+            result["llm_seconds"] = time.perf_counter() - started
+            logger.debug("Generated day event", extra={"fields": {"day": day, "event": day_event}})
+            data = helpers.parse_day_event(day_event, parsed_date, timezone_id, day_date)
+            if data is None:
+                result["message"] = "No valid event was generated"
+                return result
+
+        started = time.perf_counter()
+        created = service.events().insert(calendarId='primary', body=data).execute()
+        logger.debug("Created event", extra={"fields": {"day": day, "event_id": created.get('id')}})
+
+        # Get the event instances
+        instances = service.events().instances(calendarId='primary', eventId=created['id']).execute()
+        first_instace = instances['items'][0]
+        instance_start = first_instace.get("start", {}).get("dateTime")
+        instance_dt = datetime.strptime(instance_start, "%Y-%m-%dT%H:%M:%S%z")
+        if instance_dt.date() < start_date_obj.date():
+            service.events().delete(calendarId='primary', eventId=first_instace['id']).execute()
+            logger.info(f"Deleted only the instance on {instance_dt.date()} (before official start_date)")
+            instances['items'] = instances['items'][1:]
+
+        result["instances"] = [instance.get('id') for instance in instances.get('items', [])]
+        result["calendar_seconds"] = time.perf_counter() - started
+        result["status"] = "success"
+    except Exception as e:
+        logger.warning(f"Error creating the {day} event: {e}")
+        result["message"] = str(e)
+    return result
+
+
+@tracing.traced("tool.create_recurrent_events")
 def create_recurrent_events(parent_event_id:str, user_requirements:str, start_date:str, tool_context: ToolContext) -> dict:
     """
     Function to create a new planning.
@@ -12,10 +70,10 @@ def create_recurrent_events(parent_event_id:str, user_requirements:str, start_da
         user_requirements (str): User requirements for the training plan (optional).
         start_date (str): The start date for the recurrent events in mm-dd-YYYY format.
     """
-    print(f"Agent called create_recurrent_events with args: {parent_event_id}\n {start_date}")
+    logger.info("create_recurrent_events called", extra={"fields": {"parent_event_id": parent_event_id, "start_date": start_date}})
     user_events = tool_context.state.get("user_events", [])
     profile_data = tool_context.state.get("profile_data", "No general info provided")
-    user_input = getattr(tool_context.state, "user_input", "")
+    user_input = tool_context.state.get("user_input", "")
     token = tool_context.state["access_token"]
     if not token:
         return {"status": "error", "message": "Access token is missing. Please authenticate first."}
@@ -31,51 +89,75 @@ def create_recurrent_events(parent_event_id:str, user_requirements:str, start_da
         sunday_date = date_obj - timedelta(days=days_to_subtract)
         parent_event_summary, parsed_date = helpers.get_summary_from_event_id(parent_event_id, token)
         alias = parent_event_summary
-        print(parsed_date)
         summary = helpers.get_summary(user_input, parent_event_summary)
         
         # Create a weekly plan based on the summary and google research
-        weekly_plan_path = research.research_week_plan(summary, schedule_preferences, user_requirements)
-        with open(weekly_plan_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        days = weekly_plan.keys()
-        days_to_add = 0
+        progress.report(f"Researching a training plan for '{summary}'")
+        content = research.research_week_plan(summary, schedule_preferences, user_requirements).to_prompt()
+
+        # One structured call generates the whole week
+        progress.report("Generating the week's training sessions")
+        started = time.perf_counter()
+        timezone_id = calendar_utils.get_user_timezone(tool_context.state)
+        week_events = helpers.get_week_events(sunday_date, schedule_preferences, content, str(parsed_date), timezone_id)
+        week_llm_seconds = time.perf_counter() - started
+
+        # Every day is independent: insert them (and generate any missing one) concurrently.
+        # Each runs in a copy of this context so its spans and logs stay in the turn.
+        service = calendar_utils.get_calendar_service(token)
+        with ThreadPoolExecutor(max_workers=PLAN_CONCURRENCY) as pool:
+            futures = {
+                day: pool.submit(
+                    contextvars.copy_context().run, _create_day_event, service, day, sunday_date + timedelta(days=offset),
+                    date_obj, schedule_preferences, content, str(parsed_date), timezone_id, week_events.get(day),
+                )
+                for offset, day in enumerate(weekly_plan)
+            }
+            days = {future: day for day, future in futures.items()}
+            for future in as_completed(days):
+                if future.result()["status"] == "success":
+                    progress.report(f"Created {days[future]} session")
+                else:
+                    progress.report(f"Could not create {days[future]} session")
+        wall_seconds = time.perf_counter() - started
+
         parent_event_instances = []
-        for day in days:
-            day_event = helpers.get_day_event(day, sunday_date + timedelta(days=days_to_add), schedule_preferences, content, str(parsed_date))
-            print(day_event)
-            weekly_plan[day]["event"] = day_event
-
-            data = json.loads(day_event.replace("```json", "").replace("```", "").strip())
-            service = calendar_utils.get_calendar_service(token)
-            created = service.events().insert(calendarId='primary', body=data).execute()
-            print('Created event:', created.get('htmlLink'))
-
-            # Get the event instances
-            instances = service.events().instances(calendarId='primary', eventId=created['id']).execute()
-            first_instace = instances['items'][0]
-            instance_start = first_instace.get("start", {}).get("dateTime")
-            instance_dt = datetime.strptime(instance_start, "%Y-%m-%dT%H:%M:%S%z")
-            if instance_dt.date() < date_obj.date():
-                service.events().delete(calendarId='primary', eventId=first_instace['id']).execute()
-                print(f"Deleted only the instance on {instance_dt.date()} (before official start_date)")
-
-            day_instances = service.events().instances(calendarId='primary', eventId=created['id']).execute()
-            for instance in day_instances.get('items', []):
-                intance_id = instance.get('id')
-                parent_event_instances.append(intance_id)
-
-            days_to_add += 1
+        failed_days = {}
+        for day, future in futures.items():
+            result = future.result()
+            weekly_plan[day] = result
+            if result["status"] == "success":
+                parent_event_instances.extend(result["instances"])
+            else:
+                failed_days[day] = result["message"]
+        logger.info("Weekly plan created", extra={"fields": {
+            "wall_seconds": round(wall_seconds, 2),
+            "week_llm_seconds": round(week_llm_seconds, 2),
+            "week_days_generated": len(week_events),
+            "llm_seconds": {day: round(r["llm_seconds"], 2) for day, r in weekly_plan.items()},
+            "calendar_seconds": {day: round(r["calendar_seconds"], 2) for day, r in weekly_plan.items()},
+        }})
+        if len(failed_days) == len(weekly_plan):
+            return {"status": "error", "message": "Error creating recurrent events", "failed_days": failed_days}
 
         for event in user_events:
             if event.get("parent_event_id") == parent_event_id:
+                event_index.index_parent(
+                    tool_context.state, parent_event_id, event.get("alias"),
+                    parent_event_instances, previous_instances=event.get("instances", []),
+                )
                 event["instances"] = parent_event_instances
                 break
-        print(user_events)
         tool_context.state['user_events'] = user_events
 
+        if failed_days:
+            return {
+                "status": "partial_success",
+                "message": f"Recurrent events '{summary}' created from {start_date}, except for: {', '.join(failed_days)}",
+                "failed_days": failed_days,
+            }
         return {"status": "success", "message": f"Recurrent events '{summary}' created from {start_date}"}
     
     except Exception as e:
-        print(f"Error creating recurrent events: {e}")
+        logger.exception("Error creating recurrent events")
         return {"status": "error", "message": f"Error creating recurrent events: {str(e)}"}
\ No newline at end of file
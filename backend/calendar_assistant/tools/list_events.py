@@ -4,10 +4,17 @@ List events tool for Google Calendar integration.
 
 import datetime
 
-from calendar_assistant.utils.calendar_utils import format_event_time, get_calendar_service
+from calendar_assistant.utils.calendar_utils import format_event_time, get_calendar_service, get_user_timezone, get_zone
+from calendar_assistant.utils.event_index import get_event_index
+from calendar_assistant.utils.event_mirror import query_events
+from calendar_assistant.utils.logs import get_logger
+from calendar_assistant.utils.tracing import traced
 from google.adk.tools.tool_context import ToolContext
 
+logger = get_logger(__name__)
 
+
+@traced("tool.list_events")
 def list_events(start_date: str, days: int, tool_context:ToolContext) -> dict:
     """
     List upcoming calendar events within a specified date range.
@@ -20,10 +27,8 @@ def list_events(start_date: str, days: int, tool_context:ToolContext) -> dict:
         dict: Information about upcoming events or error details
     """
     try:
-        user_events = tool_context.state.get("user_events", [])
-        print("Listing events")
-        print("Start date: ", start_date)
-        print("Days: ", days)
+        event_index = get_event_index(tool_context.state)
+        logger.info("list_events called", extra={"fields": {"start_date": start_date, "days": days}})
         # Get calendar service
         token = tool_context.state.get("access_token")
         service = get_calendar_service(token)
@@ -37,15 +42,13 @@ def list_events(start_date: str, days: int, tool_context:ToolContext) -> dict:
         # Always use a large max_results value to return all events
         max_results = 100
 
-        # Always use primary calendar
-        calendar_id = "primary"
-
-        # Set time range
+        # Set time range in the user's timezone
+        zone = get_zone(get_user_timezone(tool_context.state, service))
         if not start_date or start_date.strip() == "":
-            start_time = datetime.datetime.utcnow()
+            start_time = datetime.datetime.now(zone)
         else:
             try:
-                start_time = datetime.datetime.strptime(start_date, "%Y-%m-%d")
+                start_time = datetime.datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=zone)
             except ValueError:
                 return {
                     "status": "error",
@@ -59,25 +62,9 @@ def list_events(start_date: str, days: int, tool_context:ToolContext) -> dict:
 
         end_time = start_time + datetime.timedelta(days=days)
 
-        # Format times for API call
-        time_min = start_time.isoformat() + "Z"
-        time_max = end_time.isoformat() + "Z"
-
-        # Call the Calendar API
-        events_result = (
-            service.events()
-            .list(
-                calendarId=calendar_id,
-                timeMin=time_min,
-                timeMax=time_max,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
-        )
-
-        events = events_result.get("items", [])
+        # Answer from the user's synced event mirror when it covers the range
+        user_key = tool_context.state.get("user_id") or token
+        events = query_events(service, user_key, start_time, end_time, max_results)
 
         if not events:
             return {
@@ -89,17 +76,8 @@ def list_events(start_date: str, days: int, tool_context:ToolContext) -> dict:
         # Format events for display
         formatted_events = []
         for event in events:
-            event_type = "single_event"
-            event_id = event.get("id")
-            for user_event in user_events:
-                if event_id == user_event.get("parent_event_id"):
-                    if user_event.get("instances"):
-                        event_type = "parent_event"
-                        break
-                for instance in user_event.get("instances", []):
-                    if event_id == instance:
-                        event_type = "recurrent_event"
-                        break
+            entry = event_index.get(event.get("id"))
+            event_type = entry["type"] if entry else "single_event"
 
             formatted_event = {
                 "id": event.get("id"),
@@ -116,7 +94,6 @@ def list_events(start_date: str, days: int, tool_context:ToolContext) -> dict:
                 "link": event.get("htmlLink", ""),
                 "event_type":event_type
             }
-            print(formatted_event)
             formatted_events.append(formatted_event)
 
         return {
@@ -0,0 +1,157 @@
+"""
+Size-bounded TTL cache with an in-memory LRU front and a SQLite backend.
+
+Values must be JSON-serializable. Every cache lives in its own table of one
+SQLite file (CACHE_DB_PATH, by default fytai_cache.db in the backend
+directory), so entries survive restarts and are shared by the worker
+processes of a container. The file and the tables are created on first use.
+
+Lookups and writes only hold the cache's lock for the in-memory LRU; SQLite is
+read and written outside it, on one connection per thread. When entries were
+last used is recorded in memory and written with the expiry and LRU eviction,
+which run at most every CACHE_EVICT_INTERVAL_SECONDS.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_DB_PATH = os.environ.get("CACHE_DB_PATH") or os.path.join(_BACKEND_DIR, "fytai_cache.db")
+CACHE_EVICT_INTERVAL_SECONDS = float(os.environ.get("CACHE_EVICT_INTERVAL_SECONDS", 60))
+
+
+class PersistentCache:
+    """
+    A named key/value cache.
+
+    Args:
+        name (str): Table name, e.g. "research".
+        ttl (float): Seconds an entry stays valid.
+        max_entries (int): Entries kept on disk; the least recently used go first.
+        memory_entries (int): Entries kept in the in-memory LRU.
+        path (str): SQLite file, or None to keep the cache in memory only.
+        evict_interval (float): Minimum seconds between two eviction passes.
+    """
+
+    def __init__(self, name, ttl, max_entries, memory_entries=128, path=CACHE_DB_PATH,
+                 evict_interval=CACHE_EVICT_INTERVAL_SECONDS):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.path = path
+        self.evict_interval = evict_interval
+        self._memory = OrderedDict()  # key -> (value, stored_at)
+        self._accessed = {}  # key -> last use not yet written to disk
+        self._evicted_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    def _connection(self):
+        """This thread's connection, creating the file and the table on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            # Readers do not wait for a writer (and the reverse)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.name} "
+                    "(key TEXT PRIMARY KEY, value TEXT, stored_at REAL, accessed_at REAL)"
+                )
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key, value, stored_at):
+        self._memory[key] = (value, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        """
+        Look up a key.
+
+        Returns:
+            The cached value, or None on a miss or an expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and now - cached[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self._accessed[key] = now
+                self._stats["memory_hits"] += 1
+                return cached[0]
+
+        row = None
+        if self.path:
+            row = self._connection().execute(
+                f"SELECT value, stored_at FROM {self.name} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or now - row[1] >= self.ttl:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        value = json.loads(row[0])
+        with self._lock:
+            self._remember(key, value, row[1])
+            self._accessed[key] = now
+            self._stats["disk_hits"] += 1
+        return value
+
+    def set(self, key: str, value):
+        """Store a value; entries beyond max_entries are evicted by the next eviction pass."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self._accessed.pop(key, None)
+            self._stats["writes"] += 1
+            evict = bool(self.path) and time.monotonic() - self._evicted_at >= self.evict_interval
+            if evict:
+                self._evicted_at = time.monotonic()
+                accessed, self._accessed = self._accessed, {}
+        if not self.path:
+            return
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.name} (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+        if evict:
+            self._evict(conn, accessed, now)
+
+    def _evict(self, conn, accessed, now):
+        """Write the recorded uses, then drop the expired and the least recently used entries."""
+        with conn:
+            conn.executemany(
+                f"UPDATE {self.name} SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(at, key) for key, at in accessed.items()],
+            )
+            conn.execute(f"DELETE FROM {self.name} WHERE stored_at < ?", (now - self.ttl,))
+            evicted = conn.execute(
+                f"DELETE FROM {self.name} WHERE key IN (SELECT key FROM {self.name} "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        with self._lock:
+            self._stats["evictions"] += max(evicted, 0)
+
+    def stats(self) -> dict:
+        """
+        Get hit/miss counters.
+
+        Returns:
+            dict: memory_hits, disk_hits, misses, writes, evictions and hit_rate.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
@@ -4,24 +4,134 @@ Utility functions for Google Calendar integration.
 
 import json
 import os
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+from calendar_assistant.utils.event_mirror import query_events
+from calendar_assistant.utils.logs import get_logger
+from calendar_assistant.utils.tracing import span
+
+logger = get_logger(__name__)
 
 # Define scopes needed for Google Calendar
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 
-# Path for token storage
+# Service pool: one Calendar client per access token, shared by every tool call.
+# Access tokens from the frontend cannot be refreshed and Google issues them for
+# one hour, so a cached client never outlives that.
+SERVICE_CACHE_SIZE = int(os.environ.get("CALENDAR_SERVICE_CACHE_SIZE", 256))
+TOKEN_LIFETIME_SECONDS = int(os.environ.get("CALENDAR_TOKEN_LIFETIME_SECONDS", 3600))
+HTTP_TIMEOUT_SECONDS = 30
+# Points the client at another Calendar server, e.g. benchmarks/fake_calendar.py
+CALENDAR_API_ROOT = os.environ.get("CALENDAR_API_ROOT")
+# Google Calendar accepts at most 50 calls in one batch request
+BATCH_LIMIT = 50
+# Timezone used when a user's calendar setting cannot be read
+DEFAULT_TIMEZONE = os.environ.get("DEFAULT_TIMEZONE", "UTC")
+
+_discovery_doc = None
+_service_cache = OrderedDict()  # access_token -> (service, expires_at)
+_service_lock = threading.Lock()
+_service_stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+_api_stats = {}  # API method, e.g. "calendar.events.insert" -> {"calls", "errors", "seconds"}
+_api_lock = threading.Lock()
+
+
+class _KeepAliveHttp:
+    """
+    httplib2-compatible transport shared by a cached Calendar service.
+
+    httplib2.Http keeps connections alive but is not thread-safe, so each thread
+    gets its own authorized connection. Frontend tokens cannot be refreshed, so a
+    401 is returned to the caller as an HttpError and drops the token from the pool.
+    """
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self._local = threading.local()
+
+    def request(self, *args, **kwargs):
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = AuthorizedHttp(
+                self.credentials,
+                http=httplib2.Http(timeout=HTTP_TIMEOUT_SECONDS),
+                refresh_status_codes=(),
+            )
+            self._local.http = http
+        response, content = http.request(*args, **kwargs)
+        if response.status == 401:
+            invalidate_calendar_service(self.credentials.token)
+        return response, content
+
+
+def _count_api_call(method: str, seconds: float, failed: bool):
+    with _api_lock:
+        stats = _api_stats.get(method)
+        if stats is None:
+            stats = _api_stats[method] = {"calls": 0, "errors": 0, "seconds": 0.0}
+        stats["calls"] += 1
+        stats["errors"] += failed
+        stats["seconds"] += seconds
+
+
+class _TracedHttpRequest(HttpRequest):
+    """
+    Calendar API request whose execute is a span named after the method (e.g.
+    calendar.events.insert) and is counted per method.
+    """
+
+    def execute(self, http=None, num_retries=0):
+        method = self.methodId or "calendar.request"
+        started = time.perf_counter()
+        failed = True
+        try:
+            with span(method, **{"http.method": self.method}):
+                response = super().execute(http=http, num_retries=num_retries)
+            failed = False
+            return response
+        finally:
+            _count_api_call(method, time.perf_counter() - started, failed)
+
+
+def _get_discovery_doc() -> dict:
+    """Parse the Calendar discovery document bundled with googleapiclient once."""
+    global _discovery_doc
+    if _discovery_doc is None:
+        doc = json.loads(get_static_doc("calendar", "v3"))
+        if CALENDAR_API_ROOT:
+            doc["rootUrl"] = CALENDAR_API_ROOT.rstrip("/") + "/"
+        _discovery_doc = doc
+    return _discovery_doc
+
+
+def _build_service(access_token: str):
+    creds = Credentials(token=access_token)
+    return build_from_document(
+        _get_discovery_doc(), http=_KeepAliveHttp(creds), requestBuilder=_TracedHttpRequest
+    )
 
 
 def get_calendar_service(access_token: str):
     """
-    Creates a Google Calendar service object from a user's access token.
+    Returns a Google Calendar service object for a user's access token.
+
+    Services are pooled per token (LRU, expiring with the token) so repeated
+    tool calls reuse the parsed discovery document and open HTTP connections.
 
     Args:
         access_token: The user's OAuth 2.0 access token obtained from the frontend.
@@ -30,23 +140,111 @@ def get_calendar_service(access_token: str):
         A Google Calendar service object or None if the token is invalid or expired.
     """
     if not access_token:
-        print("Error: Access token is required.")
+        logger.warning("Access token is required.")
         return None
 
+    now = time.monotonic()
+    with _service_lock:
+        cached = _service_cache.get(access_token)
+        if cached is not None:
+            service, expires_at = cached
+            if now < expires_at:
+                _service_cache.move_to_end(access_token)
+                _service_stats["hits"] += 1
+                return service
+            del _service_cache[access_token]
+            _service_stats["expirations"] += 1
+        _service_stats["misses"] += 1
+
     try:
-        # Crea las credenciales directamente desde el access token.
         # Nota: estas credenciales no se pueden refrescar y son de corta duración.
-        creds = Credentials(token=access_token)
-        
-        # Construye el servicio de Google Calendar.
-        service = build("calendar", "v3", credentials=creds)
-        return service
-        
+        service = _build_service(access_token)
     except HttpError as error:
         # El error más común aquí es que el token sea inválido o haya expirado.
-        print(f"An error occurred: {error}")
+        logger.warning(f"An error occurred: {error}")
         return None
 
+    with _service_lock:
+        _service_cache[access_token] = (service, now + TOKEN_LIFETIME_SECONDS)
+        _service_cache.move_to_end(access_token)
+        while len(_service_cache) > SERVICE_CACHE_SIZE:
+            _service_cache.popitem(last=False)
+            _service_stats["evictions"] += 1
+    return service
+
+
+def invalidate_calendar_service(access_token: str):
+    """
+    Drop the pooled service for a token, e.g. after Google rejected it.
+
+    Args:
+        access_token: The token whose service should be discarded.
+    """
+    with _service_lock:
+        if _service_cache.pop(access_token, None) is not None:
+            _service_stats["invalidations"] += 1
+
+
+def get_calendar_api_stats() -> dict:
+    """
+    Get Calendar API counters per method, batched requests included.
+
+    Returns:
+        dict: API method (e.g. "calendar.events.insert") -> calls, errors and
+        seconds spent.
+    """
+    with _api_lock:
+        return {method: dict(stats) for method, stats in _api_stats.items()}
+
+
+def get_calendar_service_stats() -> dict:
+    """
+    Get counters for the Calendar service pool.
+
+    Returns:
+        dict: hits, misses, evictions, expirations, invalidations, size and hit_rate.
+    """
+    with _service_lock:
+        stats = dict(_service_stats)
+        stats["size"] = len(_service_cache)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def execute_batch(service, requests: dict) -> dict:
+    """
+    Execute Calendar API requests as batch HTTP calls of up to BATCH_LIMIT each.
+
+    Args:
+        service: A Google Calendar service object.
+        requests (dict): Request ID -> unexecuted request, e.g.
+            service.events().get(calendarId="primary", eventId=event_id)
+
+    Returns:
+        dict: Request ID -> (response, exception); exception is None on success.
+    """
+    results = {}
+
+    def callback(request_id, response, exception):
+        results[request_id] = (response, exception)
+
+    items = list(requests.items())
+    for start in range(0, len(items), BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=callback)
+        chunk = items[start:start + BATCH_LIMIT]
+        for request_id, request in chunk:
+            batch.add(request, request_id=request_id)
+        started = time.perf_counter()
+        with span("calendar.batch", requests=len(chunk)):
+            batch.execute()
+        # Count each batched request under its own method; they share the round-trip
+        seconds = (time.perf_counter() - started) / len(chunk)
+        for request_id, request in chunk:
+            exception = results.get(request_id, (None, None))[1]
+            _count_api_call(request.methodId or "calendar.request", seconds, exception is not None)
+    return results
+
 
 def format_event_time(event_time):
     """
@@ -130,11 +328,65 @@ def normalize_date_string(date_str: str) -> str:
 
     return date_str
 
-def get_current_time() -> dict:
+def get_zone(timezone_id: str) -> ZoneInfo:
+    """The ZoneInfo of an IANA timezone name, or of DEFAULT_TIMEZONE if it is unknown."""
+    try:
+        return ZoneInfo(timezone_id or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def resolve_calendar_timezone(service):
+    """
+    Read the timezone setting of the user's calendar.
+
+    Args:
+        service: A Google Calendar service object.
+
+    Returns:
+        str: An IANA timezone name (e.g. "Europe/Madrid"), or None if it cannot be read.
+    """
+    try:
+        return service.settings().get(setting="timezone").execute().get("value")
+    except Exception as e:
+        logger.warning(f"Could not read the calendar timezone: {e}")
+        return None
+
+
+def get_user_timezone(state, service=None) -> str:
+    """
+    Get the user's calendar timezone, cached in the session state.
+
+    The timezone is normally resolved at login; sessions without one resolve
+    it on first use, and keep DEFAULT_TIMEZONE (uncached) if that fails.
+
+    Args:
+        state: The session state (e.g. tool_context.state).
+        service: The user's Calendar service, if the caller already has it.
+
+    Returns:
+        str: An IANA timezone name.
+    """
+    timezone_id = state.get("timezone")
+    if timezone_id:
+        return timezone_id
+    if service is None:
+        service = get_calendar_service(state.get("access_token"))
+    timezone_id = resolve_calendar_timezone(service) if service else None
+    if not timezone_id:
+        return DEFAULT_TIMEZONE
+    state["timezone"] = timezone_id
+    return timezone_id
+
+
+def get_current_time(timezone_id: str = None) -> dict:
     """
     Get the current time and date
+
+    Args:
+        timezone_id (str): The user's timezone; the server's local time if omitted.
     """
-    now = datetime.now()
+    now = datetime.now(get_zone(timezone_id)) if timezone_id else datetime.now()
 
     # Format date as MM-DD-YYYY
     formatted_date = now.strftime("%m-%d-%Y")
@@ -142,16 +394,18 @@ def get_current_time() -> dict:
     return {
         "current_time": now.strftime("%Y-%m-%d %H:%M:%S"),
         "formatted_date": formatted_date,
+        "timezone": timezone_id or "server local time",
     }
 
 
-def get_upcoming_events(access_token, days=30, max_results=10):
+def get_upcoming_events(access_token, days=30, max_results=10, user_id=None):
     """
     Get upcoming events from Google Calendar for the specified number of days.
     
     Args:
         days (int): Number of days to look ahead (default: 30)
         max_results (int): Maximum number of events to return (default: 10)
+        user_id (str): Owner of the token, used to key the user's event mirror
     
     Returns:
         list: A list of events in JSON format, or None if there's an error
@@ -163,20 +417,11 @@ def get_upcoming_events(access_token, days=30, max_results=10):
             return None
 
         # Calculate time range
-        now = datetime.utcnow().isoformat() + 'Z'  # 'Z' indicates UTC time
-        future = (datetime.utcnow() + timedelta(days=days)).isoformat() + 'Z'
-
-        # Call the Calendar API
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=now,
-            timeMax=future,
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
+        now = datetime.now(timezone.utc)
+        future = now + timedelta(days=days)
 
-        events = events_result.get('items', [])
+        # Answer from the user's synced event mirror
+        events = query_events(service, user_id or access_token, now, future, max_results)
 
         # Format the events with human-readable time
         formatted_events = []
@@ -198,5 +443,5 @@ def get_upcoming_events(access_token, days=30, max_results=10):
         return formatted_events
 
     except Exception as e:
-        print(f"Error getting upcoming events: {e}")
+        logger.warning(f"Error getting upcoming events: {e}")
         return None
\ No newline at end of file
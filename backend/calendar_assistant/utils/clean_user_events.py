@@ -1,52 +1,101 @@
-from calendar_assistant.utils.calendar_utils import get_calendar_service
+from calendar_assistant.utils.calendar_utils import get_calendar_service, execute_batch
+from calendar_assistant.utils.event_mirror import get_event_mirror
+from calendar_assistant.utils.logs import get_logger
+from calendar_assistant.utils.tracing import traced
 
-def clean_user_events(user_events: list, token) -> list:
+logger = get_logger(__name__)
+
+# Statuses that mean the event is gone for good; anything else (rate limits,
+# server errors) leaves the tracked event untouched until the next cleanup.
+MISSING_STATUSES = (404, 410)
+
+
+def _is_missing(exception) -> bool:
+    status = getattr(getattr(exception, "resp", None), "status", None)
+    return status in MISSING_STATUSES
+
+
+@traced()
+def clean_user_events(user_events: list, token, user_id: str = None) -> list:
     """
     Validate user_events against the actual Google Calendar. Remove missing or cancelled parent/instance events.
 
+    Events are checked against the user's synced event mirror. Those it does not
+    know (e.g. older than the mirrored window) are fetched in Calendar batch
+    requests (50 calls per round-trip) and the resulting deletes are batched as
+    well, so a whole plan reconciles in a handful of round-trips.
+
     Args:
         user_events (list): A list of user event dictionaries.
+        token (str): The user's access token.
+        user_id (str): The user ID, used to key the user's event mirror.
 
     Returns:
         list: A cleaned list of user events.
     """
     service = get_calendar_service(token)
     if not service:
-        print("Google Calendar service initialization failed.")
+        logger.warning("Google Calendar service initialization failed.")
+        return user_events
+
+    try:
+        mirror = get_event_mirror(user_id or token, service)
+    except Exception as e:
+        logger.warning(f"Event mirror unavailable, checking every event: {e}")
+        mirror = None
+
+    events = service.events()
+    results = {}
+    lookups = {}
+    for event in user_events:
+        for event_id in [event.get("parent_event_id")] + event.get("instances", []):
+            if not event_id:
+                continue
+            status = mirror.status(event_id) if mirror else None
+            if status is not None:
+                results[event_id] = ({"id": event_id, "status": status}, None)
+            else:
+                lookups[event_id] = events.get(calendarId="primary", eventId=event_id)
+
+    try:
+        results.update(execute_batch(service, lookups))
+    except Exception as e:
+        logger.warning(f"Error fetching user events from Google Calendar: {e}")
         return user_events
 
     cleaned_user_events = []
+    to_delete = {}
 
     for event in user_events:
         parent_id = event.get("parent_event_id")
         alias = event.get("alias", "Unnamed")
         instances = event.get("instances", [])
 
+        parent, error = results.get(parent_id, (None, None))
+        if not parent_id or _is_missing(error) or (parent and parent.get("status") == "cancelled"):
+            logger.info(f"Parent event {parent_id} for alias '{alias}' does not exist or is cancelled.")
+            # Parent doesn't exist or is cancelled; drop it and delete its instances
+            for instance_id in instances:
+                inst, _ = results.get(instance_id, (None, None))
+                if inst and inst.get("status") != "cancelled":
+                    to_delete[instance_id] = events.delete(calendarId="primary", eventId=instance_id)
+            continue
+
+        # Parent is valid (or could not be checked); now clean instances
+        valid_instances = []
+        for instance_id in instances:
+            inst, inst_error = results.get(instance_id, (None, None))
+            if _is_missing(inst_error) or (inst and inst.get("status") == "cancelled"):
+                continue
+            valid_instances.append(instance_id)
+        event["instances"] = valid_instances
+        cleaned_user_events.append(event)
+
+    if to_delete:
         try:
-            parent = service.events().get(calendarId="primary", eventId=parent_id).execute()
-            if parent.get("status") == "cancelled":
-                service.events().delete(calendarId="primary", eventId=parent_id).execute()
-                raise Exception("Parent event is cancelled")
+            # Instances of a removed plan may already be gone; per-call errors are ignored
+            execute_batch(service, to_delete)
+        except Exception as e:
+            logger.warning(f"Error deleting orphaned events: {e}")
 
-            # Parent is valid; now clean instances
-            valid_instances = []
-            for instance_id in instances:
-                try:
-                    inst = service.events().get(calendarId="primary", eventId=instance_id).execute()
-                    if inst.get("status") != "cancelled":
-                        valid_instances.append(instance_id)
-                except:
-                    continue
-            event["instances"] = valid_instances
-            cleaned_user_events.append(event)
-
-        except:
-            print(f"Parent event {parent_id} for alias '{alias}' does not exist or is cancelled.")
-            # Parent doesn't exist or is cancelled
-            for instance_id in instances:
-                try:
-                    service.events().delete(calendarId="primary", eventId=instance_id).execute()
-                except:
-                    continue
-            # Don't append this parent event
-    return cleaned_user_events
\ No newline at end of file
+    return cleaned_user_events
@@ -0,0 +1,107 @@
+"""
+Index of the events this agent created, by event ID.
+
+``user_events`` is a list of parents (``alias``, ``parent_event_id``,
+``instances``), so telling what an event is meant scanning every parent and
+every instance list. The session state also holds ``event_index``:
+
+    event ID -> {"type", "parent_event_id", "alias"}
+
+where ``type`` is ``single_event`` (a parent without instances),
+``parent_event`` (a parent with instances) or ``recurrent_event`` (an
+instance); parent entries also count their instances. The tools that change
+``user_events`` update the index with it, and a session without one (an older
+session) gets it built on first use.
+"""
+
+INDEX_KEY = "event_index"
+
+
+def _parent_entry(parent_event_id: str, alias: str, instances: int) -> dict:
+    return {
+        "type": "parent_event" if instances else "single_event",
+        "parent_event_id": parent_event_id,
+        "alias": alias,
+        "instances": instances,
+    }
+
+
+def build_event_index(user_events: list) -> dict:
+    """
+    Build the index of a user_events list.
+
+    Args:
+        user_events (list): The user's parent events and their instances.
+
+    Returns:
+        dict: event ID -> type, parent_event_id and alias.
+    """
+    index = {}
+    for event in user_events or []:
+        parent_event_id = event.get("parent_event_id")
+        alias = event.get("alias")
+        instances = event.get("instances") or []
+        for instance_id in instances:
+            index[instance_id] = {"type": "recurrent_event", "parent_event_id": parent_event_id, "alias": alias}
+        if parent_event_id:
+            index[parent_event_id] = _parent_entry(parent_event_id, alias, len(instances))
+    return index
+
+
+def get_event_index(state) -> dict:
+    """Get the session's event index, building it from user_events if the session has none."""
+    index = state.get(INDEX_KEY)
+    if index is None:
+        index = build_event_index(state.get("user_events", []))
+        state[INDEX_KEY] = index
+    return index
+
+
+def lookup_event(state, event_id: str):
+    """
+    Find an event in the index.
+
+    Returns:
+        dict: type, parent_event_id and alias, or None for events this agent did not create.
+    """
+    return get_event_index(state).get(event_id)
+
+
+def index_parent(state, parent_event_id: str, alias: str, instances=(), previous_instances=()):
+    """
+    Add a parent event, or replace its instances.
+
+    Args:
+        parent_event_id (str): The parent event ID.
+        alias (str): The parent's alias.
+        instances: The parent's instance IDs.
+        previous_instances: The instance IDs it had before, to drop from the index.
+    """
+    index = get_event_index(state)
+    for instance_id in previous_instances:
+        index.pop(instance_id, None)
+    for instance_id in instances:
+        index[instance_id] = {"type": "recurrent_event", "parent_event_id": parent_event_id, "alias": alias}
+    index[parent_event_id] = _parent_entry(parent_event_id, alias, len(instances))
+    state[INDEX_KEY] = index
+
+
+def unindex_parent(state, parent_event_id: str, instances=()):
+    """Remove a parent event and its instances from the index."""
+    index = get_event_index(state)
+    for instance_id in instances:
+        index.pop(instance_id, None)
+    index.pop(parent_event_id, None)
+    state[INDEX_KEY] = index
+
+
+def unindex_instance(state, instance_id: str):
+    """Remove one instance; a parent left without instances becomes a single event."""
+    index = get_event_index(state)
+    entry = index.pop(instance_id, None)
+    parent = index.get(entry["parent_event_id"]) if entry else None
+    if parent is not None:
+        index[parent["parent_event_id"]] = _parent_entry(
+            parent["parent_event_id"], parent["alias"], max(parent.get("instances", 0) - 1, 0)
+        )
+    state[INDEX_KEY] = index
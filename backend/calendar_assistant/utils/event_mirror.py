@@ -0,0 +1,240 @@
+"""
+Per-user local mirror of Google Calendar events kept fresh with sync tokens.
+
+The first read for a user does a full sync of the primary calendar (single
+events from MIRROR_PAST_DAYS ago onwards); every later read only asks Google for
+what changed since the last ``nextSyncToken``. When Google answers 410 Gone the
+token has expired and the mirror is rebuilt with a full sync.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from googleapiclient.errors import HttpError
+
+from calendar_assistant.utils.logs import get_logger
+
+logger = get_logger(__name__)
+
+MIRROR_PAST_DAYS = int(os.environ.get("MIRROR_PAST_DAYS", 30))
+MIRROR_MAX_USERS = int(os.environ.get("MIRROR_MAX_USERS", 512))
+# Reads within this many seconds of a sync are answered without asking Google
+MIRROR_FRESHNESS_SECONDS = float(os.environ.get("MIRROR_FRESHNESS_SECONDS", 0))
+
+_mirrors = OrderedDict()  # user key -> EventMirror
+_mirrors_lock = threading.Lock()
+
+
+def _event_time(event_time: dict) -> datetime:
+    if "dateTime" in event_time:
+        dt = datetime.fromisoformat(event_time["dateTime"].replace("Z", "+00:00"))
+    else:
+        dt = datetime.fromisoformat(event_time.get("date", "1970-01-01"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _event_start(event: dict) -> datetime:
+    return _event_time(event.get("start", {}))
+
+
+def _event_end(event: dict) -> datetime:
+    return _event_time(event.get("end", event.get("start", {})))
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class EventMirror:
+    """
+    Local copy of one user's primary calendar.
+
+    Attributes:
+        events (dict): Event ID -> event resource for every live event.
+        cancelled (set): IDs Google reported as deleted since the full sync.
+        window_start (datetime): Earliest start time covered by the mirror.
+    """
+
+    def __init__(self):
+        self.events = {}
+        self.cancelled = set()
+        self.sync_token = None
+        self.window_start = None
+        self.last_sync = 0.0
+        self.stats = {"full_syncs": 0, "incremental_syncs": 0, "changes": 0, "resyncs_after_410": 0}
+        self._lock = threading.Lock()
+
+    def sync(self, service):
+        """
+        Bring the mirror up to date, fetching only the changes when possible.
+
+        Args:
+            service: A Google Calendar service object.
+        """
+        with self._lock:
+            if self.sync_token and time.monotonic() - self.last_sync < MIRROR_FRESHNESS_SECONDS:
+                return
+            if self.sync_token:
+                try:
+                    self._fetch(service, syncToken=self.sync_token)
+                    self.stats["incremental_syncs"] += 1
+                    return
+                except HttpError as e:
+                    if e.resp.status != 410:
+                        raise
+                    # Sync token expired: start over
+                    self.stats["resyncs_after_410"] += 1
+            self._full_sync(service)
+
+    def _full_sync(self, service):
+        window_start = datetime.now(timezone.utc) - timedelta(days=MIRROR_PAST_DAYS)
+        self.events = {}
+        self.cancelled = set()
+        self.sync_token = None
+        self._fetch(service, timeMin=window_start.isoformat())
+        self.window_start = window_start
+        self.stats["full_syncs"] += 1
+
+    def _fetch(self, service, **params):
+        page_token = None
+        while True:
+            result = service.events().list(
+                calendarId="primary",
+                singleEvents=True,
+                showDeleted=True,
+                pageToken=page_token,
+                **params,
+            ).execute()
+            for event in result.get("items", []):
+                self.stats["changes"] += 1
+                if event.get("status") == "cancelled":
+                    self.events.pop(event["id"], None)
+                    self.cancelled.add(event["id"])
+                else:
+                    self.events[event["id"]] = event
+                    self.cancelled.discard(event["id"])
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                self.sync_token = result.get("nextSyncToken")
+                self.last_sync = time.monotonic()
+                return
+
+    def covers(self, time_min: datetime) -> bool:
+        """Whether events starting at or after time_min are all in the mirror."""
+        return self.window_start is not None and _as_utc(time_min) >= self.window_start
+
+    def query(self, time_min: datetime, time_max: datetime, max_results: int) -> list:
+        """
+        Events overlapping [time_min, time_max), ordered by start time, like
+        events().list(timeMin=..., timeMax=..., singleEvents=True, orderBy="startTime").
+
+        Args:
+            time_min (datetime): Lower bound (naive values are taken as UTC).
+            time_max (datetime): Upper bound (naive values are taken as UTC).
+            max_results (int): Maximum number of events to return.
+
+        Returns:
+            list: Event resources as returned by the Calendar API.
+        """
+        time_min, time_max = _as_utc(time_min), _as_utc(time_max)
+        with self._lock:
+            matches = [
+                event for event in self.events.values()
+                if _event_end(event) > time_min and _event_start(event) < time_max
+            ]
+        matches.sort(key=_event_start)
+        return matches[:max_results]
+
+    def status(self, event_id: str):
+        """
+        Look up an event by ID.
+
+        Returns:
+            str: "live", "cancelled", or None if the mirror does not know the event
+            (e.g. it starts before the mirrored window).
+        """
+        with self._lock:
+            if event_id in self.events:
+                return "live"
+            if event_id in self.cancelled:
+                return "cancelled"
+            return None
+
+
+def get_event_mirror(user_key: str, service) -> EventMirror:
+    """
+    Get the synced mirror for a user, creating it with a full sync on first use.
+
+    Args:
+        user_key (str): Identifies the user (user ID, or the access token if unknown).
+        service: A Google Calendar service object for that user.
+
+    Returns:
+        EventMirror: The user's mirror, synced with Google Calendar.
+    """
+    with _mirrors_lock:
+        mirror = _mirrors.get(user_key)
+        if mirror is None:
+            mirror = EventMirror()
+            _mirrors[user_key] = mirror
+        _mirrors.move_to_end(user_key)
+        while len(_mirrors) > MIRROR_MAX_USERS:
+            _mirrors.popitem(last=False)
+    mirror.sync(service)
+    return mirror
+
+
+def query_events(service, user_key: str, time_min: datetime, time_max: datetime, max_results: int) -> list:
+    """
+    List a user's events in a time range, from the mirror whenever it covers the range.
+
+    Ranges starting before the mirrored window, or a failed sync, fall back to
+    a direct events().list call.
+
+    Args:
+        service: A Google Calendar service object.
+        user_key (str): Identifies the user (user ID, or the access token if unknown).
+        time_min (datetime): Lower bound (naive values are taken as UTC).
+        time_max (datetime): Upper bound (naive values are taken as UTC).
+        max_results (int): Maximum number of events to return.
+
+    Returns:
+        list: Event resources ordered by start time.
+    """
+    try:
+        mirror = get_event_mirror(user_key, service)
+        if mirror.covers(time_min):
+            return mirror.query(time_min, time_max, max_results)
+    except Exception as e:
+        logger.warning(f"Event mirror unavailable, listing from Google Calendar: {e}")
+
+    events_result = service.events().list(
+        calendarId="primary",
+        timeMin=_as_utc(time_min).isoformat(),
+        timeMax=_as_utc(time_max).isoformat(),
+        maxResults=max_results,
+        singleEvents=True,
+        orderBy="startTime",
+    ).execute()
+    return events_result.get("items", [])
+
+
+def drop_event_mirror(user_key: str):
+    """Forget a user's mirror (e.g. on logout or a token for another account)."""
+    with _mirrors_lock:
+        _mirrors.pop(user_key, None)
+
+
+def get_event_mirror_stats() -> dict:
+    """
+    Get the number of mirrors held and of events they hold.
+
+    Returns:
+        dict: mirrors and events.
+    """
+    with _mirrors_lock:
+        mirrors = list(_mirrors.values())
+    return {"mirrors": len(mirrors), "events": sum(len(m.events) for m in mirrors)}
@@ -1,10 +1,55 @@
-
-from langchain.schema import HumanMessage
-from langchain_openai import ChatOpenAI
-from calendar_assistant.utils.calendar_utils import get_calendar_service
+import ast
+import json
+from datetime import datetime, timedelta, timezone
+from pydantic import BaseModel, ValidationError, field_validator, model_validator
+from calendar_assistant.utils.calendar_utils import get_calendar_service, get_zone
+from calendar_assistant.utils import llm
+from calendar_assistant.utils.logs import get_logger
+from calendar_assistant.utils.tracing import traced
 from dateutil import parser
 from google.adk.tools.tool_context import ToolContext
 
+logger = get_logger(__name__)
+
+WEEK_DAYS = ["sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]
+
+
+class EventDateTime(BaseModel):
+    dateTime: str
+    timeZone: str = ""
+
+    @field_validator("dateTime")
+    @classmethod
+    def _check_date_time(cls, value):
+        datetime.fromisoformat(value)
+        return value
+
+
+class DayEvent(BaseModel):
+    """A Google Calendar event body for one training day."""
+    summary: str
+    description: str = ""
+    start: EventDateTime
+    end: EventDateTime
+    recurrence: list[str] = []
+
+    @model_validator(mode="after")
+    def _check_end_after_start(self):
+        if datetime.fromisoformat(self.end.dateTime) <= datetime.fromisoformat(self.start.dateTime):
+            raise ValueError("end must be after start")
+        return self
+
+
+class WeekEvents(BaseModel):
+    """One training event per day of the week."""
+    sunday: DayEvent
+    monday: DayEvent
+    tuesday: DayEvent
+    wednesday: DayEvent
+    thursday: DayEvent
+    friday: DayEvent
+    saturday: DayEvent
+
 
 def get_summary(user_input: str, parent_event_summary: str) -> str:
     """
@@ -17,8 +62,6 @@ def get_summary(user_input: str, parent_event_summary: str) -> str:
     Returns:
         str: A generated summary based on the provided inputs.
     """
-    model = ChatOpenAI(model='gpt-4.1')
-
     prompt = f"""
     You are a helpful assistant that generates a summary based on user input and an optional parent event summary.
     Your summary will be used to do some research and planning for the user.
@@ -30,10 +73,9 @@ def get_summary(user_input: str, parent_event_summary: str) -> str:
 
     # prompt = load_prompt('prompts/summary_generator.txt', variables)
     try:
-        answer = model.invoke([HumanMessage(content=prompt)])
-        answer_content = answer.content
+        answer_content = llm.invoke_cached(prompt, "get_summary")
     except Exception as e:
-        print(f"Error generating summary: {e}")
+        logger.warning(f"Error generating summary: {e}")
         return None
 
     return answer_content.strip() if answer_content else None
@@ -66,18 +108,18 @@ def get_summary_from_event_id(event_id: str, token) -> str:
     formatted_date = dt.strftime("%Y%m%d")   
 
     if not event:
-        print(f"Evento con ID {event_id} no encontrado.")
+        logger.warning(f"Evento con ID {event_id} no encontrado.")
         return None
 
     # EXtract summary
     summary = event.get('summary', 'Untitled')
-    print(f"Resumen del evento: {summary}")
+    logger.debug(f"Resumen del evento: {summary}")
 
     return summary, formatted_date
 
 
-def get_day_event(day, date, availability, weekly_plan, parsed_date):
-    model = ChatOpenAI(model='gpt-4.1')
+@traced()
+def get_day_event(day, date, availability, weekly_plan, parsed_date, timezone_id):
     prompt = f"""
     You are a helpful assistant that generates a json-formatted event based on the availability, weekly plan path, and count.
     The day event you generate must be according to the provided day of the week.
@@ -94,23 +136,149 @@ def get_day_event(day, date, availability, weekly_plan, parsed_date):
     'description': 'Description of the event',
     'start': {{
         'dateTime': 'yyyy-mm-ddThh:mm:00',
-        'timeZone': 'America/Mexico_City',
+        'timeZone': '{timezone_id}',
     }},
     'end': {{
         'dateTime': 'yyyy-mm-ddThh:mm:00',
-        'timeZone': 'America/Mexico_City',
+        'timeZone': '{timezone_id}',
     }},
     'recurrence': [
-        'RRULE:FREQ=WEEKLY;UNTIL={parsed_date}T050000Z'
+        'RRULE:FREQ=WEEKLY;UNTIL={_until(parsed_date, timezone_id)}'
     ]
 }}
 ```
     """
     try:
-        answer = model.invoke([HumanMessage(content=prompt)])
-        answer_content = answer.content
+        # Only answers that make a valid event are worth replaying
+        answer_content = llm.invoke_cached(
+            prompt, "get_day_event", accept=lambda text: parse_day_event(text, parsed_date, timezone_id, date) is not None
+        )
     except Exception as e:
-        print(f"Error generating summary: {e}")
+        logger.warning(f"Error generating the {day} event: {e}")
+        return None
+
+    return answer_content.strip() if answer_content else None
+
+
+def _until(parsed_date, timezone_id) -> str:
+    """The RRULE UNTIL value for the start of parsed_date (YYYYMMDD) in the user's timezone."""
+    day = datetime.strptime(str(parsed_date), "%Y%m%d").replace(tzinfo=get_zone(timezone_id))
+    return day.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _finalize_event(event: DayEvent, parsed_date, timezone_id, date=None) -> dict:
+    """
+    Turn a validated DayEvent into an insert body that repeats weekly until
+    parsed_date. An event that does not start on its assigned date is moved
+    there, keeping its times.
+    """
+    body = event.model_dump()
+    if date is not None:
+        date = date.date() if isinstance(date, datetime) else date
+        start = datetime.fromisoformat(event.start.dateTime)
+        if start.date() != date:
+            logger.warning(f"Day event generated on {start.date()} instead of {date}, moving it")
+            shift = date - start.date()
+            for bound in ("start", "end"):
+                body[bound]["dateTime"] = (datetime.fromisoformat(body[bound]["dateTime"]) + shift).isoformat()
+    for bound in ("start", "end"):
+        body[bound]["timeZone"] = body[bound]["timeZone"] or timezone_id
+    body["recurrence"] = [f"RRULE:FREQ=WEEKLY;UNTIL={_until(parsed_date, timezone_id)}"]
+    return body
+
+
+def parse_day_event(text: str, parsed_date, timezone_id, date=None):
+    """
+    Validate a day event generated as text (e.g. by get_day_event).
+
+    Args:
+        text (str): Model output containing one JSON (or Python-literal) object.
+        parsed_date: Date the recurrence must end on (YYYYMMDD).
+        timezone_id (str): The user's timezone, for times given without one.
+        date: The day the event must start on, if any (it is moved there).
+
+    Returns:
+        dict: The event body ready for events().insert, or None if it is invalid.
+    """
+    if not text or "{" not in text:
         return None
+    candidate = text[text.index("{"):text.rindex("}") + 1]
+    try:
+        data = json.loads(candidate)
+    except ValueError:
+        try:
+            # The prompt's own example uses single quotes
+            data = ast.literal_eval(candidate)
+        except (ValueError, SyntaxError):
+            return None
+    try:
+        return _finalize_event(DayEvent.model_validate(data), parsed_date, timezone_id, date)
+    except ValidationError as e:
+        logger.warning(f"Invalid day event: {e}")
+        return None
+
+
+@traced()
+def get_week_events(sunday_date, availability, weekly_plan, parsed_date, timezone_id) -> dict:
+    """
+    Generate the events of the whole training week with one structured LLM call.
+
+    Args:
+        sunday_date (datetime): The Sunday that opens the week.
+        availability: The user's schedule preferences.
+        weekly_plan (str): The researched weekly training plan.
+        parsed_date: Date the recurrences must end on (YYYYMMDD).
+        timezone_id (str): The user's timezone (IANA name).
+
+    Returns:
+        dict: Day name -> event body for every day that passed validation, each
+        starting on its date of the week. Days missing from the result should be
+        generated on their own.
+    """
+    day_dates = {day: sunday_date + timedelta(days=offset) for offset, day in enumerate(WEEK_DAYS)}
+    dates = "\n".join(f"    - {day}: {date.strftime('%Y-%m-%d')}" for day, date in day_dates.items())
+    prompt = f"""
+    You are a helpful assistant that generates the calendar events of a training week based on the availability and weekly plan.
+    Generate exactly one event per day of the week, on these dates:
+{dates}
+
+    Availability: {availability} (24-hour format, e.g., 6-8 means 6 AM to 8 AM)
+    Weekly Plan: {weekly_plan}
+
+    Each event has a summary, a description of the session, and start and end
+    dateTime values formatted as yyyy-mm-ddThh:mm:00 with timeZone '{timezone_id}'.
+    """
+    try:
+        answer = llm.invoke_structured_cached(prompt, WeekEvents, "get_week_events")
+    except Exception as e:
+        logger.warning(f"Error generating week events: {e}")
+        return {}
+
+    if answer.get("parsed") is not None:
+        return {
+            day: _finalize_event(getattr(answer["parsed"], day), parsed_date, timezone_id, day_dates[day])
+            for day in WEEK_DAYS
+        }
+
+    # Repair: keep the days that validate on their own
+    logger.warning(f"Week events failed validation, keeping valid days: {answer.get('parsing_error')}")
+    raw = answer.get("raw")
+    try:
+        if getattr(raw, "tool_calls", None):
+            data = raw.tool_calls[0]["args"]
+        else:
+            data = json.loads(raw.content)
+    except (ValueError, TypeError, AttributeError, IndexError):
+        return {}
+    if not isinstance(data, dict):
+        # e.g. a list of days: every day is generated on its own
+        return {}
+    events = {}
+    for day in WEEK_DAYS:
+        try:
+            event = DayEvent.model_validate(data.get(day))
+        except ValidationError:
+            continue
+        events[day] = _finalize_event(event, parsed_date, timezone_id, day_dates[day])
+    return events
 
-    return answer_content.strip() if answer_content else None
\ No newline at end of file
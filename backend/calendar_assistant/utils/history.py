@@ -0,0 +1,221 @@
+"""
+Compact interaction_history for the agents' instructions.
+
+The instructions used to inline the raw history (up to 50 dicts with
+timestamps) on every LLM call, tool steps included. ``instruction_with_history``
+turns an instruction template into an ADK instruction provider that renders
+``{interaction_history}`` as:
+
+- the latest HISTORY_RECENT_ENTRIES interactions verbatim, and
+- a summary of the older ones: a short line for each of the newest
+  HISTORY_SUMMARY_LINES, and a single line counting the rest and naming
+  their most frequent topics,
+
+trimmed to a token budget per agent (oldest summary lines first), so the
+summary stays the same size however long the history gets. It is extractive,
+so building it costs no LLM call, and the rendered block is cached per session
+and history version, so the tool steps of a turn reuse it.
+"""
+
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from google.adk.utils.instructions_utils import inject_session_state
+
+HISTORY_RECENT_ENTRIES = int(os.environ.get("HISTORY_RECENT_ENTRIES", 6))
+SUMMARY_LINE_CHARS = int(os.environ.get("HISTORY_SUMMARY_LINE_CHARS", 120))
+HISTORY_SUMMARY_LINES = int(os.environ.get("HISTORY_SUMMARY_LINES", 8))
+SUMMARY_TOPICS = 6
+_STOPWORDS = frozenset("""
+    about after again also because been before being could does doing from have having here
+    just like make more most much need next only other please really same should some than
+    that their them then there these they this those through very want what when where which
+    while will with would your yours
+""".split())
+_PLACEHOLDER = "{interaction_history}"
+
+_cache = OrderedDict()  # (agent, session ID, history version) -> (rendered, raw tokens, tokens)
+_CACHE_SIZE = 1024
+_lock = threading.Lock()
+_stats = {}  # agent -> counters
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens of a text for the GPT-4.1 tokenizer, or an estimate if tiktoken is unavailable."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _speaker(entry: dict) -> str:
+    if entry.get("action") == "user_query":
+        return "user"
+    return entry.get("agent") or entry.get("action", "unknown")
+
+
+def _text(entry: dict) -> str:
+    text = entry.get("query") if entry.get("action") == "user_query" else entry.get("response")
+    if text is None:
+        text = ", ".join(f"{k}: {v}" for k, v in entry.items() if k not in ("action", "timestamp"))
+    return " ".join(str(text).split())
+
+
+def _line(entry: dict, limit: int = None) -> str:
+    text = _text(entry)
+    if limit and len(text) > limit:
+        text = text[:limit - 1].rstrip() + "…"
+    timestamp = entry.get("timestamp", "")[:16]
+    return f"[{timestamp}] {_speaker(entry)}: {text}" if timestamp else f"{_speaker(entry)}: {text}"
+
+
+def _merged_line(entries: list) -> str:
+    """One line for many interactions: how many, when, and their most frequent topics."""
+    queries = [entry for entry in entries if entry.get("action") == "user_query"] or entries
+    words = Counter(
+        word for entry in queries for word in re.findall(r"[a-z]{4,}", _text(entry).lower())
+        if word not in _STOPWORDS
+    )
+    line = f"{len(entries)} earlier interactions"
+    first, last = entries[0].get("timestamp", "")[:10], entries[-1].get("timestamp", "")[:10]
+    if first and last:
+        line += f" ({first})" if first == last else f" ({first} to {last})"
+    topics = [word for word, _ in words.most_common(SUMMARY_TOPICS)]
+    return f"{line}, about: {', '.join(topics)}" if topics else line
+
+
+def compact_history(history: list, budget_tokens: int) -> str:
+    """
+    Render the interaction history within a token budget.
+
+    Args:
+        history (list): interaction_history entries, oldest first.
+        budget_tokens (int): Tokens the rendered history may take.
+
+    Returns:
+        str: Recent interactions verbatim, preceded by a summary of older ones.
+    """
+    if not history:
+        return "(no previous interactions)"
+    recent = [_line(entry) for entry in history[-HISTORY_RECENT_ENTRIES:]]
+    older = list(history[:-len(recent)])
+
+    # Verbatim turns go first; whatever budget is left holds the newest summary lines
+    used = sum(count_tokens(line) + 1 for line in recent)
+    while recent and used > budget_tokens and len(recent) > 1:
+        used -= count_tokens(recent[0]) + 1
+        older.append(history[-len(recent)])
+        recent.pop(0)
+    if used > budget_tokens:
+        # A single huge interaction: keep its beginning
+        recent[0] = recent[0][:budget_tokens * 4].rstrip() + "…"
+        used = count_tokens(recent[0]) + 1
+    summary = []
+    header = "Summary of earlier interactions"
+    # The headers around the summary, paid for by its first line
+    headers = count_tokens(f"{header} ({len(older)} older omitted):\nMost recent interactions:") + 2
+    for entry in reversed(older[-HISTORY_SUMMARY_LINES:] if HISTORY_SUMMARY_LINES > 0 else []):
+        line = _line(entry, SUMMARY_LINE_CHARS)
+        cost = count_tokens(f"- {line}") + 1 + (0 if summary else headers)
+        if used + cost > budget_tokens:
+            break
+        summary.append(line)
+        used += cost
+    summary.reverse()
+    # Everything older shares one line, if it fits
+    merged = older[:len(older) - len(summary)]
+    if merged:
+        line = _merged_line(merged)
+        if used + count_tokens(f"- {line}") + 1 + (0 if summary else headers) <= budget_tokens:
+            summary.insert(0, line)
+            merged = []
+
+    parts = []
+    if summary:
+        parts.append(f"{header} ({len(merged)} older omitted):" if merged else f"{header}:")
+        parts.extend(f"- {line}" for line in summary)
+        parts.append("Most recent interactions:")
+    parts.extend(recent)
+    return "\n".join(parts)
+
+
+def _record(agent_name: str, raw_tokens: int, tokens: int, instruction_tokens: int):
+    with _lock:
+        stats = _stats.setdefault(agent_name, {
+            "llm_calls": 0, "history_tokens_raw": 0, "history_tokens": 0, "instruction_tokens": 0,
+        })
+        stats["llm_calls"] += 1
+        stats["history_tokens_raw"] += raw_tokens
+        stats["history_tokens"] += tokens
+        stats["instruction_tokens"] += instruction_tokens
+
+
+def instruction_with_history(template: str, agent_name: str, budget_tokens: int):
+    """
+    Build an instruction provider rendering {interaction_history} compactly.
+
+    Args:
+        template (str): The agent instruction, with ADK {state} placeholders.
+        agent_name (str): Name used in the token report.
+        budget_tokens (int): Tokens the history may take in this agent's prompt.
+
+    Returns:
+        An async InstructionProvider for ``Agent(instruction=...)``.
+    """
+    before, _, after = template.partition(_PLACEHOLDER)
+
+    async def provider(context) -> str:
+        history = context.state.get("interaction_history", [])
+        key = (
+            agent_name, context.session.id, len(history),
+            history[-1].get("timestamp") if history else None,
+            history[0].get("timestamp") if history else None,
+        )
+        with _lock:
+            cached = _cache.get(key)
+            if cached is not None:
+                _cache.move_to_end(key)
+        if cached is None:
+            rendered = compact_history(history, budget_tokens)
+            cached = (rendered, count_tokens(str(history)), count_tokens(rendered))
+            with _lock:
+                _cache[key] = cached
+                while len(_cache) > _CACHE_SIZE:
+                    _cache.popitem(last=False)
+        rendered, raw_tokens, tokens = cached
+
+        # Inject the other placeholders around the history only: user text may contain braces
+        instruction = await inject_session_state(before, context)
+        if _PLACEHOLDER in template:
+            instruction += rendered + await inject_session_state(after, context)
+        _record(agent_name, raw_tokens, tokens, count_tokens(instruction))
+        return instruction
+
+    return provider
+
+
+def get_history_stats() -> dict:
+    """
+    Get history tokens per agent, raw vs compacted.
+
+    Returns:
+        dict: agent -> llm_calls, totals and per-call averages of
+        history_tokens_raw (the old inlined list), history_tokens and
+        instruction_tokens.
+    """
+    with _lock:
+        report = {agent: dict(stats) for agent, stats in _stats.items()}
+    for stats in report.values():
+        calls = stats["llm_calls"] or 1
+        for name in ("history_tokens_raw", "history_tokens", "instruction_tokens"):
+            stats[f"{name}_per_call"] = stats[name] / calls
+    return report
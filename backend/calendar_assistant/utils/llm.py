@@ -0,0 +1,176 @@
+"""
+Shared chat model for the planning helpers, with a prompt-hash response cache.
+
+``helpers.get_summary``, ``get_day_event`` and ``get_week_events`` used to
+build a new ChatOpenAI client per call. They now share one client, and their
+answers are cached by the SHA-256 of (model, prompt) in a PersistentCache, so
+retries, adjust_planning re-runs and users with the same event type get an
+identical prompt answered from memory or disk. Only answers the caller
+accepts are cached, so a bad answer is never replayed.
+
+Every call is an "llm.<helper>" span recording whether it hit the cache and
+the tokens it used.
+
+``set_chat_model`` swaps the client, e.g. for a stub that answers offline.
+LangChain and the OpenAI SDK take seconds to import, so they are imported on
+the first call rather than at startup.
+"""
+
+import hashlib
+import os
+import threading
+
+from calendar_assistant.utils.cache import PersistentCache
+from calendar_assistant.utils.tracing import span
+
+HELPER_LLM_MODEL = os.environ.get("HELPER_LLM_MODEL", "gpt-4.1")
+
+_response_cache = PersistentCache(
+    "llm_responses",
+    ttl=float(os.environ.get("LLM_CACHE_TTL_SECONDS", 24 * 3600)),
+    max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 5000)),
+    memory_entries=int(os.environ.get("LLM_CACHE_MEMORY_ENTRIES", 512)),
+)
+_model = None
+_structured = {}  # schema -> structured-output runnable of the current model
+_lock = threading.Lock()
+_stats = {}  # helper -> counters
+
+
+def get_chat_model():
+    """Get the shared chat model, creating the ChatOpenAI client on first use."""
+    global _model
+    with _lock:
+        if _model is None:
+            from langchain_openai import ChatOpenAI
+
+            _model = ChatOpenAI(model=HELPER_LLM_MODEL)
+        return _model
+
+
+def set_chat_model(model):
+    """
+    Replace the shared chat model (e.g. with an offline stub).
+
+    Args:
+        model: Anything with ``invoke(messages)`` and ``with_structured_output``
+            like a LangChain chat model, or None to go back to ChatOpenAI.
+
+    Returns:
+        The previous model.
+    """
+    global _model
+    with _lock:
+        previous, _model = _model, model
+        _structured.clear()
+    return previous
+
+
+def _structured_model(schema):
+    model = get_chat_model()
+    with _lock:
+        runnable = _structured.get(schema)
+        if runnable is None:
+            runnable = model.with_structured_output(schema, method="json_schema", include_raw=True)
+            _structured[schema] = runnable
+        return runnable
+
+
+def _count(helper: str, key: str, amount: int = 1):
+    with _lock:
+        stats = _stats.setdefault(helper, {
+            "calls": 0, "cache_hits": 0, "llm_calls": 0, "input_tokens": 0, "output_tokens": 0,
+        })
+        stats[key] += amount
+
+
+def _record_usage(helper: str, message, current):
+    usage = getattr(message, "usage_metadata", None) or {}
+    _count(helper, "llm_calls")
+    _count(helper, "input_tokens", usage.get("input_tokens", 0))
+    _count(helper, "output_tokens", usage.get("output_tokens", 0))
+    current.set_attribute("llm.input_tokens", usage.get("input_tokens", 0))
+    current.set_attribute("llm.output_tokens", usage.get("output_tokens", 0))
+
+
+def _messages(prompt: str) -> list:
+    from langchain_core.messages import HumanMessage
+
+    return [HumanMessage(content=prompt)]
+
+
+def _key(prompt: str, schema=None) -> str:
+    name = getattr(get_chat_model(), "model_name", HELPER_LLM_MODEL)
+    text = f"{name}\n{schema.__name__ if schema else ''}\n{prompt}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def invoke_cached(prompt: str, helper: str, accept=None) -> str:
+    """
+    Answer a prompt, from the cache when the same prompt was answered before.
+
+    Args:
+        prompt (str): The whole prompt, sent as one human message.
+        helper (str): Name of the calling helper, for the stats.
+        accept: Optional check on the answer text; rejected answers are not cached.
+
+    Returns:
+        str: The answer text.
+    """
+    _count(helper, "calls")
+    with span(f"llm.{helper}", prompt_chars=len(prompt)) as current:
+        key = _key(prompt)
+        cached = _response_cache.get(key)
+        current.set_attribute("llm.cache_hit", cached is not None)
+        if cached is not None:
+            _count(helper, "cache_hits")
+            return cached
+        answer = get_chat_model().invoke(_messages(prompt))
+        _record_usage(helper, answer, current)
+        text = answer.content or ""
+        if text and (accept is None or accept(text)):
+            _response_cache.set(key, text)
+        return text
+
+
+def invoke_structured_cached(prompt: str, schema, helper: str) -> dict:
+    """
+    Answer a prompt with structured output, caching answers that validate.
+
+    Args:
+        prompt (str): The whole prompt, sent as one human message.
+        schema: The pydantic model of the answer.
+        helper (str): Name of the calling helper, for the stats.
+
+    Returns:
+        dict: "parsed" (a schema instance or None), "raw" and "parsing_error",
+        as LangChain's ``with_structured_output(include_raw=True)`` returns.
+    """
+    _count(helper, "calls")
+    with span(f"llm.{helper}", prompt_chars=len(prompt), schema=schema.__name__) as current:
+        key = _key(prompt, schema)
+        cached = _response_cache.get(key)
+        current.set_attribute("llm.cache_hit", cached is not None)
+        if cached is not None:
+            _count(helper, "cache_hits")
+            return {"parsed": schema.model_validate(cached), "raw": None, "parsing_error": None}
+        answer = _structured_model(schema).invoke(_messages(prompt))
+        _record_usage(helper, answer.get("raw"), current)
+        current.set_attribute("llm.parsed", answer.get("parsed") is not None)
+        if answer.get("parsed") is not None:
+            _response_cache.set(key, answer["parsed"].model_dump())
+        return answer
+
+
+def get_llm_stats() -> dict:
+    """
+    Get per-helper LLM counters and the response cache counters.
+
+    Returns:
+        dict: helper -> calls, cache_hits, llm_calls, input_tokens and
+        output_tokens, plus "response_cache".
+    """
+    with _lock:
+        stats = {helper: dict(counters) for helper, counters in _stats.items()}
+    stats["response_cache"] = _response_cache.stats()
+    return stats
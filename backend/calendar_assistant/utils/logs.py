@@ -0,0 +1,218 @@
+"""
+Structured logging for the backend and the agent's tools.
+
+Every module logs through ``get_logger(__name__)`` into the "fytai" logger
+tree, configured here once:
+
+- LOG_LEVEL (default INFO) sets the level; debug dumps such as the session
+  state around a turn are skipped before any work is done unless DEBUG is on.
+- DEBUG records are sampled per user: LOG_DEBUG_SAMPLE_RATE of the users
+  (chosen by a hash of the user ID, so a sampled user is traced for whole
+  turns) plus everyone in LOG_DEBUG_USERS (comma-separated).
+- Access tokens and other secrets are redacted from messages and fields.
+  Output that leaves the logs (traces, the debug routes) names users by
+  ``user_ref``, never by user ID: the user ID is what the chat endpoints
+  authenticate with.
+- Records go through a bounded queue to a background thread that formats
+  and writes them (LOG_FORMAT json or text, to stderr), so request threads
+  never block on stdout; when the queue is full records are dropped and
+  counted.
+
+``log_context(user_id=..., session_id=...)`` attaches fields to every record
+logged in the current context (threads started from it included, when they
+copy the context). Structured data goes in ``extra={"fields": {...}}``; a
+"user_id" field there also selects the user for sampling.
+"""
+
+import atexit
+import contextvars
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", 0.01))
+LOG_DEBUG_USERS = {u for u in os.environ.get("LOG_DEBUG_USERS", "").split(",") if u}
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+# Key of the user_ref hashes; without one they only match within a process
+USER_REF_KEY = os.environ.get("USER_REF_KEY", "").encode("utf-8") or os.urandom(16)
+
+ROOT_LOGGER = "fytai"
+REDACTED = "[redacted]"
+_SECRET_KEYS = {"access_token", "accesstoken", "refresh_token", "token", "authorization", "api_key", "password"}
+_SECRET_PATTERN = re.compile(r"(ya29\.[\w\-.]+|Bearer\s+[\w\-.=]+|sk-[\w\-]{16,})")
+
+_context = contextvars.ContextVar("log_context", default={})
+_configured = False
+_configure_lock = threading.Lock()
+_stats = {"dropped": 0}
+_queue = None
+
+
+def redact(value):
+    """
+    Copy a value with secrets masked: values of secret-looking keys and
+    token-looking substrings.
+    """
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if str(k).lower() in _SECRET_KEYS else redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    if isinstance(value, str):
+        return _SECRET_PATTERN.sub(REDACTED, value)
+    return value
+
+
+def sampled(user_id) -> bool:
+    """Whether DEBUG records of a user are kept."""
+    if user_id is None:
+        return LOG_DEBUG_SAMPLE_RATE >= 1
+    if user_id in LOG_DEBUG_USERS:
+        return True
+    bucket = int(hashlib.sha1(str(user_id).encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+    return bucket < LOG_DEBUG_SAMPLE_RATE
+
+
+def user_ref(user_id) -> str:
+    """A stable pseudonym of a user (keyed hash), for output that must not reveal the user ID."""
+    return hmac.new(USER_REF_KEY, str(user_id).encode("utf-8"), hashlib.sha256).hexdigest()[:16]
+
+
+def debug_enabled(logger: logging.Logger, user_id=None) -> bool:
+    """
+    Whether a DEBUG record for this user would be written; check it before
+    building an expensive debug payload.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    if user_id is None:
+        user_id = _context.get().get("user_id")
+    return sampled(user_id)
+
+
+@contextmanager
+def log_context(**fields):
+    """Attach fields (e.g. user_id, session_id) to the records logged in this context."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class _ContextFilter(logging.Filter):
+    """Runs in the caller's thread: captures the context and applies DEBUG sampling."""
+
+    def filter(self, record):
+        context = _context.get()
+        if record.levelno <= logging.DEBUG:
+            user_id = (getattr(record, "fields", None) or {}).get("user_id", context.get("user_id"))
+            if not sampled(user_id):
+                return False
+        record.context = context
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    """Enqueues records unformatted and never blocks: the listener thread formats them."""
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _stats["dropped"] += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, context and fields."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+        }
+        entry.update(getattr(record, "context", {}))
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(redact(fields))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = redact(super().format(record))
+        extra = {**getattr(record, "context", {}), **redact(getattr(record, "fields", None) or {})}
+        if extra:
+            line += " " + json.dumps(extra, default=str, ensure_ascii=False)
+        return line
+
+
+def configure_logging():
+    """Set up the "fytai" logger tree once: level, filter, queue and writer thread."""
+    global _configured, _queue
+    with _configure_lock:
+        if _configured:
+            return
+        _queue = queue.Queue(LOG_QUEUE_SIZE)
+        handler = _QueueHandler(_queue)
+        handler.addFilter(_ContextFilter())
+        writer = logging.StreamHandler(sys.stderr)
+        writer.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+        listener = QueueListener(_queue, writer)
+        listener.start()
+        atexit.register(listener.stop)
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+        root.addHandler(handler)
+        root.propagate = False
+        _configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a logger in the "fytai" tree.
+
+    Args:
+        name (str): Usually the module's ``__name__``.
+    """
+    configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def get_log_stats() -> dict:
+    """
+    Get logging counters.
+
+    Returns:
+        dict: level, records dropped on a full queue, and records waiting in it.
+    """
+    return {
+        "level": logging.getLevelName(logging.getLogger(ROOT_LOGGER).level),
+        "dropped": _stats["dropped"],
+        "queued": _queue.qsize() if _queue is not None else 0,
+    }
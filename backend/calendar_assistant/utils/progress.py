@@ -0,0 +1,35 @@
+"""
+Progress messages from tools to the client streaming the current chat turn.
+
+The streaming endpoint installs a listener for the duration of a turn; tools
+call ``report`` ("Created tuesday session") and the message is forwarded as a
+server-sent event. Without a listener (plain POST /) reporting is a no-op.
+"""
+
+import contextvars
+from contextlib import contextmanager
+
+_listener = contextvars.ContextVar("progress_listener", default=None)
+
+
+@contextmanager
+def listen(callback):
+    """
+    Send the progress reported in this context to a callback.
+
+    Args:
+        callback: Called with each message; it may be called from tool threads.
+    """
+    token = _listener.set(callback)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+def report(message: str):
+    """Report progress of the running tool to the streaming client, if any."""
+    callback = _listener.get()
+    if callback is not None:
+        callback(message)
+
@@ -1,8 +1,145 @@
-from smolagents import tool, LiteLLMModel, LogLevel
-from langchain_google_community import GoogleSearchAPIWrapper
-from smolagents import CodeAgent
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from pydantic import BaseModel
+from calendar_assistant.utils.cache import PersistentCache
+from calendar_assistant.utils.logs import LOG_LEVEL, get_logger
+from calendar_assistant.utils.tracing import span, traced
+
+logger = get_logger(__name__)
+
+# Research results are reused for a week across users and re-plans
+_research_cache = PersistentCache(
+    "research",
+    ttl=float(os.environ.get("RESEARCH_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+    max_entries=int(os.environ.get("RESEARCH_CACHE_MAX_ENTRIES", 1000)),
+)
+
+# Directory where every research result is kept for audit, named by its content hash (disabled when unset)
+RESEARCH_AUDIT_DIR = os.environ.get("RESEARCH_AUDIT_DIR", "")
+
+_DAY_LINE = re.compile(
+    r"^\W*(sunday|monday|tuesday|wednesday|thursday|friday|saturday)\W*:\s*(.+)$", re.IGNORECASE | re.MULTILINE
+)
+
+
+class WeekResearch(BaseModel):
+    """The researched tips and daily structure for one training week."""
+    event_summary: str
+    plan: str
+    days: dict[str, str] = {}
+    fingerprint: str
+    created_at: float
+    cached: bool = False
+
+    def to_prompt(self) -> str:
+        """Render the research the way the planning prompts expect it."""
+        return f"Event summary: {self.event_summary}\n\nWeekly Training Plan:\n{self.plan}"
+
+
+def _parse_days(plan: str) -> dict:
+    """Pick the "monday: ..." lines of the plan, if the agent produced them."""
+    days = {}
+    for day, text in _DAY_LINE.findall(plan):
+        days.setdefault(day.lower(), text.strip())
+    return days
+
+
+def _write_audit(research: WeekResearch):
+    """Store the research under its content hash; identical results are written once."""
+    content = research.to_prompt()
+    path = os.path.join(RESEARCH_AUDIT_DIR, hashlib.sha256(content.encode("utf-8")).hexdigest() + ".txt")
+    if os.path.exists(path):
+        return
+    try:
+        os.makedirs(RESEARCH_AUDIT_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=RESEARCH_AUDIT_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not store the research audit copy: {e}")
+
+
+_MONTHS = (
+    "january|february|march|april|may|june|july|august|september|october|november|december"
+    "|jan|feb|mar|apr|jun|jul|aug|sept|sep|oct|nov|dec"
+)
+_WEEKDAYS = "monday|tuesday|wednesday|thursday|friday|saturday|sunday|mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun"
+# A number followed by one of these is a distance or a duration, never a date
+_UNITS = r"(?:k|km|kms|kilometers?|kilometres?|m|meters?|metres?|mi|miles?|yd|yards?|h|hrs?|hours?|min|minutes?)\b"
+_ORDINAL = r"\d{1,2}(?:st|nd|rd|th)?"
+# Dates and times in the forms a summary writes them; numbers are only removed when part of one
+_DATE_PATTERNS = re.compile("|".join([
+    r"\b\d{4}-\d{1,2}-\d{1,2}(?:t[\d:.]+z?)?\b",  # 2025-08-10, 2025-08-10T07:00:00
+    r"\b\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}\b",  # 10/08/2025, 08-10-25
+    rf"(?:(?<![\d.]){_ORDINAL}\s+(?:of\s+)?)?\b(?:{_MONTHS})\b\.?(?:\s+{_ORDINAL}\b(?!\s*{_UNITS}))?(?:,?\s+\d{{4}}\b)?",  # 10th of August, aug 10, 2025
+    rf"\b(?:{_WEEKDAYS})\b\.?,?(?:\s+(?:the\s+)?\d{{1,2}}(?:st|nd|rd|th)\b)?",  # Sunday, Sunday the 10th
+    r"\b\d{1,2}(?:st|nd|rd|th)\b",  # on the 10th
+    r"\b\d{1,2}:\d{2}(?:\s*[ap]\.?m\b\.?)?",  # 7:00, 7:30 am
+    r"\b\d{1,2}\s*[ap]\.?m\b\.?",  # 7am
+    rf"\b(?:19|20)\d{{2}}\b(?!\s*{_UNITS})",  # a year, unless it is a distance (2000 m)
+]), re.IGNORECASE)
+
+_TOKEN = re.compile(rf"(\d+(?:\.\d+)?)\s*((?:{_UNITS})?)|([a-z]+)")
+
+# Words that change between requests for the same kind of plan
+_STOPWORDS = {
+    "a", "an", "and", "the", "for", "to", "of", "in", "on", "at", "my", "me", "i", "is", "be", "with", "by",
+    "user", "wants", "want", "prepare", "preparing", "preparation", "plan", "training", "event", "next",
+}
+# As _normalize_text leaves them ("n/a" becomes "n a")
+_NO_REQUIREMENTS = {"", "none", "no", "n a", "na", "nothing", "no requirements"}
+
+
+def _normalize_text(text) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", str(text or "").lower()))
+
+
+def _event_tokens(event_summary: str) -> list:
+    """
+    Keep the words and numbers that identify the event type ("5 km race",
+    "Ironman 70.3"), dropping dates, times and filler.
+    """
+    text = _DATE_PATTERNS.sub(" ", str(event_summary or "").lower())
+    # A number keeps its unit, so "5 km" and "5km" are one token
+    tokens = {number + unit or word for number, unit, word in _TOKEN.findall(text)}
+    return sorted(tokens - _STOPWORDS)
+
+
+def _profile_bucket(general_info) -> str:
+    """Profiles with the same answers (ignoring case, spacing and punctuation) share a bucket."""
+    if isinstance(general_info, dict):
+        return json.dumps({str(k): _normalize_text(v) for k, v in general_info.items()}, sort_keys=True)
+    return _normalize_text(general_info)
+
+
+def research_fingerprint(event_summary: str, general_info, user_requirements: str) -> str:
+    """
+    Cache key for a research request.
+
+    Args:
+        event_summary (str): Summary of the fitness event.
+        general_info: The user's profile data.
+        user_requirements (str): Extra requirements for the plan.
+
+    Returns:
+        str: A SHA-256 hex digest of the normalized inputs.
+    """
+    requirements = _normalize_text(user_requirements)
+    if requirements in _NO_REQUIREMENTS:
+        requirements = ""
+    key = json.dumps([_event_tokens(event_summary), _profile_bucket(general_info), requirements])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def get_research_cache_stats() -> dict:
+    """Hit/miss counters of the research cache."""
+    return _research_cache.stats()
 
-@tool
 def google_search(query: str) -> str:
     """
     Busca en Google los principales 3 resultados para una consulta.
@@ -13,18 +150,75 @@ def google_search(query: str) -> str:
     Returns:
         str: Resultados concatenados.
     """
-    search = GoogleSearchAPIWrapper(k=3)
-    return search.run(query)
+    from langchain_google_community import GoogleSearchAPIWrapper
+
+    with span("google_search"):
+        search = GoogleSearchAPIWrapper(k=3)
+        return search.run(query)
+
+
+_search_tool = None
+
+
+def _get_search_tool():
+    """The smolagents tool wrapping google_search, built on first use."""
+    global _search_tool
+    if _search_tool is None:
+        from smolagents import tool
+
+        _search_tool = tool(google_search)
+    return _search_tool
+
+@traced()
+def research_week_plan(event_summary: str, general_info: str, user_requirements: str) -> WeekResearch:
+    """
+    Research a one-week training plan for a fitness event.
+
+    Args:
+        event_summary (str): Summary of the fitness event.
+        general_info (str): The user's profile data.
+        user_requirements (str): Extra requirements for the plan.
+
+    Returns:
+        WeekResearch: The plan, kept in memory; nothing is shared between callers.
+    """
+    fingerprint = research_fingerprint(event_summary, general_info, user_requirements)
+    cached = _research_cache.get(fingerprint)
+    if isinstance(cached, dict):
+        logger.info(f"Reusing cached research for '{event_summary}'")
+        # Another user's summary may differ in its date or wording; the prompts use the caller's
+        return WeekResearch(**dict(cached, event_summary=event_summary), cached=True)
+
+    plan = _run_research_agent(event_summary, general_info, user_requirements)
+    research = WeekResearch(
+        event_summary=event_summary,
+        plan=plan,
+        days=_parse_days(plan),
+        fingerprint=fingerprint,
+        created_at=time.time(),
+    )
+    _research_cache.set(fingerprint, research.model_dump(exclude={"cached"}))
+    if RESEARCH_AUDIT_DIR:
+        _write_audit(research)
+    return research
+
+
+@traced("llm.research_agent")
+def _run_research_agent(event_summary: str, general_info: str, user_requirements: str) -> str:
+    # smolagents and LangChain's Google tools take seconds to import: only a
+    # research cache miss needs them
+    from smolagents import CodeAgent, LiteLLMModel, LogLevel
 
-def research_week_plan(event_summary: str, general_info: str, user_requirements: str) -> str:
     model = LiteLLMModel(model_id="gpt-4.1")
+    # The agent prints its steps to stdout; only when debugging, otherwise just its errors
+    debug = LOG_LEVEL == "DEBUG"
     agent = CodeAgent(
-        tools=[google_search],
+        tools=[_get_search_tool()],
         model=model,
         add_base_tools=True,
-        stream_outputs=True,
+        stream_outputs=debug,
         use_structured_outputs_internally=True,
-        verbosity_level=LogLevel.DEBUG
+        verbosity_level=LogLevel.DEBUG if debug else LogLevel.ERROR
     )
     prompt = f"""
 Find tips and structure for a 1‑week training plan to prepare for the next fitness event: '{event_summary}'.\n
@@ -36,11 +230,4 @@ sunday: ..., monday: ..., ..., saturday: ...\n
 You must use the google search tool to answer\n
 """
     result = agent.run(prompt)
-    output_str = result.to_string() if hasattr(result, "to_string") else str(result)
-    # Guarda el resultado
-    path = "weekly_training_plan.txt"
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(f"Event summary: {event_summary}\n\n")
-        f.write("Weekly Training Plan:\n")
-        f.write(output_str)
-    return path
+    return result.to_string() if hasattr(result, "to_string") else str(result)
@@ -0,0 +1,326 @@
+"""
+Latency tracing of chat turns with OpenTelemetry.
+
+A chat turn is one trace. ``stream_agent_async`` opens its root span, the ADK
+adds its own spans inside it (invoke_agent for calendar_assistant and the
+manager, call_llm, execute_tool), and we add spans around every tool function
+(``traced``), every Calendar API request and every helper LLM call (``span``).
+OpenTelemetry keeps the current span in a context variable, so spans nest
+across asyncio tasks and the tool threads the ADK runs with a copy of the
+context. Work outside a turn (login, /get_next_events, reconciliation) makes
+traces of its own.
+
+Finished spans are:
+
+- kept in memory for the TRACE_KEEP most recent traces, for the per-turn
+  waterfall (``get_waterfall``, served by /traces/<trace_id>),
+- exported in batches from a background thread when TRACE_EXPORT is set:
+  "json" appends one JSON object per span to TRACE_FILE, "otlp" sends them to
+  an OpenTelemetry collector (OTEL_EXPORTER_OTLP_ENDPOINT, default
+  http://localhost:4318), which needs opentelemetry-exporter-otlp-proto-http.
+"""
+
+import functools
+import inspect
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.trace import StatusCode, format_span_id, format_trace_id
+
+from calendar_assistant.utils.logs import get_logger, user_ref
+
+TRACE_EXPORT = os.environ.get("TRACE_EXPORT", "").lower()
+TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")
+TRACE_KEEP = int(os.environ.get("TRACE_KEEP", 500))
+SERVICE_NAME = "fytai-backend"
+# Longest attribute string shown in a waterfall
+_ATTRIBUTE_CHARS = 200
+
+# The ADK records whole prompts and answers on its spans unless told not to
+os.environ.setdefault("ADK_CAPTURE_MESSAGE_CONTENT_IN_SPANS", "false")
+
+logger = get_logger(__name__)
+
+_configured = False
+_configure_lock = threading.Lock()
+_tracer = trace.get_tracer("fytai")
+
+
+class _RecentTraces(SpanProcessor):
+    """Keeps the finished spans of the most recent traces."""
+
+    def __init__(self, keep: int):
+        self._keep = keep
+        self._traces = OrderedDict()  # trace ID -> [ReadableSpan]
+        self._lock = threading.Lock()
+
+    def on_end(self, span):
+        trace_id = format_trace_id(span.context.trace_id)
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            if spans is None:
+                spans = self._traces[trace_id] = []
+                while len(self._traces) > self._keep:
+                    self._traces.popitem(last=False)
+            spans.append(span)
+
+    def get(self, trace_id: str) -> list:
+        with self._lock:
+            return list(self._traces.get(trace_id, ()))
+
+    def items(self) -> list:
+        with self._lock:
+            return [(trace_id, list(spans)) for trace_id, spans in self._traces.items()]
+
+
+class JsonFileExporter(SpanExporter):
+    """Appends one JSON object per span to a file."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        try:
+            with self._lock, open(self._path, "a", encoding="utf-8") as f:
+                for span in spans:
+                    f.write(span.to_json(indent=None) + "\n")
+        except OSError:
+            logger.exception("Could not write spans", extra={"fields": {"path": self._path}})
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+
+_recent = _RecentTraces(TRACE_KEEP)
+
+
+def _exporter():
+    if TRACE_EXPORT == "json":
+        return JsonFileExporter(TRACE_FILE)
+    if TRACE_EXPORT == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("TRACE_EXPORT=otlp needs opentelemetry-exporter-otlp-proto-http; spans are not exported")
+            return None
+        return OTLPSpanExporter()
+    if TRACE_EXPORT:
+        logger.warning("Unknown TRACE_EXPORT", extra={"fields": {"export": TRACE_EXPORT}})
+    return None
+
+
+def configure_tracing():
+    """
+    Install the process tracer provider once, with the recent traces and the
+    exporter; a provider someone else installed first gets them added instead.
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        provider = trace.get_tracer_provider()
+        installed = isinstance(provider, TracerProvider)
+        if not installed:
+            provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+        provider.add_span_processor(_recent)
+        exporter = _exporter()
+        if exporter is not None:
+            provider.add_span_processor(BatchSpanProcessor(exporter))
+        if not installed:
+            trace.set_tracer_provider(provider)
+        _configured = True
+
+
+def _attributes(attributes: dict) -> dict:
+    """Span attributes must be str, bool, int or float; drop None and stringify the rest."""
+    return {
+        key: value if isinstance(value, (str, bool, int, float)) else str(value)
+        for key, value in attributes.items() if value is not None
+    }
+
+
+def span(name: str, **attributes):
+    """
+    Time a block as a child of the current span.
+
+    Args:
+        name (str): The span name, e.g. "calendar.events.insert" or "llm.get_summary".
+        **attributes: Attributes of the span; None values are left out.
+
+    Returns:
+        A context manager yielding the span; an exception leaving the block
+        is recorded on it.
+    """
+    configure_tracing()
+    return _tracer.start_as_current_span(name, attributes=_attributes(attributes))
+
+
+def traced(name: str = None):
+    """
+    Decorator running a function (sync or async) inside a span.
+
+    The wrapper keeps the function's name, signature and docstring, so the ADK
+    builds the same tool declaration from it. A returned dict with a "status"
+    (the tools' result shape) is recorded on the span.
+
+    Args:
+        name (str): The span name (default: the function name).
+    """
+    def decorate(fn):
+        span_name = name or fn.__name__
+
+        def record(current, result):
+            if isinstance(result, dict) and "status" in result:
+                current.set_attribute("result.status", str(result["status"]))
+            return result
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with span(span_name) as current:
+                    return record(current, await fn(*args, **kwargs))
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with span(span_name) as current:
+                    return record(current, fn(*args, **kwargs))
+        return wrapper
+    return decorate
+
+
+def start_span(name: str, **attributes):
+    """
+    Start a span without making it current, for one that outlives a single
+    step of an async generator (whose steps may run in different contexts).
+    Make it current where needed with ``use_span`` and finish it with ``end()``.
+    """
+    configure_tracing()
+    return _tracer.start_span(name, attributes=_attributes(attributes))
+
+
+def use_span(current):
+    """Make a span started with ``start_span`` current in a block (it is not ended on exit)."""
+    return trace.use_span(current, end_on_exit=False)
+
+
+def get_trace_id(current=None):
+    """The trace ID (32 hex digits) of a span, or of the current one; None outside any trace."""
+    context = (current or trace.get_current_span()).get_span_context()
+    return format_trace_id(context.trace_id) if context.is_valid else None
+
+
+def _ms(nanoseconds: int) -> float:
+    return round(nanoseconds / 1e6, 2)
+
+
+def _shown_attributes(span) -> dict:
+    return {
+        key: value[:_ATTRIBUTE_CHARS] if isinstance(value, str) else value
+        for key, value in (span.attributes or {}).items()
+        if not isinstance(value, (tuple, list))
+    }
+
+
+def _root(spans: list):
+    ids = {s.context.span_id for s in spans}
+    orphans = [s for s in spans if s.parent is None or s.parent.span_id not in ids]
+    return min(orphans or spans, key=lambda s: s.start_time)
+
+
+def get_waterfall(trace_id: str):
+    """
+    Get the waterfall of a recent trace.
+
+    Args:
+        trace_id (str): The trace ID (32 hex digits), as returned with the chat response.
+
+    Returns:
+        dict: The root span's name and attributes, the trace duration, every
+        span in start order (depth, start offset and duration in ms, status,
+        attributes) and the count, total and max ms per span name; or None if
+        the trace is unknown or no longer kept.
+    """
+    spans = sorted(_recent.get(trace_id), key=lambda s: s.start_time)
+    if not spans:
+        return None
+    by_id = {s.context.span_id: s for s in spans}
+    start = spans[0].start_time
+    end = max(s.end_time for s in spans)
+
+    def depth(s):
+        level = 0
+        while s.parent is not None and s.parent.span_id in by_id:
+            s = by_id[s.parent.span_id]
+            level += 1
+        return level
+
+    rows = []
+    by_name = {}
+    for s in spans:
+        duration = s.end_time - s.start_time
+        rows.append({
+            "name": s.name,
+            "span_id": format_span_id(s.context.span_id),
+            "parent_id": format_span_id(s.parent.span_id) if s.parent is not None else None,
+            "depth": depth(s),
+            "start_ms": _ms(s.start_time - start),
+            "duration_ms": _ms(duration),
+            "status": "error" if s.status.status_code == StatusCode.ERROR else "ok",
+            "attributes": _shown_attributes(s),
+        })
+        totals = by_name.setdefault(s.name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        totals["count"] += 1
+        totals["total_ms"] = round(totals["total_ms"] + duration / 1e6, 2)
+        totals["max_ms"] = max(totals["max_ms"], _ms(duration))
+
+    root = _root(spans)
+    return {
+        "trace_id": trace_id,
+        "name": root.name,
+        "attributes": _shown_attributes(root),
+        "duration_ms": _ms(end - start),
+        "spans": rows,
+        "by_name": dict(sorted(by_name.items(), key=lambda item: -item[1]["total_ms"])),
+    }
+
+
+def list_traces(user_id: str = None, name: str = None, limit: int = 50) -> list:
+    """
+    List the most recent traces, newest first. Spans name users by their
+    ``user_ref`` ("user" attribute), never by user ID.
+
+    Args:
+        user_id (str): Only traces of this user (matched by its user_ref).
+        name (str): Only traces whose root span has this name, e.g. "chat_turn".
+        limit (int): Most traces to return.
+
+    Returns:
+        list: trace_id, name, user (the user_ref), start (ISO time), duration_ms and span count.
+    """
+    user = user_ref(user_id) if user_id is not None else None
+    traces = []
+    for trace_id, spans in reversed(_recent.items()):
+        root = _root(spans)
+        attributes = root.attributes or {}
+        if user is not None and attributes.get("user") != user:
+            continue
+        if name is not None and root.name != name:
+            continue
+        start = min(s.start_time for s in spans)
+        traces.append({
+            "trace_id": trace_id,
+            "name": root.name,
+            "user": attributes.get("user"),
+            "start": datetime.fromtimestamp(start / 1e9, timezone.utc).isoformat(),
+            "duration_ms": _ms(max(s.end_time for s in spans) - start),
+            "spans": len(spans),
+        })
+        if len(traces) >= limit:
+            break
+    return traces
@@ -0,0 +1,79 @@
+"""
+Process-wide asyncio event loop shared by every request.
+
+The ADK runner, the session service and our own history helpers are all
+coroutines. Instead of spinning up a fresh loop with ``asyncio.run`` for every
+request, they all run on one long-lived loop so that many users' turns can
+interleave on the same process.
+
+- Under the Flask development server (``python main.py``) the loop lives in a
+  daemon thread and request threads submit work with ``run_coroutine``.
+- Under the ASGI entry point (``uvicorn asgi:app``) the server's own loop is
+  adopted with ``set_loop`` and the chat endpoint awaits coroutines directly.
+
+Nothing that blocks may run on the loop: the agents' synchronous tools (Calendar
+requests, helper LLM calls, the research agent) run on the ADK's tool threads
+(see TOOL_THREADS in utils.py).
+"""
+
+import asyncio
+import threading
+
+_loop = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the shared event loop, starting it in a background thread if needed.
+
+    Returns:
+        asyncio.AbstractEventLoop: The running shared loop.
+    """
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=_loop.run_forever, name="shared-event-loop", daemon=True
+            )
+            thread.start()
+        return _loop
+
+
+def set_loop(loop: asyncio.AbstractEventLoop):
+    """
+    Adopt an already running loop (e.g. the ASGI server's) as the shared loop.
+
+    Args:
+        loop: A loop that is already running in some thread.
+    """
+    global _loop
+    with _lock:
+        _loop = loop
+
+
+def run_coroutine(coro, timeout: float = None):
+    """
+    Run a coroutine on the shared loop from synchronous code and wait for it.
+
+    Args:
+        coro: The coroutine to run.
+        timeout (float): Seconds to wait for the result (default: no limit).
+
+    Returns:
+        The coroutine's result.
+
+    Raises:
+        RuntimeError: If called from inside the shared loop itself, where the
+            coroutine must be awaited instead.
+    """
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_coroutine() called from the shared loop; await the coroutine instead.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
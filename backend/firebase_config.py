@@ -1,7 +1,46 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+"""
+The process's one Firebase app and Firestore client.
 
-cred = credentials.Certificate("calendar-firebase-adminsdk.json")
-firebase_admin.initialize_app(cred)
+Firebase is initialized on the first ``get_db()`` rather than at import, so
+importing the backend stays fast and the Firestore SDK is loaded only when it
+is used. ``set_db`` installs another client, e.g. the benchmarks' FakeFirestore.
+"""
 
-db = firestore.client()
\ No newline at end of file
+import os
+import threading
+
+FIREBASE_CREDENTIALS = os.environ.get("FIREBASE_CREDENTIALS", "calendar-firebase-adminsdk.json")
+
+_db = None
+_lock = threading.Lock()
+
+
+def get_db():
+    """Get the Firestore client, initializing Firebase on first use."""
+    global _db
+    if _db is not None:
+        return _db
+    with _lock:
+        if _db is None:
+            import firebase_admin
+            from firebase_admin import credentials, firestore
+
+            try:
+                firebase_admin.get_app()
+            except ValueError:
+                firebase_admin.initialize_app(credentials.Certificate(FIREBASE_CREDENTIALS))
+            _db = firestore.client()
+        return _db
+
+
+def set_db(client):
+    """
+    Replace the Firestore client (e.g. with a fake).
+
+    Returns:
+        The previous client, or None if Firebase was not initialized yet.
+    """
+    global _db
+    with _lock:
+        previous, _db = _db, client
+    return previous
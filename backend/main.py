@@ -1,103 +1,339 @@
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from calendar_assistant.agent import calendar_assistant
-from utils import call_agent_async, add_user_query_to_history, remove_all_pycache, get_profile_data, get_user_events, save_user_events, update_user_events, get_access_token
+from utils import stream_agent_async, add_user_query_to_history, remove_all_pycache, get_profile_data, get_user_events, save_user_events, update_user_events, get_access_token, patch_session_state
 import asyncio
-from dotenv import load_dotenv
-from calendar_assistant.utils.calendar_utils import get_current_time, get_upcoming_events
-from flask import Flask, request, jsonify, session
-import threading
+from event_loop import run_coroutine, get_loop
+from calendar_assistant.utils.calendar_utils import get_current_time, get_upcoming_events, get_calendar_service_stats, get_calendar_service, resolve_calendar_timezone
+from calendar_assistant.utils.research import get_research_cache_stats
+from calendar_assistant.utils.history import get_history_stats
+from calendar_assistant.utils.llm import get_llm_stats
+from flask import Flask, Response, request, jsonify, session, g
+import time
 import os
+import json
+import functools
+import hmac
 from flask_cors import CORS
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import firestore
 from calendar_assistant.utils.clean_user_events import clean_user_events
-import asyncio
+from reconciler import ReconciliationQueue
+from session_store import create_session_service, SESSION_BACKEND
+from active_sessions import ActiveSessions
+from calendar_assistant.utils.event_mirror import drop_event_mirror, get_event_mirror_stats
+from calendar_assistant.utils.event_index import build_event_index
+from calendar_assistant.utils.logs import get_logger, user_ref
+from calendar_assistant.utils.tracing import get_waterfall, list_traces
+import metrics
+import user_repository
+from user_repository import get_user_document
+import copy
 
 #remove_all_pycache()
 
+logger = get_logger(__name__)
 app = Flask(__name__)
 APP_NAME = "Calendar Assistant"
 app.secret_key = os.urandom(24) # Generate a random secret key
 CORS(app)
+# Keep proxies from buffering the event stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+# Bearer token of the debug routes (stats, traces); unset, they are not served
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+
+def admin_only(view):
+    """Serve a debug route only to requests with "Authorization: Bearer <ADMIN_TOKEN>"."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "Not found."}), 404
+        given = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(given.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+            return jsonify({"error": "Unauthorized."}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.before_request
+def _count_firestore_reads():
+    g.firestore_reads = user_repository.begin_request()
+
+
+@app.teardown_request
+def _record_firestore_reads(exc=None):
+    if "firestore_reads" in g:
+        user_repository.end_request(g.pop("firestore_reads"))
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _observe_request(response):
+    if "request_started" in g:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe_request(
+            route, request.method, response.status_code, time.perf_counter() - g.pop("request_started")
+        )
+    return response
+
+
+session_service = create_session_service()
+
+# The agent graph holds no per-user data: one runner routes every user's turns
+runner = Runner(
+    agent=calendar_assistant,
+    app_name=APP_NAME,
+    session_service=session_service,
+)
+
+
+def _release_user(user_id: str, session_id: str):
+    """Free what an idle user holds in this process (their data stays in the stores)."""
+    drop_event_mirror(user_id)
+    if hasattr(session_service, "forget"):
+        session_service.forget(APP_NAME, user_id, session_id)
+    else:
+        # Nothing else keeps an in-memory session; the user logs in again
+        asyncio.run_coroutine_threadsafe(
+            session_service.delete_session(app_name=APP_NAME, user_id=user_id, session_id=session_id),
+            get_loop(),
+        )
 
-_db_client = None
 
-def _initialize_firestore_client():
+active_sessions = ActiveSessions(_release_user)
+
+
+async def _get_session_id(user_id: str):
     """
-    Initialize Firebase and return the Firestore client.
+    Get the session ID a user's turns are routed to.
+
+    A user who logged in through another replica, before a restart, or who was
+    evicted while idle is served from their most recent stored session.
+
+    Returns:
+        str: The session ID, or None if the user has no session.
     """
-    global _db_client
-    if _db_client is None:
-        try:
-            firebase_admin.get_app()
-        except ValueError:
-            try:
-                cred = credentials.Certificate("hackathon--adk-firebase-adminsdk-fbsvc-cf18928e0c.json")
-                firebase_admin.initialize_app(cred)
-                print("Firebase Admin SDK inicializado desde firebase_tools.py")
-            except Exception as e:
-                print(f"Error al inicializar Firebase Admin SDK: {e}")
-                raise
+    session_id = active_sessions.get(user_id)
+    if session_id is not None:
+        return session_id
+    sessions = (await session_service.list_sessions(app_name=APP_NAME, user_id=user_id)).sessions
+    if not sessions:
+        return None
+    active_sessions.set(user_id, sessions[-1].id)
+    return sessions[-1].id
 
-        _db_client = firestore.client()
-        print("Cliente de Firestore obtenido.")
-    return _db_client
 
-_db_client = _initialize_firestore_client()
+def _rss_bytes() -> int:
+    """Current resident set size of the process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
 
-session_service = InMemorySessionService()
 
-user_runners = {}
-user_session_ids = {}
+async def stream_chat(data: dict, stream_text: bool = True):
+    """
+    Run one chat turn for a user on the shared event loop, yielding its progress.
 
-@app.route("/", methods=["POST"])
-def chatbot():
-    data = request.get_json()
+    Args:
+        data (dict): The JSON body of the request ("user_id" and "message").
+        stream_text (bool): Stream the answer while the model writes it.
+
+    Yields:
+        dict: Updates with a "type" (see utils.stream_agent_async). A request
+        that cannot be served yields a single {"type": "error", "error", "status"}.
+    """
     USER_ID = data.get("user_id")
     if not USER_ID:
-        print("User not logged in.")
-        return jsonify({"error": "User not logged in."}), 401
+        logger.info("Chat request without a user ID")
+        yield {"type": "error", "error": "User not logged in.", "status": 401}
+        return
 
-    runner = user_runners.get(USER_ID)
-    SESSION_ID = user_session_ids.get(USER_ID)
-    if runner is None or SESSION_ID is None:
-        return jsonify({"error": "Agent not initialized yet."}), 503
-    print(f"Chatbot called for user: {USER_ID}")
+    SESSION_ID = await _get_session_id(USER_ID)
+    if SESSION_ID is None:
+        yield {"type": "error", "error": "Agent not initialized yet.", "status": 503}
+        return
+    logger.info("Chatbot called", extra={"fields": {"user_id": USER_ID}})
     user_input = data.get("message", "")
     if not user_input:
-        return jsonify({"error": "No message provided."}), 400
-    adk_session = asyncio.run(session_service.get_session(
-        app_name=APP_NAME,
-        user_id=USER_ID,
-        session_id=SESSION_ID,
-    ))
-    adk_session.state["user_input"] = user_input
-    async def process():
+        yield {"type": "error", "error": "No message provided.", "status": 400}
+        return
+    with reconciliation_queue.active_turn(USER_ID):
+        await patch_session_state(session_service, APP_NAME, USER_ID, SESSION_ID, {"user_input": user_input})
         await add_user_query_to_history(
             session_service, APP_NAME, USER_ID, SESSION_ID, user_input
         )
-        response = await call_agent_async(runner, USER_ID, SESSION_ID, user_input)
-        current_adk_session = await session_service.get_session(
-            app_name=APP_NAME,
-            user_id=USER_ID,
-            session_id=SESSION_ID,
-        )
-        user_events = current_adk_session.state.get("user_events", [])
-        cleaned = clean_user_events(user_events, get_access_token(USER_ID))
-        save_user_events(USER_ID, cleaned)
-        await update_user_events(session_service, APP_NAME, USER_ID, SESSION_ID, cleaned)
-        return response
-    response = asyncio.run(process())
+        async for update in stream_agent_async(runner, USER_ID, SESSION_ID, user_input, stream_text):
+            if update["type"] == "final":
+                final = update
+            else:
+                yield update
+    # Audit the user's events against Google Calendar after the response is sent
+    reconciliation_queue.schedule(USER_ID, SESSION_ID)
+    yield final
+
+
+async def handle_chat(data: dict):
+    """
+    Run one chat turn for a user on the shared event loop.
+
+    Args:
+        data (dict): The JSON body of the request ("user_id" and "message").
+
+    Returns:
+        tuple: The JSON-serializable payload and the HTTP status code.
+    """
+    async for update in stream_chat(data, stream_text=False):
+        if update["type"] == "error":
+            return {"error": update["error"]}, update["status"]
+        if update["type"] == "final":
+            return {"response": update["response"], "trace_id": update["trace_id"]}, 200
+
+
+def format_sse(update: dict) -> bytes:
+    """Encode a chat update as a server-sent event."""
+    return f"event: {update['type']}\ndata: {json.dumps(update)}\n\n".encode("utf-8")
+
+
+@metrics.RECONCILIATION_SECONDS.time()
+def reconcile_user_events(user_id: str, session_id: str):
+    """
+    Clean a user's tracked events and persist them (runs on a reconciliation worker).
+
+    Args:
+        user_id: The user ID
+        session_id: The user's ADK session ID
+    """
+    adk_session = run_coroutine(session_service.get_session(
+        app_name=APP_NAME,
+        user_id=user_id,
+        session_id=session_id,
+    ))
+    if adk_session is None:
+        return
+    user_events = adk_session.state.get("user_events", [])
+    cleaned = clean_user_events(copy.deepcopy(user_events), get_access_token(user_id), user_id)
+    updated = run_coroutine(update_user_events(
+        session_service, APP_NAME, user_id, session_id, cleaned, expected_user_events=user_events
+    ))
+    # If a newer turn changed the events meanwhile, that turn schedules its own audit
+    if updated:
+        save_user_events(user_id, cleaned)
+
+
+reconciliation_queue = ReconciliationQueue(reconcile_user_events)
+metrics.watch(active_sessions, session_service, reconciliation_queue)
+
+
+@app.route("/", methods=["POST"])
+def chatbot():
+    payload, status = run_coroutine(handle_chat(request.get_json()))
+    return jsonify(payload), status
 
-    return jsonify({"response": response})
+
+@app.route("/stream", methods=["POST"])
+def chatbot_stream():
+    """Chat turn as server-sent events: status, text chunks, then the final answer."""
+    updates = stream_chat(request.get_json())
+    first = run_coroutine(anext(updates))
+    if first["type"] == "error":
+        return jsonify({"error": first["error"]}), first["status"]
+
+    def generate():
+        try:
+            yield format_sse(first)
+            while True:
+                try:
+                    update = run_coroutine(anext(updates))
+                except StopAsyncIteration:
+                    return
+                yield format_sse(update)
+        finally:
+            run_coroutine(updates.aclose())
+
+    return Response(generate(), mimetype="text/event-stream", headers=SSE_HEADERS)
 
 
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({"status": "ok"})
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+@app.route('/reconciler_stats', methods=['GET'])
+@admin_only
+def reconciler_stats():
+    return jsonify(reconciliation_queue.stats()), 200
+
+@app.route('/firestore_stats', methods=['GET'])
+@admin_only
+def firestore_stats():
+    return jsonify(user_repository.get_stats()), 200
+
+@app.route('/session_stats', methods=['GET'])
+@admin_only
+def session_stats():
+    stats = session_service.stats() if hasattr(session_service, "stats") else {}
+    return jsonify(dict(stats, backend=SESSION_BACKEND, **active_sessions.stats())), 200
+
+@app.route('/memory_stats', methods=['GET'])
+@admin_only
+def memory_stats():
+    """Process memory against the number of active users, and the largest sessions (by user_ref)."""
+    rss = _rss_bytes()
+    users = active_sessions.users()
+    sizes = session_service.session_sizes(APP_NAME) if hasattr(session_service, "session_sizes") else {}
+    active = {user_id: sizes[user_id] for user_id in users if user_id in sizes}
+    largest = sorted(active.items(), key=lambda item: item[1]["state_bytes"], reverse=True)[:20]
+    return jsonify({
+        "rss_bytes": rss,
+        "active_users": len(users),
+        "rss_bytes_per_active_user": rss / len(users) if users else None,
+        "session_state_bytes": sum(size["state_bytes"] for size in active.values()),
+        "largest_sessions": {user_ref(user_id): size for user_id, size in largest},
+        "event_mirrors": get_event_mirror_stats(),
+    }), 200
+
+@app.route('/prompt_stats', methods=['GET'])
+@admin_only
+def prompt_stats():
+    return jsonify(get_history_stats()), 200
+
+@app.route('/cache_stats', methods=['GET'])
+@admin_only
+def cache_stats():
+    return jsonify({
+        "calendar_services": get_calendar_service_stats(),
+        "research": get_research_cache_stats(),
+        "llm": get_llm_stats(),
+    }), 200
+
+@app.route('/traces', methods=['GET'])
+@admin_only
+def traces():
+    """Recent traces, newest first; filter with ?user_id= (matched by its user_ref), ?name=chat_turn and ?limit=."""
+    return jsonify(list_traces(
+        user_id=request.args.get("user_id"),
+        name=request.args.get("name"),
+        limit=request.args.get("limit", 50, type=int),
+    )), 200
+
+@app.route('/traces/<trace_id>', methods=['GET'])
+@admin_only
+def trace_waterfall(trace_id):
+    """Waterfall of one trace, e.g. the trace_id a chat response returned."""
+    waterfall = get_waterfall(trace_id)
+    if waterfall is None:
+        return jsonify({"error": "Trace not found."}), 404
+    return jsonify(waterfall), 200
+
 @app.route('/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -106,32 +342,41 @@ def login():
 
     USER_ID = request.json.get('user_id')
     session['user_id'] = USER_ID
-    print(f"Login successful for user: {session['user_id']}")
+    logger.info("Login successful", extra={"fields": {"user_id": USER_ID}})
+    # The frontend has just stored a fresh access token; read the document once
+    get_user_document(USER_ID, refresh=True)
+    user_events = get_user_events(USER_ID)
+    access_token = get_access_token(USER_ID)
+    # Resolved once per login; tools read it from the session
+    service = get_calendar_service(access_token)
+    timezone_id = resolve_calendar_timezone(service) if service else None
     initial_state = {
+        "user_id": USER_ID,
         "interaction_history": [],
-        "today_date": get_current_time(),
-        "user_events": get_user_events(USER_ID),
+        "today_date": get_current_time(timezone_id),
+        "user_events": user_events,
+        "event_index": build_event_index(user_events),
         "profile_data": get_profile_data(USER_ID),
-        "access_token" : get_access_token(USER_ID),
+        "access_token" : access_token,
         "user_input" : ""
     }
+    if timezone_id:
+        initial_state["timezone"] = timezone_id
     async def init_agent_for_user():
         # firebase
 
+        # Every login starts a fresh conversation; drop the stored ones
+        previous = await session_service.list_sessions(app_name=APP_NAME, user_id=USER_ID)
+        for old_session in previous.sessions:
+            await session_service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=old_session.id)
         new_session = await session_service.create_session(
             app_name=APP_NAME,
             user_id=USER_ID,
             state=initial_state,
         )
-        runner = Runner(
-            agent=calendar_assistant,
-            app_name=APP_NAME,
-            session_service=session_service,
-        )
-        user_runners[USER_ID] = runner
-        user_session_ids[USER_ID] = new_session.id
+        active_sessions.set(USER_ID, new_session.id)
 
-    asyncio.run(init_agent_for_user())
+    run_coroutine(init_agent_for_user())
     return jsonify({"message": "Login successful"}), 200
 
 @app.route('/logout', methods=['POST', 'GET'])
@@ -152,7 +397,7 @@ def get_next_events():
     if not USER_ID:
         return jsonify({"error": "User not logged in."}), 401
 
-    user_events = get_upcoming_events(get_access_token(USER_ID))
+    user_events = get_upcoming_events(get_access_token(USER_ID), user_id=USER_ID)
     if not user_events:
         return jsonify({"error": "No events found."}), 404
     next_events = [event for event in user_events]
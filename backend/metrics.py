@@ -0,0 +1,227 @@
+"""
+Prometheus metrics for the backend, served by GET /metrics.
+
+Two kinds of metrics, chosen to keep the hot path cheap:
+
+- Request latency per route and reconciliation duration are histograms
+  observed as they happen (one small lock per observation in
+  prometheus_client).
+- Everything the backend already counts (active sessions, Calendar API calls
+  and errors by method, LLM calls and tokens by helper, Firestore reads and
+  writes, the session store, the reconciliation queue, dropped log records)
+  is read from the modules' stats when Prometheus scrapes, by a collector.
+  Those counters stay plain dict increments; nothing extra is done per call.
+
+``watch`` hands the collector the objects main.py creates (the active session
+registry, the session service and the reconciliation queue).
+"""
+
+import threading
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.process_collector import ProcessCollector
+
+import user_repository
+from calendar_assistant.utils.calendar_utils import get_calendar_api_stats, get_calendar_service_stats
+from calendar_assistant.utils.llm import get_llm_stats
+from calendar_assistant.utils.logs import get_log_stats
+
+# Chat turns take seconds; the other routes milliseconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+
+REQUEST_SECONDS = Histogram(
+    "fytai_http_request_duration_seconds",
+    "Time to answer an HTTP request, by route (streamed responses: until the response starts under Flask, "
+    "until the stream ends under ASGI).",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+REQUESTS = Counter(
+    "fytai_http_requests",
+    "HTTP requests answered, by route and status code.",
+    ["route", "method", "status"],
+    registry=REGISTRY,
+)
+RECONCILIATION_SECONDS = Histogram(
+    "fytai_reconciliation_duration_seconds",
+    "Time to reconcile one user's tracked events with Google Calendar.",
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+
+_watch_lock = threading.Lock()
+_collector = None
+# (route, method, status) -> (histogram, counter) children; labels() takes a lock and
+# rebuilds the key on every call, a dict lookup does not
+_request_children = {}
+
+
+def observe_request(route: str, method: str, status: int, seconds: float):
+    """
+    Record an answered HTTP request.
+
+    Args:
+        route (str): The route template (e.g. "/traces/<trace_id>"), never the raw path.
+        method (str): The HTTP method.
+        status (int): The response status code.
+        seconds (float): Time taken to answer.
+    """
+    key = (route, method, status)
+    children = _request_children.get(key)
+    if children is None:
+        children = _request_children[key] = (
+            REQUEST_SECONDS.labels(route, method), REQUESTS.labels(route, method, str(status))
+        )
+    children[0].observe(seconds)
+    children[1].inc()
+
+
+def _counter(name, documentation, labels, samples):
+    family = CounterMetricFamily(name, documentation, labels=labels)
+    for label_values, value in samples:
+        family.add_metric(label_values, value)
+    return family
+
+
+def _gauge(name, documentation, value):
+    return GaugeMetricFamily(name, documentation, value=value)
+
+
+class _StatsCollector:
+    """Turns the backend's stats dicts into metrics at scrape time."""
+
+    def __init__(self, active_sessions=None, session_service=None, reconciliation_queue=None):
+        self.active_sessions = active_sessions
+        self.session_service = session_service
+        self.reconciliation_queue = reconciliation_queue
+
+    def collect(self):
+        yield from self._calendar()
+        yield from self._llm()
+        yield from self._firestore()
+        yield from self._logs()
+        if self.active_sessions is not None:
+            yield from self._sessions()
+        if self.session_service is not None and hasattr(self.session_service, "stats"):
+            yield from self._session_store()
+        if self.reconciliation_queue is not None:
+            yield from self._reconciler()
+
+    def _calendar(self):
+        api = get_calendar_api_stats()
+        yield _counter("fytai_calendar_api_calls", "Calendar API requests by method, batched ones included.",
+                       ["method"], [([m], s["calls"]) for m, s in api.items()])
+        yield _counter("fytai_calendar_api_errors", "Calendar API requests that failed, by method.",
+                       ["method"], [([m], s["errors"]) for m, s in api.items()])
+        yield _counter("fytai_calendar_api_seconds", "Time spent in Calendar API requests, by method.",
+                       ["method"], [([m], s["seconds"]) for m, s in api.items()])
+        pool = get_calendar_service_stats()
+        yield _gauge("fytai_calendar_services", "Calendar clients in the service pool.", pool["size"])
+        yield _counter("fytai_calendar_service_lookups", "Service pool lookups, by result.", ["result"],
+                       [(["hit"], pool["hits"]), (["miss"], pool["misses"])])
+
+    def _llm(self):
+        stats = get_llm_stats()
+        response_cache = stats.pop("response_cache")
+        yield _counter("fytai_llm_calls", "Helper LLM calls, cached answers included, by helper.",
+                       ["helper"], [([h], s["calls"]) for h, s in stats.items()])
+        yield _counter("fytai_llm_cache_hits", "Helper LLM calls answered from the response cache.",
+                       ["helper"], [([h], s["cache_hits"]) for h, s in stats.items()])
+        yield _counter("fytai_llm_requests", "Requests sent to the model, by helper.",
+                       ["helper"], [([h], s["llm_calls"]) for h, s in stats.items()])
+        yield _counter("fytai_llm_tokens", "Model tokens used by helper and direction.", ["helper", "direction"],
+                       [([h, "input"], s["input_tokens"]) for h, s in stats.items()]
+                       + [([h, "output"], s["output_tokens"]) for h, s in stats.items()])
+        yield _gauge("fytai_llm_response_cache_hit_ratio", "Hit ratio of the LLM response cache.",
+                     response_cache["hit_rate"])
+
+    def _firestore(self):
+        stats = user_repository.get_stats()
+        yield _counter("fytai_firestore_operations", "Firestore document operations, by operation and collection.",
+                       ["operation", "collection"], [
+                           (["read", "users"], stats["reads"]),
+                           (["write", "users"], stats["writes"]),
+                           (["read", "user_events"], stats["event_reads"]),
+                           (["write", "user_events"], stats["event_writes"]),
+                           (["delete", "user_events"], stats["event_deletes"]),
+                       ])
+        yield _counter("fytai_user_document_cache_hits", "User document reads served by the cache.", [],
+                       [([], stats["cache_hits"])])
+        yield _counter("fytai_user_events_saves", "Saves of a user's tracked events, by result.", ["result"], [
+            (["written"], stats["event_saves"] - stats["event_saves_skipped"]),
+            (["unchanged"], stats["event_saves_skipped"]),
+        ])
+
+    def _logs(self):
+        stats = get_log_stats()
+        yield _counter("fytai_log_records_dropped", "Log records dropped on a full logging queue.", [],
+                       [([], stats["dropped"])])
+        yield _gauge("fytai_log_queue_depth", "Log records waiting to be written.", stats["queued"])
+
+    def _sessions(self):
+        stats = self.active_sessions.stats()
+        yield _gauge("fytai_active_sessions", "Users with an active chat session on this replica.",
+                     stats["active_users"])
+        yield _counter("fytai_active_sessions_evicted", "Active sessions released, by reason.", ["reason"], [
+            (["idle"], stats["evicted_idle"]),
+            (["capacity"], stats["evicted_capacity"]),
+        ])
+
+    def _session_store(self):
+        stats = self.session_service.stats()
+        yield _gauge("fytai_session_store_cached", "Sessions held in memory by the session service.",
+                     stats["cached_sessions"])
+        yield _gauge("fytai_session_store_pending", "Sessions waiting for the write-behind flush.",
+                     stats["pending_sessions"])
+        yield _counter("fytai_session_store_loads", "Sessions loaded from the store.", [],
+                       [([], stats["store_loads"])])
+        yield _counter("fytai_session_store_writes", "Sessions and events written to the store.", ["kind"], [
+            (["sessions"], stats["sessions_written"]),
+            (["events"], stats["events_written"]),
+        ])
+        yield _counter("fytai_session_store_flush_errors", "Write-behind flushes that failed.", [],
+                       [([], stats["flush_errors"])])
+
+    def _reconciler(self):
+        stats = self.reconciliation_queue.stats()
+        yield _gauge("fytai_reconciliation_queue_depth", "Users waiting for reconciliation.", stats["queue_depth"])
+        yield _gauge("fytai_reconciliation_oldest_pending_seconds", "Age of the oldest pending reconciliation.",
+                     stats["oldest_pending_seconds"])
+        yield _counter("fytai_reconciliation_runs", "Reconciliations run, by result.", ["result"], [
+            (["ok"], stats["runs"] - stats["failures"]),
+            (["failed"], stats["failures"]),
+        ])
+
+
+def watch(active_sessions=None, session_service=None, reconciliation_queue=None):
+    """
+    Export the stats of the backend's long-lived objects (called once by main.py).
+
+    Args:
+        active_sessions: The ActiveSessions registry.
+        session_service: The ADK session service; its stats() are used if it has them.
+        reconciliation_queue: The ReconciliationQueue.
+    """
+    global _collector
+    with _watch_lock:
+        if _collector is not None:
+            REGISTRY.unregister(_collector)
+        _collector = _StatsCollector(active_sessions, session_service, reconciliation_queue)
+        REGISTRY.register(_collector)
+
+
+def render() -> tuple:
+    """
+    Render every metric in the Prometheus text format.
+
+    Returns:
+        tuple: The body and its content type.
+    """
+    if _collector is None:
+        watch()
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,156 @@
+"""
+Background reconciliation of user_events against Google Calendar.
+
+A chat turn only schedules the audit of the user's tracked events; worker
+threads run it after the response has been sent. Turns from the same user are
+coalesced into one pending job whose start is debounced, and a user is never
+reconciled while one of their turns is still running.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from calendar_assistant.utils.logs import get_logger
+
+DEBOUNCE_SECONDS = float(os.environ.get("RECONCILE_DEBOUNCE_SECONDS", 3))
+MAX_DELAY_SECONDS = float(os.environ.get("RECONCILE_MAX_DELAY_SECONDS", 30))
+WORKERS = int(os.environ.get("RECONCILE_WORKERS", 2))
+
+logger = get_logger(__name__)
+
+
+class ReconciliationQueue:
+    """
+    In-process queue of per-user reconciliation jobs.
+
+    Args:
+        job: Callable run as job(user_id, session_id) on a worker thread.
+        debounce (float): Seconds to wait after the latest turn before running.
+        max_delay (float): Upper bound on how long a job may be pushed back.
+        workers (int): Number of worker threads.
+    """
+
+    def __init__(self, job, debounce=DEBOUNCE_SECONDS, max_delay=MAX_DELAY_SECONDS, workers=WORKERS):
+        self._job = job
+        self._debounce = debounce
+        self._max_delay = max_delay
+        self._workers = workers
+        self._threads = []
+        self._pending = {}  # user_id -> {"session_id", "first_scheduled", "due"}
+        self._running = set()
+        self._active_turns = {}  # user_id -> number of turns in progress
+        self._cond = threading.Condition()
+        self._stats = {
+            "scheduled": 0,
+            "coalesced": 0,
+            "runs": 0,
+            "failures": 0,
+            "last_duration_seconds": 0.0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+        }
+
+    def schedule(self, user_id: str, session_id: str):
+        """
+        Queue a reconciliation for a user, merging it with any pending one.
+
+        Args:
+            user_id: The user whose events should be reconciled.
+            session_id: The user's current ADK session.
+        """
+        now = time.monotonic()
+        with self._cond:
+            self._stats["scheduled"] += 1
+            job = self._pending.get(user_id)
+            if job:
+                self._stats["coalesced"] += 1
+                job["session_id"] = session_id
+                job["due"] = min(now + self._debounce, job["first_scheduled"] + self._max_delay)
+            else:
+                self._pending[user_id] = {
+                    "session_id": session_id,
+                    "first_scheduled": now,
+                    "due": now + self._debounce,
+                }
+            self._start_workers()
+            self._cond.notify()
+
+    @contextmanager
+    def active_turn(self, user_id: str):
+        """Hold back reconciliation of a user while one of their turns runs."""
+        with self._cond:
+            self._active_turns[user_id] = self._active_turns.get(user_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active_turns[user_id] -= 1
+                if not self._active_turns[user_id]:
+                    del self._active_turns[user_id]
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """
+        Get queue depth, lag and run counters.
+
+        Returns:
+            dict: Counters plus queue_depth, running and oldest_pending_seconds.
+        """
+        now = time.monotonic()
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queue_depth"] = len(self._pending)
+            stats["running"] = len(self._running)
+            stats["oldest_pending_seconds"] = max(
+                (now - job["first_scheduled"] for job in self._pending.values()), default=0.0
+            )
+        return stats
+
+    def _start_workers(self):
+        if self._threads:
+            return
+        for i in range(self._workers):
+            thread = threading.Thread(target=self._work, name=f"reconciler-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                ready = [
+                    (job["due"], user_id)
+                    for user_id, job in self._pending.items()
+                    if user_id not in self._running and user_id not in self._active_turns
+                ]
+                timeout = None
+                if ready:
+                    due, user_id = min(ready)
+                    if due <= now:
+                        self._running.add(user_id)
+                        return user_id, self._pending.pop(user_id)
+                    timeout = due - now
+                self._cond.wait(timeout)
+
+    def _work(self):
+        while True:
+            user_id, job = self._next_job()
+            started = time.monotonic()
+            failed = False
+            try:
+                self._job(user_id, job["session_id"])
+            except Exception:
+                failed = True
+                logger.exception("Error reconciling events", extra={"fields": {"user_id": user_id}})
+            finished = time.monotonic()
+            with self._cond:
+                self._running.discard(user_id)
+                lag = started - job["first_scheduled"]
+                self._stats["runs"] += 1
+                self._stats["failures"] += failed
+                self._stats["last_duration_seconds"] = finished - started
+                self._stats["last_lag_seconds"] = lag
+                self._stats["max_lag_seconds"] = max(self._stats["max_lag_seconds"], lag)
+                self._cond.notify_all()
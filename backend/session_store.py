@@ -0,0 +1,714 @@
+"""
+Durable ADK session service with write-behind persistence.
+
+``PersistentSessionService`` keeps the sessions this process is serving in a
+local cache and persists them through a store:
+
+- ``SqliteSessionStore`` (SESSION_BACKEND=sqlite, the default) for a single
+  machine, in SESSION_DB_PATH (by default fytai_sessions.db in the backend
+  directory).
+- ``FirestoreSessionStore`` (SESSION_BACKEND=firestore) shared by every replica,
+  in the "adk_sessions" collection.
+
+Writes are applied to the cache immediately and flushed by a background thread
+every SESSION_FLUSH_INTERVAL_SECONDS: the events and the state keys a session
+changed since the last flush become one upsert (state is stored one row or
+document per key, so a turn that appends to interaction_history does not
+rewrite user_events), and all dirty sessions one store batch. With an interval of 0 every write goes to the store before
+returning. Cached sessions are re-read from the store after
+SESSION_CACHE_TTL_SECONDS (unless they have unflushed writes), so a replica
+picks up turns served by another one; concurrent turns of the same user on two
+replicas are last-writer-wins. A session keeps its last SESSION_MAX_EVENTS
+events; older ones are dropped from the cache and the store.
+
+``app:`` and ``user:`` scoped state keys are stored with the session like any
+other key; the app does not use them. The OAuth access token is not: the
+UNPERSISTED_KEYS are left out of the stored state and filled in again from the
+user's Firestore document when a session is loaded.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions.base_session_service import BaseSessionService, ListSessionsResponse
+
+from calendar_assistant.utils.logs import get_logger
+
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "sqlite")
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "fytai_sessions.db"
+)
+SESSION_FLUSH_INTERVAL_SECONDS = float(os.environ.get("SESSION_FLUSH_INTERVAL_SECONDS", 0.5))
+SESSION_CACHE_TTL_SECONDS = float(os.environ.get("SESSION_CACHE_TTL_SECONDS", 30))
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", 4096))
+SESSION_MAX_EVENTS = int(os.environ.get("SESSION_MAX_EVENTS", 200))
+# Secrets kept in the cached state only, never written to the store
+UNPERSISTED_KEYS = ("access_token",)
+
+logger = get_logger(__name__)
+
+
+def _key(app_name: str, user_id: str, session_id: str) -> str:
+    return f"{app_name}:{user_id}:{session_id}"
+
+
+def _legacy_state(state_json: str) -> dict:
+    """The keys of a state stored whole (before it was stored per key), as {name: value JSON}."""
+    state = json.loads(state_json) if state_json else {}
+    return {name: json.dumps(value) for name, value in state.items() if name not in UNPERSISTED_KEYS}
+
+
+def _user_secrets(user_id: str) -> dict:
+    """The UNPERSISTED_KEYS of a user's sessions, from their user document."""
+    from user_repository import get_user_document
+
+    user_data = get_user_document(user_id)
+    return {"access_token": user_data["accessToken"]} if user_data else {}
+
+
+class SqliteSessionStore:
+    """Sessions and their events in two tables of a SQLite file."""
+
+    def __init__(self, path: str = SESSION_DB_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (key TEXT PRIMARY KEY, app_name TEXT, user_id TEXT, "
+                "session_id TEXT, state TEXT, last_update_time REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_user ON sessions (app_name, user_id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_state (key TEXT, name TEXT, value TEXT, "
+                "PRIMARY KEY (key, name))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_events (key TEXT, seq INTEGER, event TEXT, "
+                "PRIMARY KEY (key, seq))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self, app_name, user_id, session_id):
+        """Returns ({name: value JSON}, last_update_time, [event JSON], seq of the first event) or None."""
+        key = _key(app_name, user_id, session_id)
+        with self._connect() as conn:
+            row = conn.execute("SELECT state, last_update_time FROM sessions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            legacy_state, last_update_time = row
+            if legacy_state:
+                # Stored whole by an older version: move it to one row per key
+                conn.executemany(
+                    "INSERT OR IGNORE INTO session_state VALUES (?, ?, ?)",
+                    [(key, name, value) for name, value in _legacy_state(legacy_state).items()],
+                )
+                conn.execute("UPDATE sessions SET state = '' WHERE key = ?", (key,))
+            state = dict(conn.execute("SELECT name, value FROM session_state WHERE key = ?", (key,)).fetchall())
+            events = conn.execute(
+                "SELECT seq, event FROM session_events WHERE key = ? ORDER BY seq", (key,)
+            ).fetchall()
+        return state, last_update_time, [event for _, event in events], events[0][0] if events else 0
+
+    def list(self, app_name, user_id=None):
+        """Returns [(user_id, session_id, last_update_time)]."""
+        with self._connect() as conn:
+            if user_id is None:
+                rows = conn.execute(
+                    "SELECT user_id, session_id, last_update_time FROM sessions WHERE app_name = ?", (app_name,)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT user_id, session_id, last_update_time FROM sessions WHERE app_name = ? AND user_id = ?",
+                    (app_name, user_id),
+                ).fetchall()
+        return rows
+
+    def write(self, writes):
+        """
+        Apply a batch of writes in one transaction.
+
+        Args:
+            writes: dicts with app_name, user_id, session_id and either
+                deleted=True or last_update_time, state ({name: value JSON}
+                of the changed keys, or of every key with replace_state),
+                new_events (event JSON, numbered from first_seq) and
+                events_from (events before that seq are dropped).
+        """
+        with self._connect() as conn:
+            for w in writes:
+                key = _key(w["app_name"], w["user_id"], w["session_id"])
+                if w.get("deleted") or w.get("replace_events"):
+                    conn.execute("DELETE FROM session_events WHERE key = ?", (key,))
+                if w.get("deleted") or w.get("replace_state"):
+                    conn.execute("DELETE FROM session_state WHERE key = ?", (key,))
+                if w.get("deleted"):
+                    conn.execute("DELETE FROM sessions WHERE key = ?", (key,))
+                    continue
+                conn.execute(
+                    "INSERT INTO sessions VALUES (?, ?, ?, ?, '', ?) "
+                    "ON CONFLICT (key) DO UPDATE SET last_update_time = excluded.last_update_time",
+                    (key, w["app_name"], w["user_id"], w["session_id"], w["last_update_time"]),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO session_state VALUES (?, ?, ?)",
+                    [(key, name, value) for name, value in w["state"].items()],
+                )
+                conn.execute("DELETE FROM session_events WHERE key = ? AND seq < ?", (key, w["events_from"]))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO session_events VALUES (?, ?, ?)",
+                    [(key, w["first_seq"] + i, event) for i, event in enumerate(w["new_events"])],
+                )
+
+
+class FirestoreSessionStore:
+    """
+    Sessions as documents of adk_sessions/{app:user:session}, their state in a
+    "state" subcollection (one document per key) and events in an "events"
+    one. State values are stored as JSON strings so any JSON value (e.g.
+    nested lists) round-trips.
+    """
+
+    # Firestore accepts at most 500 writes per batch
+    BATCH_LIMIT = 500
+
+    def __init__(self, collection: str = "adk_sessions"):
+        self._collection_name = collection
+
+    @property
+    def db(self):
+        # Firebase is initialized on first use, not when the service is built
+        from firebase_config import get_db
+
+        return get_db()
+
+    @property
+    def collection(self):
+        return self.db.collection(self._collection_name)
+
+    def load(self, app_name, user_id, session_id):
+        ref = self.collection.document(_key(app_name, user_id, session_id))
+        doc = ref.get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        state = {d.id: d.to_dict()["value"] for d in ref.collection("state").stream()}
+        if data.get("state"):
+            # Stored whole by an older version: move it to one document per key
+            from firebase_admin import firestore
+
+            legacy = {name: value for name, value in _legacy_state(data["state"]).items() if name not in state}
+            batch = self.db.batch()
+            for name, value in legacy.items():
+                batch.set(ref.collection("state").document(name), {"value": value})
+            batch.set(ref, {"state": firestore.DELETE_FIELD}, merge=True)
+            batch.commit()
+            state.update(legacy)
+        events = [e.to_dict() for e in ref.collection("events").order_by("seq").stream()]
+        return state, data["last_update_time"], [e["event"] for e in events], events[0]["seq"] if events else 0
+
+    def list(self, app_name, user_id=None):
+        query = self.collection.where("app_name", "==", app_name)
+        if user_id is not None:
+            query = query.where("user_id", "==", user_id)
+        return [
+            (d["user_id"], d["session_id"], d["last_update_time"])
+            for d in (doc.to_dict() for doc in query.stream())
+        ]
+
+    def write(self, writes):
+        batch, pending = self.db.batch(), 0
+
+        def add(op, *args):
+            nonlocal batch, pending
+            getattr(batch, op)(*args)
+            pending += 1
+            if pending == self.BATCH_LIMIT:
+                batch.commit()
+                batch, pending = self.db.batch(), 0
+
+        for w in writes:
+            ref = self.collection.document(_key(w["app_name"], w["user_id"], w["session_id"]))
+            if w.get("deleted") or w.get("replace_events"):
+                for event in ref.collection("events").list_documents():
+                    add("delete", event)
+            if w.get("deleted") or w.get("replace_state"):
+                for name in ref.collection("state").list_documents():
+                    add("delete", name)
+            if w.get("deleted"):
+                add("delete", ref)
+                continue
+            add("set", ref, {
+                "app_name": w["app_name"],
+                "user_id": w["user_id"],
+                "session_id": w["session_id"],
+                "last_update_time": w["last_update_time"],
+            })
+            for name, value in w["state"].items():
+                add("set", ref.collection("state").document(name), {"value": value})
+            if not w.get("replace_events"):
+                for seq in range(w["stored_events_from"], w["events_from"]):
+                    add("delete", ref.collection("events").document(f"{seq:08d}"))
+            for i, event in enumerate(w["new_events"]):
+                seq = w["first_seq"] + i
+                add("set", ref.collection("events").document(f"{seq:08d}"), {"seq": seq, "event": event})
+        if pending:
+            batch.commit()
+
+
+class _Entry:
+    """A cached session plus what still has to be written for it."""
+
+    __slots__ = (
+        "session", "loaded_at", "first_seq", "persisted_seq", "stored_from", "changed_keys",
+        "dirty", "replace_events", "replace_state",
+    )
+
+    def __init__(self, session, first_seq, loaded_at):
+        self.session = session
+        self.loaded_at = loaded_at
+        self.first_seq = first_seq  # seq of session.events[0]
+        self.persisted_seq = first_seq + len(session.events)  # events before it are in the store
+        self.stored_from = first_seq  # seq of the oldest event the store may still hold
+        self.changed_keys = set()  # state keys to write
+        self.dirty = False
+        self.replace_events = False
+        self.replace_state = False
+
+
+class PersistentSessionService(BaseSessionService):
+    """
+    ADK session service persisting sessions through a store with write-behind.
+
+    Args:
+        store: A SqliteSessionStore or FirestoreSessionStore.
+        flush_interval (float): Seconds between background flushes; 0 writes through.
+        cache_ttl (float): Seconds a clean cached session is served without re-reading the store.
+        cache_size (int): Sessions kept in the local cache.
+        max_events (int): Events kept per session, the most recent ones.
+        load_secrets: Called with a user_id when a session is loaded from the
+            store; returns the UNPERSISTED_KEYS to put back in its state.
+    """
+
+    def __init__(self, store, flush_interval=SESSION_FLUSH_INTERVAL_SECONDS,
+                 cache_ttl=SESSION_CACHE_TTL_SECONDS, cache_size=SESSION_CACHE_SIZE,
+                 max_events=SESSION_MAX_EVENTS, load_secrets=None):
+        self.store = store
+        self.max_events = max_events
+        self.load_secrets = load_secrets
+        self.flush_interval = flush_interval
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # key -> _Entry
+        self._dirty = set()
+        self._deleted = {}  # key -> (app_name, user_id, session_id)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stats = {
+            "cache_hits": 0, "store_loads": 0, "appends": 0,
+            "flushes": 0, "sessions_written": 0, "state_keys_written": 0, "events_written": 0, "flush_errors": 0,
+        }
+        if flush_interval > 0:
+            threading.Thread(target=self._flush_loop, name="session-flush", daemon=True).start()
+        atexit.register(self.flush_now)
+
+    # --- cache -----------------------------------------------------------
+
+    def _remember(self, key, entry):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        if len(self._cache) <= self.cache_size:
+            return
+        # Never drop a session that still has writes pending
+        for old_key in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if old_key not in self._dirty:
+                del self._cache[old_key]
+
+    async def _entry(self, app_name, user_id, session_id):
+        key = _key(app_name, user_id, session_id)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and (key in self._dirty or time.monotonic() - entry.loaded_at < self.cache_ttl):
+                self._cache.move_to_end(key)
+                self._stats["cache_hits"] += 1
+                return entry
+            if key in self._deleted:
+                return None
+
+        loaded = await asyncio.to_thread(self._load, app_name, user_id, session_id)
+        with self._lock:
+            self._stats["store_loads"] += 1
+            # A write may have landed while we were reading; it wins
+            entry = self._cache.get(key)
+            if entry is not None and key in self._dirty:
+                return entry
+            if loaded is None:
+                self._cache.pop(key, None)
+                return None
+            state, last_update_time, events, first_seq = loaded
+            kept = events[-self.max_events:] if self.max_events else []
+            session = Session(
+                app_name=app_name, user_id=user_id, id=session_id, state=state,
+                events=[Event.model_validate_json(event) for event in kept],
+                last_update_time=last_update_time,
+            )
+            entry = _Entry(session, first_seq + len(events) - len(kept), time.monotonic())
+            entry.stored_from = first_seq
+            self._remember(key, entry)
+            return entry
+
+    def _load(self, app_name, user_id, session_id):
+        loaded = self.store.load(app_name, user_id, session_id)
+        if loaded is None:
+            return None
+        state, last_update_time, events, first_seq = loaded
+        state = {name: json.loads(value) for name, value in state.items()}
+        if self.load_secrets is not None:
+            state.update(self.load_secrets(user_id))
+        return state, last_update_time, events, first_seq
+
+    def _trim(self, entry):
+        events = entry.session.events
+        excess = len(events) - self.max_events
+        if excess > 0:
+            del events[:excess]
+            entry.first_seq += excess
+
+    @staticmethod
+    def _copy(session, events=None):
+        """
+        A caller's copy of a cached session. Events are never changed once
+        appended, so they are shared; the state is copied, because tools update
+        its lists (user_events, event_index) in place before assigning them.
+        """
+        return session.model_copy(update={
+            "state": json.loads(json.dumps(session.state)),
+            "events": list(session.events if events is None else events),
+        })
+
+    def _mark_dirty(self, key, entry):
+        entry.dirty = True
+        self._dirty.add(key)
+        self._deleted.pop(key, None)
+        self._remember(key, entry)
+
+    async def _written(self):
+        if self.flush_interval <= 0:
+            await asyncio.to_thread(self.flush_now)
+        else:
+            self._wakeup.set()
+
+    # --- BaseSessionService ----------------------------------------------
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None) -> Session:
+        """
+        Create a session, or replace the state of an existing one with the same ID
+        (its events are kept), as the InMemorySessionService this app was written
+        against did.
+        """
+        existing = None
+        if session_id:
+            session_id = session_id.strip()
+            existing = await self._entry(app_name, user_id, session_id)
+        else:
+            session_id = str(uuid.uuid4())
+        key = _key(app_name, user_id, session_id)
+        with self._lock:
+            if existing is not None:
+                existing.session.state = json.loads(json.dumps(state or {}))
+                existing.session.last_update_time = time.time()
+                entry = existing
+            else:
+                session = Session(
+                    app_name=app_name, user_id=user_id, id=session_id,
+                    state=json.loads(json.dumps(state or {})), last_update_time=time.time(),
+                )
+                entry = _Entry(session, 0, time.monotonic())
+                entry.replace_events = True
+            entry.replace_state = True
+            self._mark_dirty(key, entry)
+            copied = self._copy(entry.session)
+        await self._written()
+        return copied
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        entry = await self._entry(app_name, user_id, session_id)
+        if entry is None:
+            return None
+        with self._lock:
+            session = entry.session
+            events = session.events
+            if config:
+                if config.num_recent_events is not None:
+                    events = events[-config.num_recent_events:] if config.num_recent_events else []
+                if config.after_timestamp is not None:
+                    events = [e for e in events if e.timestamp >= config.after_timestamp]
+            return self._copy(session, events)
+
+    async def list_sessions(self, *, app_name, user_id=None) -> ListSessionsResponse:
+        rows = {(u, s): t for u, s, t in await asyncio.to_thread(self.store.list, app_name, user_id)}
+        with self._lock:
+            # Include what has not been flushed yet
+            for key in self._dirty:
+                entry = self._cache[key]
+                session = entry.session
+                if session.app_name == app_name and user_id in (None, session.user_id):
+                    rows[(session.user_id, session.id)] = session.last_update_time
+            for app, user, session_id in self._deleted.values():
+                if app == app_name:
+                    rows.pop((user, session_id), None)
+        sessions = [
+            Session(app_name=app_name, user_id=u, id=s, last_update_time=t)
+            for (u, s), t in rows.items()
+        ]
+        sessions.sort(key=lambda s: (s.last_update_time, s.user_id, s.id))
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name, user_id, session_id) -> None:
+        key = _key(app_name, user_id, session_id)
+        with self._lock:
+            self._cache.pop(key, None)
+            self._dirty.discard(key)
+            self._deleted[key] = (app_name, user_id, session_id)
+        await self._written()
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        key = _key(session.app_name, session.user_id, session.id)
+        entry = await self._entry(session.app_name, session.user_id, session.id)
+        if entry is None:
+            raise ValueError(f"Session {session.id} not found.")
+        # A retried append of the same event is applied once
+        if any(e == event for e in entry.session.events[-8:] if e.id == event.id):
+            return event
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        with self._lock:
+            stored = entry.session
+            stored.events.append(event.model_copy(deep=True))
+            self._trim(entry)
+            if event.actions and event.actions.state_delta:
+                stored.state.update(json.loads(json.dumps(event.actions.state_delta)))
+                entry.changed_keys.update(event.actions.state_delta)
+            stored.last_update_time = event.timestamp
+            self._stats["appends"] += 1
+            self._mark_dirty(key, entry)
+        await self._written()
+        return event
+
+    async def flush(self) -> None:
+        await asyncio.to_thread(self.flush_now)
+
+    # --- state patches ---------------------------------------------------
+
+    async def patch_state(self, *, app_name, user_id, session_id, changes: dict, expected: dict = None) -> bool:
+        """
+        Replace some keys of a session's state, without touching the rest.
+
+        Args:
+            changes (dict): Keys to set.
+            expected (dict): If given, only apply when the state still holds
+                these values (compare-and-set).
+
+        Returns:
+            bool: True if the changes were applied.
+        """
+        key = _key(app_name, user_id, session_id)
+        entry = await self._entry(app_name, user_id, session_id)
+        if entry is None:
+            raise ValueError(f"Session {session_id} not found.")
+        changes = json.loads(json.dumps(changes))
+        with self._lock:
+            state = entry.session.state
+            if expected and any(state.get(k) != v for k, v in expected.items()):
+                return False
+            state.update(changes)
+            entry.changed_keys.update(changes)
+            entry.session.last_update_time = time.time()
+            self._mark_dirty(key, entry)
+        await self._written()
+        return True
+
+    async def append_to_state_list(self, *, app_name, user_id, session_id, list_key: str, item, max_length: int = None):
+        """
+        Append one item to a list in a session's state, dropping the oldest
+        items beyond max_length (a bounded ring buffer).
+        """
+        key = _key(app_name, user_id, session_id)
+        entry = await self._entry(app_name, user_id, session_id)
+        if entry is None:
+            raise ValueError(f"Session {session_id} not found.")
+        item = json.loads(json.dumps(item))
+        with self._lock:
+            items = entry.session.state.setdefault(list_key, [])
+            items.append(item)
+            if max_length is not None and len(items) > max_length:
+                del items[:len(items) - max_length]
+            entry.changed_keys.add(list_key)
+            entry.session.last_update_time = time.time()
+            self._mark_dirty(key, entry)
+        await self._written()
+
+    # --- write-behind ----------------------------------------------------
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.flush_interval)  # let more writes join the batch
+            self._wakeup.clear()
+            try:
+                self.flush_now()
+            except Exception:
+                # Keep flushing: the writes stay pending and are retried
+                logger.exception("Error in the session flush loop")
+
+    def flush_now(self):
+        """Write every pending change to the store (one batch)."""
+        with self._flush_lock:
+            with self._lock:
+                writes, flushed = [], []
+                for key in self._dirty:
+                    entry = self._cache[key]
+                    session = entry.session
+                    names = session.state.keys() if entry.replace_state else entry.changed_keys
+                    # Events trimmed before they were ever flushed are not written
+                    first_seq = max(entry.persisted_seq, entry.first_seq)
+                    new_events = session.events[first_seq - entry.first_seq:]
+                    write = {
+                        "app_name": session.app_name,
+                        "user_id": session.user_id,
+                        "session_id": session.id,
+                        "state": {
+                            name: json.dumps(session.state[name])
+                            for name in names if name in session.state and name not in UNPERSISTED_KEYS
+                        },
+                        "replace_state": entry.replace_state,
+                        "last_update_time": session.last_update_time,
+                        "new_events": [e.model_dump_json(exclude_none=True) for e in new_events],
+                        "first_seq": first_seq,
+                        "events_from": entry.first_seq,
+                        "stored_events_from": entry.stored_from,
+                        "replace_events": entry.replace_events,
+                    }
+                    writes.append(write)
+                    flushed.append((entry, write, entry.changed_keys, entry.first_seq + len(session.events)))
+                    entry.dirty = False
+                    entry.changed_keys = set()
+                    entry.replace_events = False
+                    entry.replace_state = False
+                writes += [
+                    {"app_name": a, "user_id": u, "session_id": s, "deleted": True}
+                    for a, u, s in self._deleted.values()
+                ]
+                deleted = dict(self._deleted)
+                self._dirty.clear()
+                self._deleted.clear()
+            if not writes:
+                return
+            try:
+                self.store.write(writes)
+            except Exception:
+                logger.exception("Error flushing sessions", extra={"fields": {"sessions": len(writes)}})
+                with self._lock:
+                    self._stats["flush_errors"] += 1
+                    for entry, write, changed_keys, _ in flushed:
+                        key = _key(entry.session.app_name, entry.session.user_id, entry.session.id)
+                        # Deleted (or replaced) while the write was in flight: nothing to retry
+                        if self._cache.get(key) is not entry or key in self._deleted:
+                            continue
+                        entry.dirty = True
+                        entry.changed_keys |= changed_keys
+                        entry.replace_events |= write["replace_events"]
+                        entry.replace_state |= write["replace_state"]
+                        self._dirty.add(key)
+                    for key, value in deleted.items():
+                        # Unless the session was created again since
+                        if key not in self._dirty:
+                            self._deleted.setdefault(key, value)
+                self._wakeup.set()
+                return
+            with self._lock:
+                for entry, write, _, persisted_seq in flushed:
+                    entry.persisted_seq = persisted_seq
+                    entry.stored_from = write["events_from"]
+                    entry.loaded_at = time.monotonic()
+                self._stats["flushes"] += 1
+                self._stats["sessions_written"] += len(writes)
+                self._stats["state_keys_written"] += sum(len(w.get("state", {})) for w in writes)
+                self._stats["events_written"] += sum(len(w.get("new_events", [])) for w in writes)
+
+    def forget(self, app_name, user_id, session_id):
+        """Drop a session from the local cache (it stays in the store); pending writes keep it."""
+        key = _key(app_name, user_id, session_id)
+        with self._lock:
+            if key not in self._dirty:
+                self._cache.pop(key, None)
+
+    def session_sizes(self, app_name) -> dict:
+        """
+        Approximate memory held per cached session.
+
+        Returns:
+            dict: user_id -> {"state_bytes", "events"} for the app's cached sessions.
+        """
+        with self._lock:
+            sessions = [e.session for e in self._cache.values() if e.session.app_name == app_name]
+            return {
+                s.user_id: {"state_bytes": len(json.dumps(s.state)), "events": len(s.events)}
+                for s in sessions
+            }
+
+    def stats(self) -> dict:
+        """
+        Get cache and write-behind counters.
+
+        Returns:
+            dict: cache_hits, store_loads, appends, flushes, sessions_written,
+            state_keys_written, events_written, flush_errors, cached_sessions and
+            pending_sessions.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_sessions"] = len(self._cache)
+            stats["pending_sessions"] = len(self._dirty) + len(self._deleted)
+        return stats
+
+
+def create_session_service(backend: str = SESSION_BACKEND):
+    """
+    Build the session service selected by SESSION_BACKEND.
+
+    Args:
+        backend (str): "sqlite", "firestore" or "memory" (no persistence).
+
+    Returns:
+        BaseSessionService: The session service.
+    """
+    if backend == "memory":
+        return InMemorySessionService()
+    if backend == "firestore":
+        return PersistentSessionService(FirestoreSessionStore(), load_secrets=_user_secrets)
+    if backend == "sqlite":
+        return PersistentSessionService(SqliteSessionStore(), load_secrets=_user_secrets)
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
@@ -0,0 +1,100 @@
+"""
+The backend under test runs against the benchmarks' in-process fakes.
+
+The environment is set before any backend module is imported: Google Calendar
+is a FakeCalendar on localhost (CALENDAR_API_ROOT), the caches live in a
+temporary directory and nothing reaches the network. Firestore and the helper
+LLM are replaced per test by the ``firestore`` and ``chat_model`` fixtures.
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["CACHE_DB_PATH"] = os.path.join(_tmp.name, "cache.db")
+os.environ["SESSION_DB_PATH"] = os.path.join(_tmp.name, "sessions.db")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from benchmarks.fake_calendar import FakeCalendar  # noqa: E402
+
+CALENDAR = FakeCalendar().start()
+os.environ["CALENDAR_API_ROOT"] = CALENDAR.root_url
+
+APP_NAME = "tests"
+
+
+@pytest.fixture
+def calendar():
+    """The fake Calendar, with no latency unless a test sets one."""
+    CALENDAR.latency = 0.0
+    yield CALENDAR
+    CALENDAR.latency = 0.0
+
+
+@pytest.fixture
+def firestore():
+    """A fresh FakeFirestore installed as the Firestore client."""
+    import firebase_config
+    from benchmarks.fake_firestore import FakeFirestore
+
+    fake = FakeFirestore()
+    previous = firebase_config.set_db(fake)
+    yield fake
+    firebase_config.set_db(previous)
+
+
+@pytest.fixture
+def chat_model():
+    """A StubChatModel installed as the helpers' chat model."""
+    from benchmarks.stub_llm import StubChatModel
+    from calendar_assistant.utils import llm
+
+    model = StubChatModel()
+    llm.set_chat_model(model)
+    yield model
+    llm.set_chat_model(None)
+
+
+@pytest.fixture
+def user_id():
+    """A user ID no other test uses (the modules keep per-user state)."""
+    return f"user-{uuid.uuid4().hex[:8]}"
+
+
+@pytest.fixture
+def agents():
+    """
+    The calendar_assistant agents on a StubAgentModel, and a factory of
+    runners with in-memory sessions. Set ``model.script`` to pick the tool calls.
+    """
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    from benchmarks.stub_llm import StubAgentModel
+    from calendar_assistant.agent import calendar_assistant
+
+    model = StubAgentModel()
+    all_agents = [calendar_assistant, *calendar_assistant.sub_agents]
+    previous = [agent.model for agent in all_agents]
+    for agent in all_agents:
+        agent.model = model
+
+    async def new_session(user_id, **state):
+        runner = Runner(agent=calendar_assistant, app_name=APP_NAME, session_service=InMemorySessionService())
+        session = await runner.session_service.create_session(app_name=APP_NAME, user_id=user_id, state={
+            "user_id": user_id, "access_token": f"token-{user_id}", "interaction_history": [],
+            "user_events": [], "event_index": {}, "profile_data": {}, "timezone": CALENDAR.time_zone,
+            "today_date": datetime.now().strftime("%Y-%m-%d %H:%M"), "user_input": "", **state,
+        })
+        return runner, session.id
+
+    yield model, new_session
+    for agent, agent_model in zip(all_agents, previous):
+        agent.model = agent_model
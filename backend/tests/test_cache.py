@@ -0,0 +1,46 @@
+import os
+import threading
+
+from calendar_assistant.utils.cache import PersistentCache
+
+
+def test_database_is_created_on_first_use(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = PersistentCache("things", ttl=60, max_entries=10, path=path)
+    assert not os.path.exists(path)
+
+    cache.set("a", {"n": 1})
+    assert os.path.exists(path)
+    assert PersistentCache("things", ttl=60, max_entries=10, path=path).get("a") == {"n": 1}
+
+
+def test_eviction_keeps_the_recently_used_entries(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = PersistentCache("things", ttl=60, max_entries=2, memory_entries=8, path=path, evict_interval=3600)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    # Nothing is evicted between passes
+    assert cache.stats()["evictions"] == 0
+
+    cache.get("a")  # a memory hit, recorded for the next pass
+    cache.evict_interval = 0
+    cache.set("d", "d")
+
+    fresh = PersistentCache("things", ttl=60, max_entries=2, path=path)
+    assert [key for key in "abcd" if fresh.get(key) is not None] == ["a", "d"]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_threads_share_the_entries(tmp_path):
+    cache = PersistentCache("things", ttl=60, max_entries=100, memory_entries=1, path=str(tmp_path / "cache.db"))
+
+    def write(n):
+        for i in range(20):
+            cache.set(f"{n}-{i}", i)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(cache.get(f"{n}-{i}") == i for n in range(4) for i in range(20))
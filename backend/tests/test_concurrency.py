@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from utils import stream_agent_async
+
+TURNS = 8
+
+
+async def _turn(runner, user_id, session_id) -> float:
+    started = time.perf_counter()
+    async for update in stream_agent_async(runner, user_id, session_id, "What do I have this week?", stream_text=False):
+        if update["type"] == "final":
+            assert update["response"]
+    return time.perf_counter() - started
+
+
+def test_blocking_tools_do_not_hold_up_other_turns(calendar, agents, user_id):
+    """Turns whose tools wait on Google Calendar overlap on one loop, as under asgi.py (user-001)."""
+    _, new_session = agents
+    calendar.latency = 0.2
+    users = [f"{user_id}-{n}" for n in range(TURNS + 1)]
+
+    async def run():
+        sessions = [(user, *await new_session(user)) for user in users]
+        # Also starts the loop's tool threads, as a server's first turn does
+        lone = await _turn(sessions[0][1], sessions[0][0], sessions[0][2])
+
+        lag, stop = 0.0, asyncio.Event()
+
+        async def probe():
+            nonlocal lag
+            while not stop.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lag = max(lag, time.perf_counter() - started - 0.01)
+
+        probing = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*[_turn(runner, user, session_id) for user, runner, session_id in sessions[1:]])
+        wall = time.perf_counter() - started
+        stop.set()
+        await probing
+        return lone, wall, lag
+
+    lone, wall, lag = asyncio.run(run())
+    # Run on the loop, the tools would take turns: TURNS times a lone turn, and a
+    # loop blocked for a whole Calendar request at a time
+    assert wall < 3 * lone, (wall, lone)
+    assert lag < 0.15, lag
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from calendar_assistant.utils.logs import user_ref
+from utils import stream_agent_async
+
+
+@pytest.fixture
+def backend(firestore, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    return main
+
+
+def _turn(agents, user_id):
+    model, new_session = agents
+    model.script = lambda message: None
+
+    async def run():
+        runner, session_id = await new_session(user_id)
+        async for update in stream_agent_async(runner, user_id, session_id, "Hello"):
+            pass
+        return update["trace_id"]
+
+    return asyncio.run(run())
+
+
+def test_debug_routes_need_the_admin_token(backend, monkeypatch):
+    client = backend.app.test_client()
+    assert client.get("/traces").status_code == 401
+    assert client.get("/memory_stats", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/traces", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+    monkeypatch.setattr(backend, "ADMIN_TOKEN", "")
+    assert client.get("/traces", headers={"Authorization": "Bearer "}).status_code == 404
+    assert client.get("/health").status_code == 200
+
+
+def test_memory_stats_name_users_by_reference(backend, firestore, calendar, user_id):
+    firestore.collection("users").document(user_id).set({"accessToken": "token", "general_questions": {}})
+    client = backend.app.test_client()
+    assert client.post("/login", json={"user_id": user_id}).status_code == 200
+
+    stats = client.get("/memory_stats", headers={"Authorization": "Bearer s3cret"})
+    assert user_ref(user_id) in stats.get_json()["largest_sessions"]
+    assert user_id not in stats.get_data(as_text=True)
+
+
+def test_traces_name_users_by_reference(backend, agents, user_id):
+    trace_id = _turn(agents, user_id)
+    client = backend.app.test_client()
+    headers = {"Authorization": "Bearer s3cret"}
+
+    listed = client.get("/traces", query_string={"user_id": user_id}, headers=headers)
+    assert [t["trace_id"] for t in listed.get_json()] == [trace_id]
+    assert listed.get_json()[0]["user"] == user_ref(user_id)
+    waterfall = client.get(f"/traces/{trace_id}", headers=headers)
+    for response in (listed, waterfall):
+        assert user_id not in response.get_data(as_text=True)
@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from calendar_assistant.sub_agents.tools.delete_event import delete_event
+from calendar_assistant.utils import event_index
+
+
+def test_deleted_instance_missing_from_the_index_is_untracked(calendar, user_id):
+    instance = calendar.add_event("Easy run", datetime.now() + timedelta(days=1))
+    user_events = [{"parent_event_id": "race", "alias": "Half marathon", "instances": ["race_1", instance["id"]]}]
+    # An index built before the instance was tracked
+    index = event_index.build_event_index([dict(user_events[0], instances=["race_1"])])
+    context = SimpleNamespace(state={
+        "access_token": f"token-{user_id}", "user_events": user_events, event_index.INDEX_KEY: index,
+    })
+
+    result = delete_event(instance["id"], "recurrent_event", context)
+    assert result["status"] == "success"
+    assert context.state["user_events"][0]["instances"] == ["race_1"]
+    assert instance["id"] not in context.state[event_index.INDEX_KEY]
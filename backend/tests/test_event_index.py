@@ -0,0 +1,49 @@
+from calendar_assistant.utils import event_index
+
+USER_EVENTS = [
+    {"parent_event_id": "race", "alias": "Half marathon", "instances": ["race_1", "race_2"]},
+    {"parent_event_id": "dentist", "alias": "Dentist", "instances": []},
+]
+
+
+def test_build_event_index():
+    index = event_index.build_event_index(USER_EVENTS)
+    assert index["race"] == {"type": "parent_event", "parent_event_id": "race", "alias": "Half marathon", "instances": 2}
+    assert index["race_1"] == {"type": "recurrent_event", "parent_event_id": "race", "alias": "Half marathon"}
+    assert index["dentist"]["type"] == "single_event"
+    assert event_index.build_event_index(None) == {}
+
+
+def test_older_sessions_get_an_index_on_first_use():
+    state = {"user_events": USER_EVENTS}
+    assert event_index.lookup_event(state, "race_2")["parent_event_id"] == "race"
+    assert state[event_index.INDEX_KEY] == event_index.build_event_index(USER_EVENTS)
+    assert event_index.lookup_event(state, "someone_elses_event") is None
+
+
+def test_index_parent_replaces_its_instances():
+    state = {"user_events": USER_EVENTS}
+    event_index.index_parent(state, "race", "Half marathon", ["race_3"], previous_instances=["race_1", "race_2"])
+    event_index.index_parent(state, "swim", "Swim", [])
+
+    index = state[event_index.INDEX_KEY]
+    assert "race_1" not in index and "race_2" not in index
+    assert index["race_3"]["parent_event_id"] == "race"
+    assert index["race"]["instances"] == 1
+    assert index["swim"]["type"] == "single_event"
+
+
+def test_unindexing_keeps_the_index_consistent():
+    state = {"user_events": USER_EVENTS}
+    event_index.unindex_instance(state, "race_1")
+    assert state[event_index.INDEX_KEY]["race"]["instances"] == 1
+    event_index.unindex_instance(state, "race_2")
+    assert state[event_index.INDEX_KEY]["race"]["type"] == "single_event"
+
+    event_index.unindex_parent(state, "dentist")
+    event_index.unindex_instance(state, "unknown")
+    assert set(state[event_index.INDEX_KEY]) == {"race"}
+
+    # Whatever the sequence of changes, the index matches a rebuild from user_events
+    user_events = [{"parent_event_id": "race", "alias": "Half marathon", "instances": []}]
+    assert state[event_index.INDEX_KEY] == event_index.build_event_index(user_events)
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+from calendar_assistant.utils.calendar_utils import get_calendar_service
+from calendar_assistant.utils.event_mirror import EventMirror
+
+
+def test_mirror_resyncs_after_410(calendar, user_id):
+    service = get_calendar_service(f"token-{user_id}")
+    kept = calendar.add_event("Tempo run", datetime.now() + timedelta(days=2))
+    mirror = EventMirror()
+    mirror.sync(service)
+    assert mirror.status(kept["id"]) == "live"
+
+    added = calendar.add_event("Long run", datetime.now() + timedelta(days=3))
+    calendar.cancel(kept["id"])
+    mirror.sync(service)
+    assert mirror.stats["incremental_syncs"] == 1
+    assert (mirror.status(kept["id"]), mirror.status(added["id"])) == ("cancelled", "live")
+
+    # The sync token expires while changes keep happening: the next sync starts over
+    calendar.expire_sync_tokens()
+    later = calendar.add_event("Intervals", datetime.now() + timedelta(days=4))
+    mirror.sync(service)
+    assert mirror.stats["resyncs_after_410"] == 1
+    assert mirror.stats["full_syncs"] == 2
+    assert mirror.status(later["id"]) == "live"
+    assert mirror.status(added["id"]) == "live"
+    assert kept["id"] not in mirror.events
+
+    # And the new token is used from then on
+    mirror.sync(service)
+    assert mirror.stats["incremental_syncs"] == 2
+    assert mirror.stats["resyncs_after_410"] == 1
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from calendar_assistant.utils import helpers
+
+
+def _event(date, summary):
+    return {
+        "summary": summary,
+        "start": {"dateTime": f"{date}T06:30:00"},
+        "end": {"dateTime": f"{date}T07:30:00"},
+    }
+
+
+def _week_starts(events):
+    return {day: event["start"]["dateTime"] for day, event in events.items()}
+
+
+def test_week_events_are_moved_to_their_dates(chat_model):
+    sunday = datetime(2031, 3, 2)
+    # Every day on the Sunday, as a model that ignores the dates would answer
+    chat_model._structured = lambda schema, prompt: {day: _event("2031-03-02", day) for day in helpers.WEEK_DAYS}
+
+    events = helpers.get_week_events(sunday, {}, "Monday: easy run", "20310401", "UTC")
+    assert _week_starts(events) == {
+        day: (sunday + timedelta(days=offset)).strftime("%Y-%m-%dT06:30:00")
+        for offset, day in enumerate(helpers.WEEK_DAYS)
+    }
+    assert all(event["end"]["dateTime"].endswith("07:30:00") for event in events.values())
+
+
+def test_week_repair_keeps_valid_days_on_their_dates(chat_model):
+    sunday = datetime(2031, 3, 9)
+    week = {day: _event((sunday + timedelta(days=offset)).strftime("%Y-%m-%d"), day)
+            for offset, day in enumerate(helpers.WEEK_DAYS)}
+    week["monday"]["end"] = week["monday"]["start"]  # invalid: fails the whole week
+    week["friday"] = _event("2031-03-20", "friday")  # the Thursday of the next week
+    chat_model._structured = lambda schema, prompt: week
+
+    events = helpers.get_week_events(sunday, {}, "Monday: easy run", "20310401", "UTC")
+    assert "monday" not in events
+    assert events["friday"]["start"]["dateTime"] == "2031-03-14T06:30:00"
+    assert events["saturday"]["start"]["dateTime"] == "2031-03-15T06:30:00"
+
+
+def test_week_that_is_not_an_object_leaves_every_day_missing(chat_model):
+    sunday = datetime(2031, 3, 16)
+    chat_model._structured = lambda schema, prompt: [_event("2031-03-16", day) for day in helpers.WEEK_DAYS]
+
+    assert helpers.get_week_events(sunday, {}, "Monday: easy run", "20310401", "UTC") == {}
@@ -0,0 +1,26 @@
+from calendar_assistant.utils import history
+
+
+def _history(turns):
+    entries = []
+    for n in range(turns):
+        timestamp = f"2025-08-{n // 10 + 1:02d}T09:{n % 60:02d}:00"
+        entries.append({"action": "user_query", "query": f"Move my tempo run number {n} to Friday", "timestamp": timestamp})
+        entries.append({"action": "response", "agent": "manager", "response": f"Moved run {n}.", "timestamp": timestamp})
+    return entries
+
+
+def test_older_interactions_are_summarized_in_a_bounded_block():
+    rendered = [history.compact_history(_history(turns), 100_000) for turns in (20, 40)]
+
+    # A longer history adds no lines: the oldest share one
+    assert len(rendered[0].splitlines()) == len(rendered[1].splitlines())
+    merged = [line for line in rendered[1].splitlines() if "earlier interactions (" in line]
+    older = 2 * 40 - history.HISTORY_RECENT_ENTRIES - history.HISTORY_SUMMARY_LINES
+    assert merged == [f"- {older} earlier interactions (2025-08-01 to 2025-08-04), about: move, tempo, number, friday"]
+    assert rendered[1].splitlines()[-1] == "[2025-08-04T09:39] manager: Moved run 39."
+
+
+def test_summary_fits_the_budget():
+    for budget in (40, 120, 400):
+        assert history.count_tokens(history.compact_history(_history(40), budget)) <= budget
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from reconciler import ReconciliationQueue
+
+
+def _recording_queue(**kwargs):
+    runs = []
+    ran = threading.Event()
+
+    def job(user_id, session_id):
+        runs.append((user_id, session_id, time.monotonic()))
+        ran.set()
+
+    return ReconciliationQueue(job, **kwargs), runs, ran
+
+
+def test_turns_of_a_user_are_coalesced():
+    queue, runs, ran = _recording_queue(debounce=0.2, max_delay=5, workers=1)
+    for session_id in ("s1", "s2", "s3"):
+        queue.schedule("alice", session_id)
+    assert ran.wait(2)
+    time.sleep(0.3)
+
+    # One run, for the latest session
+    assert [(user_id, session_id) for user_id, session_id, _ in runs] == [("alice", "s3")]
+    stats = queue.stats()
+    assert stats["scheduled"] == 3 and stats["coalesced"] == 2 and stats["runs"] == 1
+
+
+def test_debounce_is_bounded_by_max_delay():
+    queue, runs, ran = _recording_queue(debounce=0.3, max_delay=0.5, workers=1)
+    started = time.monotonic()
+    queue.schedule("alice", "s")
+    # Keep rescheduling faster than the debounce: max_delay still lets it run
+    while not ran.is_set() and time.monotonic() - started < 2:
+        queue.schedule("alice", "s")
+        time.sleep(0.05)
+    assert ran.is_set()
+    assert runs[0][2] - started < 1.0
+
+
+def test_a_user_is_not_reconciled_during_their_turn():
+    queue, runs, ran = _recording_queue(debounce=0, max_delay=0, workers=2)
+    with queue.active_turn("alice"):
+        queue.schedule("alice", "s")
+        queue.schedule("bob", "s")
+        time.sleep(0.3)
+        # Other users are not held back
+        assert [user_id for user_id, _, _ in runs] == ["bob"]
+        turn_ended = time.monotonic()
+    deadline = time.monotonic() + 2
+    while len(runs) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [user_id for user_id, _, _ in runs] == ["bob", "alice"]
+    assert runs[1][2] >= turn_ended
+
+
+def test_a_failing_job_is_counted_and_the_worker_survives():
+    calls = []
+
+    def job(user_id, session_id):
+        calls.append(user_id)
+        if user_id == "alice":
+            raise RuntimeError("Calendar unavailable")
+
+    queue = ReconciliationQueue(job, debounce=0, max_delay=0, workers=1)
+    queue.schedule("alice", "s")
+    queue.schedule("bob", "s")
+    deadline = time.monotonic() + 2
+    while queue.stats()["runs"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(calls) == ["alice", "bob"]
+    assert queue.stats()["failures"] == 1
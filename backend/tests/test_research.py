@@ -0,0 +1,37 @@
+import time
+
+from calendar_assistant.utils import research
+
+
+def test_fingerprint_keeps_distances_and_ignores_dates():
+    fingerprint = lambda summary: research.research_fingerprint(summary, {}, "")
+    assert fingerprint("5 km race on Aug 10, 2025") != fingerprint("10 km race on Aug 10, 2025")
+    assert fingerprint("21 km half marathon") != fingerprint("half marathon")
+    assert fingerprint("Ironman 70.3") != fingerprint("Ironman")
+    assert fingerprint("5 km race on Aug 10, 2025") == fingerprint("5km race on 2025-09-14")
+    assert fingerprint("Ironman 70.3 on Sunday the 14th at 7am") == fingerprint("ironman 70.3 September 3rd")
+
+
+def test_fingerprint_separates_profiles_and_requirements():
+    profile = {"level": "Beginner", "days": "Mon, Wed"}
+    base = research.research_fingerprint("10 km race", profile, "")
+    assert research.research_fingerprint("10 km race", {"level": "Advanced", "days": "Mon, Wed"}, "") != base
+    assert research.research_fingerprint("10 km race", profile, "no running on Sundays") != base
+    assert research.research_fingerprint("Triathlon", profile, "") != base
+
+    # Case, spacing, punctuation and "no requirements" answers do not matter
+    assert research.research_fingerprint("10 km Race!", {"days": "mon wed", "level": "beginner"}, "None") == base
+    assert research.research_fingerprint("10 km race", profile, "n/a") == base
+
+
+def test_cache_hit_uses_the_callers_summary():
+    first, second = "10 km race on August 10", "10 km race on September 14"
+    fingerprint = research.research_fingerprint(first, {}, "")
+    research._research_cache.set(fingerprint, research.WeekResearch(
+        event_summary=first, plan="Monday: easy run", fingerprint=fingerprint, created_at=time.time(),
+    ).model_dump(exclude={"cached"}))
+
+    result = research.research_week_plan(second, {}, "")
+    assert result.cached
+    assert result.event_summary == second
+    assert second in result.to_prompt()
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from google.adk.events import Event, EventActions
+from session_store import FirestoreSessionStore, PersistentSessionService, SqliteSessionStore
+
+
+def _stored_state(path):
+    with sqlite3.connect(path) as conn:
+        return {name: json.loads(value) for name, value in conn.execute("SELECT name, value FROM session_state")}
+
+
+def test_access_token_is_not_persisted(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    tokens = {"alice": "token-2"}
+
+    async def run():
+        service = PersistentSessionService(SqliteSessionStore(path), flush_interval=0)
+        session = await service.create_session(app_name="app", user_id="alice", state={
+            "user_id": "alice", "access_token": "token-1",
+        })
+        await service.patch_state(app_name="app", user_id="alice", session_id=session.id, changes={"today_date": "x"})
+
+        # Another process (or a restart) reads the token from the user document
+        reloaded = PersistentSessionService(
+            SqliteSessionStore(path), flush_interval=0, load_secrets=lambda user_id: {"access_token": tokens[user_id]},
+        )
+        return await reloaded.get_session(app_name="app", user_id="alice", session_id=session.id)
+
+    session = asyncio.run(run())
+    assert session.state == {"user_id": "alice", "today_date": "x", "access_token": "token-2"}
+    assert _stored_state(path) == {"user_id": "alice", "today_date": "x"}
+
+
+def test_flush_writes_only_the_changed_keys(tmp_path):
+    store = SqliteSessionStore(str(tmp_path / "sessions.db"))
+    written = []
+    write = store.write
+    store.write = lambda writes: (written.extend(writes), write(writes))
+
+    async def run():
+        service = PersistentSessionService(store, flush_interval=0)
+        session = await service.create_session(app_name="app", user_id="u", state={
+            "user_events": [{"parent_event_id": "p"}] * 100, "interaction_history": [],
+        })
+        written.clear()
+        await service.append_to_state_list(
+            app_name="app", user_id="u", session_id=session.id, list_key="interaction_history", item={"query": "hi"},
+        )
+
+    asyncio.run(run())
+    assert [w["state"] for w in written] == [{"interaction_history": json.dumps([{"query": "hi"}])}]
+    assert not written[0]["replace_state"]
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "firestore"])
+def test_events_are_trimmed_in_the_cache_and_the_store(tmp_path, firestore, backend):
+    store = SqliteSessionStore(str(tmp_path / "sessions.db")) if backend == "sqlite" else FirestoreSessionStore()
+
+    async def run():
+        service = PersistentSessionService(store, flush_interval=0, max_events=3)
+        session = await service.create_session(app_name="app", user_id="u", state={})
+        for n in range(5):
+            await service.append_event(session, Event(
+                author="user", invocation_id=f"i{n}", actions=EventActions(state_delta={"n": n}),
+            ))
+        cached = await service.get_session(app_name="app", user_id="u", session_id=session.id)
+        reloaded = await PersistentSessionService(store, flush_interval=0, max_events=3).get_session(
+            app_name="app", user_id="u", session_id=session.id,
+        )
+        return cached, reloaded
+
+    cached, reloaded = asyncio.run(run())
+    assert [e.invocation_id for e in cached.events] == ["i2", "i3", "i4"]
+    assert [e.invocation_id for e in reloaded.events] == ["i2", "i3", "i4"]
+    assert reloaded.state == {"n": 4}
+
+
+def test_get_session_copies_the_state_but_not_the_events(tmp_path):
+    async def run():
+        service = PersistentSessionService(SqliteSessionStore(str(tmp_path / "sessions.db")), flush_interval=0)
+        session = await service.create_session(app_name="app", user_id="u", state={"user_events": []})
+        await service.append_event(session, Event(author="user", invocation_id="i0"))
+        first = await service.get_session(app_name="app", user_id="u", session_id=session.id)
+        first.state["user_events"].append({"parent_event_id": "p"})
+        first.events.clear()
+        return first, await service.get_session(app_name="app", user_id="u", session_id=session.id)
+
+    first, second = asyncio.run(run())
+    assert second.state == {"user_events": []}
+    assert [e.invocation_id for e in second.events] == ["i0"]
+
+
+def test_whole_state_rows_are_migrated_on_load(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    SqliteSessionStore(path)
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO sessions VALUES ('app:u:s', 'app', 'u', 's', ?, 1.0)", (json.dumps({
+            "user_id": "u", "access_token": "secret",
+        }),))
+
+    async def run():
+        service = PersistentSessionService(SqliteSessionStore(path), flush_interval=0)
+        return await service.get_session(app_name="app", user_id="u", session_id="s")
+
+    assert asyncio.run(run()).state == {"user_id": "u"}
+    assert _stored_state(path) == {"user_id": "u"}
+    with sqlite3.connect(path) as conn:
+        assert "secret" not in conn.execute("SELECT state FROM sessions").fetchone()[0]
+
+
+def test_failed_flush_does_not_revive_a_session_deleted_meanwhile(tmp_path):
+    store = SqliteSessionStore(str(tmp_path / "sessions.db"))
+    service = PersistentSessionService(store, flush_interval=3600)
+    write = store.write
+
+    async def run():
+        session = await service.create_session(app_name="app", user_id="u", state={"n": 0})
+
+        def failing_write(writes):
+            # A login deletes the old session while its write is in flight
+            asyncio.run(service.delete_session(app_name="app", user_id="u", session_id=session.id))
+            raise OSError("disk full")
+
+        store.write = failing_write
+        await asyncio.to_thread(service.flush_now)
+        store.write = write
+        service.flush_now()
+        return session, await service.list_sessions(app_name="app", user_id="u")
+
+    session, listed = asyncio.run(run())
+    assert listed.sessions == []
+    assert service.stats()["flush_errors"] == 1
+    assert service.stats()["pending_sessions"] == 0
+    assert store.load("app", "u", session.id) is None
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from calendar_assistant.utils import helpers, research, tracing
+from utils import stream_agent_async
+
+
+def _seed_research(summary, profile, requirements):
+    """A cached research result, so the plan is built without the search agent."""
+    plan = "\n".join(f"{day}: easy run" for day in ("Sunday", "Monday", "Tuesday"))
+    research._research_cache.set(research.research_fingerprint(summary, profile, requirements), research.WeekResearch(
+        event_summary=summary, plan=plan, days=research._parse_days(plan), fingerprint="seeded", created_at=time.time(),
+    ).model_dump(exclude={"cached"}))
+
+
+def test_progress_streams_before_create_recurrent_events_returns(calendar, chat_model, agents, user_id):
+    model, new_session = agents
+    race = calendar.add_event("Half marathon", datetime.now() + timedelta(days=40))
+    start = (datetime.now() + timedelta(days=7)).strftime("%m-%d-%Y")
+    model.script = lambda message: ("create_recurrent_events", {
+        "parent_event_id": race["id"], "user_requirements": "", "start_date": start,
+    })
+    _seed_research(helpers.get_summary("", race["summary"]), {}, "")
+    # Slow enough that the tool is still running well after its first report
+    chat_model._latency = 0.1
+    calendar.latency = 0.05
+
+    async def turn():
+        runner, session_id = await new_session(user_id, user_events=[
+            {"parent_event_id": race["id"], "alias": "Half marathon", "instances": []},
+        ])
+        started = time.perf_counter()
+        received = []
+        async for update in stream_agent_async(runner, user_id, session_id, "Plan my training"):
+            received.append((time.perf_counter() - started, update))
+        return received
+
+    received = asyncio.run(turn())
+    final = received[-1][1]
+    waterfall = tracing.get_waterfall(final["trace_id"])
+    tool = next(row for row in waterfall["spans"] if row["name"] == "tool.create_recurrent_events")
+    tool_returned_ms = tool["start_ms"] + tool["duration_ms"]
+
+    # Progress reports are the status updates without a "tool" (those announce the call)
+    reports = [(at, update["message"]) for at, update in received if update["type"] == "status" and "tool" not in update]
+    assert any(message.startswith("Created") for _, message in reports)
+    # The turn's clock started before its trace did, so the arrival offsets are upper bounds
+    assert reports[0][0] * 1000 < tool_returned_ms
@@ -0,0 +1,72 @@
+import user_repository
+
+
+def _events(firestore, user_id):
+    docs = firestore.collection("users").document(user_id).collection("user_events").stream()
+    return {doc.id: doc.to_dict() for doc in docs}
+
+
+def test_events_are_stored_one_document_per_parent(firestore, user_id):
+    events = [
+        {"alias": "Half marathon", "parent_event_id": "race", "instances": ["race_1", "race_2"]},
+        {"alias": "Dentist", "parent_event_id": "dentist", "instances": []},
+    ]
+    user_repository.store_user_events(user_id, events)
+
+    assert set(_events(firestore, user_id)) == {"race", "dentist"}
+    assert user_repository.load_user_events(user_id) == events
+
+
+def test_saving_unchanged_events_writes_nothing(firestore, user_id):
+    events = [
+        {"alias": "Half marathon", "parent_event_id": "race", "instances": ["race_1", "race_2"]},
+        {"alias": "Dentist", "parent_event_id": "dentist", "instances": []},
+    ]
+    assert user_repository.store_user_events(user_id, events)
+    firestore.reset_stats()
+
+    assert not user_repository.store_user_events(user_id, [dict(e) for e in events])
+    assert firestore.stats["writes"] == firestore.stats["deletes"] == 0
+
+
+def test_only_changed_parents_are_written(firestore, user_id):
+    events = [{"alias": f"Plan {n}", "parent_event_id": f"plan{n}", "instances": [f"plan{n}_1"]} for n in range(5)]
+    user_repository.store_user_events(user_id, events)
+    firestore.reset_stats()
+
+    events[2] = dict(events[2], instances=["plan2_1", "plan2_2"])
+    del events[4]
+    events.append({"alias": "Swim", "parent_event_id": "swim", "instances": []})
+    assert user_repository.store_user_events(user_id, events)
+
+    # plan2 updated and swim added; plan4 deleted
+    assert firestore.stats["writes"] == 2
+    assert firestore.stats["deletes"] == 1
+    stored = _events(firestore, user_id)
+    assert set(stored) == {"plan0", "plan1", "plan2", "plan3", "swim"}
+    assert stored["plan2"]["instances"] == ["plan2_1", "plan2_2"]
+    # Parents keep their position; new ones go last
+    assert [e["parent_event_id"] for e in user_repository.load_user_events(user_id)] == [
+        "plan0", "plan1", "plan2", "plan3", "swim",
+    ]
+
+
+def test_save_after_a_restart_diffs_against_the_store(firestore, user_id):
+    events = [{"alias": "Half marathon", "parent_event_id": "race", "instances": ["race_1"]}]
+    user_repository.store_user_events(user_id, events)
+    user_repository._stored_events.pop(user_id)  # as a new process would start
+    firestore.reset_stats()
+
+    assert not user_repository.store_user_events(user_id, events)
+    assert firestore.stats["writes"] == 0
+
+
+def test_legacy_events_array_is_migrated(firestore, user_id):
+    firestore.collection("users").document(user_id).set({"events": [
+        {"alias": "Half marathon", "parent_event_id": "race", "instances": ["race_1"]},
+    ]})
+
+    events = user_repository.load_user_events(user_id)
+    assert events == [{"alias": "Half marathon", "parent_event_id": "race", "instances": ["race_1"]}]
+    assert set(_events(firestore, user_id)) == {"race"}
+    assert "events" not in firestore.collection("users").document(user_id).get().to_dict()
@@ -0,0 +1,276 @@
+"""
+Read-through cache for the Firestore user documents (users/{user_id}).
+
+The profile and the access token live on the user document, so every helper in
+utils.py reads it through here: one Firestore read per user per
+USER_CACHE_TTL_SECONDS, and writes invalidate the cached copy. Reads are also
+counted per HTTP request (see begin_request/end_request).
+
+The tracked events live in a users/{user_id}/user_events subcollection, one
+document per parent event (its alias and instance IDs), so a save writes and
+deletes single parents instead of rewriting one ever-growing array. A digest
+of what was last loaded or saved per user makes a save of unchanged events a
+no-op, and otherwise limits it to the parents that changed. Users still
+holding the legacy "events" array are migrated on their first load.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from firebase_config import get_db
+
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", 60))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 1024))
+USER_EVENTS_COLLECTION = "user_events"
+# Firestore accepts at most 500 writes per batch
+BATCH_LIMIT = 500
+
+_cache = OrderedDict()  # user_id -> (data or None, loaded_at)
+_lock = threading.Lock()
+_stats = {
+    "reads": 0, "writes": 0, "cache_hits": 0, "requests": 0, "request_reads": 0,
+    "event_reads": 0, "event_writes": 0, "event_deletes": 0, "events_migrated": 0,
+    "event_saves": 0, "event_saves_skipped": 0, "event_writes_skipped": 0,
+}
+# user_id -> {"digest": of the whole list, "parents": {parent ID: (digest, position)}} as stored
+_stored_events = OrderedDict()
+# Mutable counter shared with threads spawned from the request's context
+_request_reads = contextvars.ContextVar("firestore_request_reads", default=None)
+
+
+def _count(key: str, amount: int = 1):
+    with _lock:
+        _stats[key] += amount
+
+
+def get_user_document(user_id: str, refresh: bool = False):
+    """
+    Get the user's Firestore document, from the cache when it is fresh.
+
+    Args:
+        user_id: The user ID
+        refresh: Skip the cache and read Firestore (e.g. right after login)
+
+    Returns:
+        dict: The document data, or None if the document does not exist
+    """
+    now = time.monotonic()
+    if not refresh:
+        with _lock:
+            cached = _cache.get(user_id)
+            if cached is not None and now - cached[1] < USER_CACHE_TTL_SECONDS:
+                _cache.move_to_end(user_id)
+                _stats["cache_hits"] += 1
+                return cached[0]
+
+    doc = get_db().collection("users").document(user_id).get()
+    data = doc.to_dict() if doc.exists else None
+    _count("reads")
+    request_reads = _request_reads.get()
+    if request_reads is not None:
+        request_reads[0] += 1
+
+    with _lock:
+        _cache[user_id] = (data, now)
+        _cache.move_to_end(user_id)
+        while len(_cache) > USER_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return data
+
+
+def update_user_document(user_id: str, fields: dict):
+    """
+    Merge fields into the user's document and drop the cached copy.
+
+    Args:
+        user_id: The user ID
+        fields: Top-level fields to set
+    """
+    get_db().collection("users").document(user_id).set(fields, merge=True)
+    _count("writes")
+    invalidate_user(user_id)
+
+
+def invalidate_user(user_id: str):
+    """Forget the cached document of a user."""
+    with _lock:
+        _cache.pop(user_id, None)
+
+
+def _events_ref(user_id: str):
+    return get_db().collection("users").document(user_id).collection(USER_EVENTS_COLLECTION)
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _event_digest(event: dict) -> str:
+    return _digest([event.get("alias"), list(event.get("instances") or [])])
+
+
+def _list_digest(events: list) -> str:
+    return _digest([[e["parent_event_id"], e.get("alias"), list(e.get("instances") or [])] for e in events])
+
+
+def _remember_events(user_id: str, events: list, positions: dict):
+    snapshot = {
+        "digest": _list_digest(events),
+        "parents": {e["parent_event_id"]: (_event_digest(e), positions[e["parent_event_id"]]) for e in events},
+    }
+    with _lock:
+        _stored_events[user_id] = snapshot
+        _stored_events.move_to_end(user_id)
+        while len(_stored_events) > USER_CACHE_SIZE:
+            _stored_events.popitem(last=False)
+
+
+def _write_events(user_id: str, upserts: list, deletes):
+    """Set the given parents and delete the given parent IDs, in batches."""
+    ref = _events_ref(user_id)
+    batch, pending = get_db().batch(), 0
+
+    def add(op, *args):
+        nonlocal batch, pending
+        getattr(batch, op)(*args)
+        pending += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch, pending = get_db().batch(), 0
+
+    for event in upserts:
+        add("set", ref.document(event["parent_event_id"]), event)
+    for parent_id in deletes:
+        add("delete", ref.document(parent_id))
+    if pending:
+        batch.commit()
+    _count("event_writes", len(upserts))
+    _count("event_deletes", len(deletes))
+
+
+def _stored_document(event: dict, position: float) -> dict:
+    return {
+        "parent_event_id": event["parent_event_id"],
+        "alias": event.get("alias"),
+        "instances": list(event.get("instances") or []),
+        "position": position,
+    }
+
+
+def _migrate_legacy_events(user_id: str) -> list:
+    """Move the legacy "events" array of the user document to the subcollection."""
+    data = get_user_document(user_id) or {}
+    legacy = [e for e in data.get("events") or [] if e.get("parent_event_id")]
+    if legacy:
+        _write_events(user_id, [_stored_document(e, float(i)) for i, e in enumerate(legacy)], [])
+        _count("events_migrated", len(legacy))
+    if "events" in data:
+        from firebase_admin import firestore
+
+        update_user_document(user_id, {"events": firestore.DELETE_FIELD})
+    return legacy
+
+
+def load_user_events(user_id: str) -> list:
+    """
+    Load the user's tracked events, oldest parent first.
+
+    Returns:
+        list: Dicts with alias, parent_event_id and instances.
+    """
+    docs = [doc.to_dict() for doc in _events_ref(user_id).order_by("position").stream()]
+    _count("event_reads", max(len(docs), 1))
+    if not docs:
+        docs = [_stored_document(e, float(i)) for i, e in enumerate(_migrate_legacy_events(user_id))]
+    events = [
+        {"alias": d.get("alias"), "parent_event_id": d["parent_event_id"], "instances": d.get("instances", [])}
+        for d in docs
+    ]
+    _remember_events(user_id, events, {d["parent_event_id"]: d["position"] for d in docs})
+    return events
+
+
+def store_user_events(user_id: str, events: list):
+    """
+    Persist the user's tracked events, writing only the parents that changed.
+
+    Nothing is written when the events match what was last loaded or saved;
+    otherwise new and modified parents are set and dropped ones deleted.
+    Parents keep the position they were first stored with.
+
+    Args:
+        user_id: The user ID
+        events: The full list of tracked events, oldest parent first
+
+    Returns:
+        bool: True if anything was written
+    """
+    with _lock:
+        stored = _stored_events.get(user_id)
+    if stored is None:
+        # Not loaded by this process (e.g. after a restart): read what is stored
+        load_user_events(user_id)
+        with _lock:
+            stored = _stored_events.get(user_id)
+    _count("event_saves")
+    events = [e for e in events if e.get("parent_event_id")]
+    if _list_digest(events) == stored["digest"]:
+        _count("event_saves_skipped")
+        _count("event_writes_skipped", len(events))
+        return False
+
+    parents = stored["parents"]
+    next_position = max((position for _, position in parents.values()), default=-1.0) + 1
+    upserts, positions = [], {}
+    for event in events:
+        parent_id = event["parent_event_id"]
+        previous = parents.get(parent_id)
+        if previous is None:
+            positions[parent_id], next_position = next_position, next_position + 1
+        else:
+            positions[parent_id] = previous[1]
+            if previous[0] == _event_digest(event):
+                continue
+        upserts.append(_stored_document(event, positions[parent_id]))
+    deletes = [parent_id for parent_id in parents if parent_id not in positions]
+    _write_events(user_id, upserts, deletes)
+    _count("event_writes_skipped", len(events) - len(upserts))
+    _remember_events(user_id, events, positions)
+    return True
+
+
+def begin_request():
+    """Start counting the Firestore reads made while handling a request."""
+    return _request_reads.set([0])
+
+
+def end_request(token):
+    """Stop counting reads for the request started with begin_request."""
+    reads = _request_reads.get()
+    _request_reads.reset(token)
+    with _lock:
+        _stats["requests"] += 1
+        _stats["request_reads"] += reads[0] if reads else 0
+
+
+def get_stats() -> dict:
+    """
+    Get Firestore read/write counters.
+
+    Returns:
+        dict: reads, writes, cache_hits, requests, request_reads, cached_users,
+        reads_per_request, and the user_events subcollection counters
+        (event_reads, event_writes, event_deletes, events_migrated, event_saves,
+        event_saves_skipped for saves with no change, event_writes_skipped
+        for unchanged parents not rewritten).
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats["cached_users"] = len(_cache)
+    stats["reads_per_request"] = stats["request_reads"] / stats["requests"] if stats["requests"] else 0.0
+    return stats
@@ -1,74 +1,89 @@
 from datetime import datetime
+from google.adk.agents.run_config import RunConfig, StreamingMode, ToolThreadPoolConfig
+from google.adk.events import Event, EventActions
 from google.genai import types
+from calendar_assistant.utils import progress, tracing
+from calendar_assistant.utils.logs import debug_enabled, get_logger, log_context, user_ref
+from calendar_assistant.utils.event_index import INDEX_KEY, build_event_index
+import asyncio
+import copy
 import os
 import shutil
-from firebase_config import db
-
-# ANSI color codes for terminal output
-class Colors:
-    RESET = "\033[0m"
-    BOLD = "\033[1m"
-    UNDERLINE = "\033[4m"
-
-    # Foreground colors
-    BLACK = "\033[30m"
-    RED = "\033[31m"
-    GREEN = "\033[32m"
-    YELLOW = "\033[33m"
-    BLUE = "\033[34m"
-    MAGENTA = "\033[35m"
-    CYAN = "\033[36m"
-    WHITE = "\033[37m"
-
-    # Background colors
-    BG_BLACK = "\033[40m"
-    BG_RED = "\033[41m"
-    BG_GREEN = "\033[42m"
-    BG_YELLOW = "\033[43m"
-    BG_BLUE = "\033[44m"
-    BG_MAGENTA = "\033[45m"
-    BG_CYAN = "\033[46m"
-    BG_WHITE = "\033[47m"
-
-
-async def update_user_events(session_service, app_name, user_id, session_id, new_user_events: list):
-    """Update the user_events in session state.
+from user_repository import get_user_document, load_user_events, store_user_events
+
+logger = get_logger(__name__)
+
+
+# Interactions kept in the session's interaction_history
+HISTORY_MAX_ENTRIES = int(os.environ.get("HISTORY_MAX_ENTRIES", 50))
+# Threads running the agents' (synchronous) tools. Every turn shares one event
+# loop, so a tool blocking on Calendar, an LLM or the research agent must not
+# run on it: that would stall every other user's turn and /health.
+TOOL_THREADS = int(os.environ.get("TOOL_THREADS", 32))
+
+
+async def patch_session_state(session_service, app_name, user_id, session_id, changes: dict, expected: dict = None):
+    """Replace some keys of the session state, leaving the rest untouched.
 
     Args:
         session_service: The session service instance
         app_name: The application name
         user_id: The user ID
         session_id: The session ID
-        new_user_events: Cleaned or updated list of user events
+        changes: The keys to set
+        expected: If given, only apply the changes when the state still holds
+            these values (compare-and-set)
+
+    Returns:
+        bool: True if the changes were applied
     """
-    try:
-        # Get current session
-        session = await session_service.get_session(
-            app_name=app_name, user_id=user_id, session_id=session_id
+    if hasattr(session_service, "patch_state"):
+        return await session_service.patch_state(
+            app_name=app_name, user_id=user_id, session_id=session_id, changes=changes, expected=expected
         )
+    # Other session services: a state-only event, the way ADK itself updates state
+    session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+    if session is None:
+        raise ValueError(f"Session {session_id} not found.")
+    if expected and any(session.state.get(k) != v for k, v in expected.items()):
+        return False
+    await session_service.append_event(session, Event(author="system", actions=EventActions(state_delta=changes)))
+    return True
 
-        # Trim to max 50 events
-        new_user_events = new_user_events[-50:]
 
-        # Copy state and update user_events
-        updated_state = session.state.copy()
-        updated_state["user_events"] = new_user_events
+async def update_user_events(session_service, app_name, user_id, session_id, new_user_events: list, expected_user_events: list = None):
+    """Update the user_events in session state.
 
-        # Recreate the session with updated state
-        await session_service.create_session(
-            app_name=app_name,
-            user_id=user_id,
-            session_id=session_id,
-            state=updated_state,
-        )
+    Args:
+        session_service: The session service instance
+        app_name: The application name
+        user_id: The user ID
+        session_id: The session ID
+        new_user_events: Cleaned or updated list of user events
+        expected_user_events: If given, only update when the session still holds
+            exactly these events (a newer turn may have changed them meanwhile)
 
-    except Exception as e:
-        print(f"Error updating user_events: {e}")
+    Returns:
+        bool: True if the session was updated
+    """
+    try:
+        expected = None if expected_user_events is None else {"user_events": expected_user_events}
+        changes = {"user_events": new_user_events, INDEX_KEY: build_event_index(new_user_events)}
+        updated = await patch_session_state(session_service, app_name, user_id, session_id, changes, expected)
+        if not updated:
+            logger.info("user_events changed since reconciliation started; skipping update.")
+        return updated
+
+    except Exception:
+        logger.exception("Error updating user_events")
+        return False
 
 
 async def update_interaction_history(session_service, app_name, user_id, session_id, entry):
     """Add an entry to the interaction history in state.
 
+    Only the last HISTORY_MAX_ENTRIES interactions are kept.
+
     Args:
         session_service: The session service instance
         app_name: The application name
@@ -79,38 +94,28 @@ async def update_interaction_history(session_service, app_name, user_id, session
             - other keys are flexible depending on the action type
     """
     try:
-        # Get current session
-        session = await session_service.get_session(
-            app_name=app_name, user_id=user_id, session_id=session_id
-        )
-
-        # Get current interaction history
-        interaction_history = session.state.get("interaction_history", [])
-
         # Add timestamp if not already present
         if "timestamp" not in entry:
             entry["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        # Add the entry to interaction history
-        interaction_history.append(entry)
-
-        # Keep only the last 50 interactions
-        interaction_history = interaction_history[-50:]
-
-        # Create updated state
-        updated_state = session.state.copy()
-        updated_state["interaction_history"] = interaction_history
+        if hasattr(session_service, "append_to_state_list"):
+            await session_service.append_to_state_list(
+                app_name=app_name, user_id=user_id, session_id=session_id,
+                list_key="interaction_history", item=entry, max_length=HISTORY_MAX_ENTRIES,
+            )
+            return
 
-        # Create a new session with updated state
-        await session_service.create_session(
-            app_name=app_name,
-            user_id=user_id,
-            session_id=session_id,
-            state=updated_state,
+        session = await session_service.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
         )
-    except Exception as e:
-        print(f"Error updating interaction history: {e}")
-
+        interaction_history = session.state.get("interaction_history", [])
+        interaction_history.append(entry)
+        await patch_session_state(
+            session_service, app_name, user_id, session_id,
+            {"interaction_history": interaction_history[-HISTORY_MAX_ENTRIES:]},
+        )
+    except Exception:
+        logger.exception("Error updating interaction history")
 
 
 async def add_user_query_to_history(session_service, app_name, user_id, session_id, query):
@@ -125,7 +130,7 @@ async def add_user_query_to_history(session_service, app_name, user_id, session_
             "query": query,
         },
     )
-    print("User query added to interaction history.")
+    logger.debug("User query added to interaction history.")
 
 
 async def add_agent_response_to_history(
@@ -143,91 +148,52 @@ async def add_agent_response_to_history(
             "response": response,
         },
     )
-    print("Agent response added to interaction history.")
+    logger.debug("Agent response added to interaction history.")
 
 
-async def display_state(
-    session_service, app_name, user_id, session_id, label="Current State"
-):
-    """Display the current session state in a formatted way."""
+async def log_session_state(session_service, app_name, user_id, session_id, label="Current State"):
+    """Log the session state at DEBUG level, for sampled users only.
+
+    The session is only fetched when the record would be written, so this
+    costs nothing unless DEBUG logging is on for the user.
+    """
+    if not debug_enabled(logger, user_id):
+        return
     try:
         session = await session_service.get_session(
             app_name=app_name, user_id=user_id, session_id=session_id
         )
-
-        # Format the output with clear sections
-        print(f"\n{'-' * 10} {label} {'-' * 10}")
-
-        # Handle the user name
-        user_name = session.state.get("user_name", "Unknown")
-        print(f"👤 User: {user_name}")
-
-        # Skip purchased_courses (not relevant for this agent)
-
-        # Handle interaction history in a more readable way
-        interaction_history = session.state.get("interaction_history", [])
-        if interaction_history:
-            print("📝 Interaction History:")
-            for idx, interaction in enumerate(interaction_history, 1):
-                # Pretty format dict entries, or just show strings
-                if isinstance(interaction, dict):
-                    action = interaction.get("action", "interaction")
-                    timestamp = interaction.get("timestamp", "unknown time")
-
-                    if action == "user_query":
-                        query = interaction.get("query", "")
-                        print(f'  {idx}. User query at {timestamp}: "{query}"')
-                    elif action == "agent_response":
-                        agent = interaction.get("agent", "unknown")
-                        response = interaction.get("response", "")
-                        # Truncate very long responses for display
-                        if len(response) > 100:
-                            response = response[:97] + "..."
-                        print(f'  {idx}. {agent} response at {timestamp}: "{response}"')
-                    else:
-                        details = ", ".join(
-                            f"{k}: {v}"
-                            for k, v in interaction.items()
-                            if k not in ["action", "timestamp"]
-                        )
-                        print(
-                            f"  {idx}. {action} at {timestamp}"
-                            + (f" ({details})" if details else "")
-                        )
-                else:
-                    print(f"  {idx}. {interaction}")
-        else:
-            print("📝 Interaction History: None")
-
-        # Show any additional state keys that might exist
-        other_keys = [
-            k
-            for k in session.state.keys()
-            if k not in ["user_name", "interaction_history"]
+        history = session.state.get("interaction_history", [])
+        logger.debug(label, extra={"fields": {
+            "user_id": user_id,
+            "interaction_history": [
+                {k: (v[:97] + "..." if isinstance(v, str) and len(v) > 100 else v) for k, v in entry.items()}
+                if isinstance(entry, dict) else entry
+                for entry in history
+            ],
+            "state": {
+                k: v for k, v in session.state.items()
+                if k not in ("interaction_history", "user_events", "event_index")
+            },
+            "user_events": len(session.state.get("user_events", [])),
+        }})
+    except Exception:
+        logger.exception("Error logging the session state")
+
+
+def process_agent_response(event, user_id=None):
+    """Log an agent event and return its text if it is the final response."""
+    if debug_enabled(logger, user_id):
+        texts = [
+            part.text.strip() for part in (event.content.parts if event.content and event.content.parts else [])
+            if getattr(part, "text", None) and not part.text.isspace()
         ]
-        if other_keys:
-            print("🔑 Additional State:")
-            for key in other_keys:
-                print(f"  {key}: {session.state[key]}")
-
-        print("-" * (22 + len(label)))
-    except Exception as e:
-        print(f"Error displaying state: {e}")
-
-async def process_agent_response(event):
-    """Process and display agent response events."""
-    print(f"Event ID: {event.id}, Author: {event.author}")
-
-    # Check for specific parts first
-    has_specific_part = False
-    if event.content and event.content.parts:
-        for part in event.content.parts:
-            if hasattr(part, "text") and part.text and not part.text.isspace():
-                print(f"  Text: '{part.text.strip()}'")
-
-    # Check for final response after specific parts
+        logger.debug("Agent event", extra={"fields": {
+            "user_id": user_id, "event_id": event.id, "author": event.author, "text": texts,
+        }})
+
     final_response = None
-    if not has_specific_part and event.is_final_response():
+    if event.is_final_response():
         if (
             event.content
             and event.content.parts
@@ -235,33 +201,54 @@ async def process_agent_response(event):
             and event.content.parts[0].text
         ):
             final_response = event.content.parts[0].text.strip()
-            # Use colors and formatting to make the final response stand out
-            print(
-                f"\n{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╔══ AGENT RESPONSE ═════════════════════════════════════════{Colors.RESET}"
-            )
-            print(f"{Colors.CYAN}{Colors.BOLD}{final_response}{Colors.RESET}")
-            print(
-                f"{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╚═════════════════════════════════════════════════════════════{Colors.RESET}\n"
-            )
+            logger.info("Agent response", extra={"fields": {
+                "user_id": user_id, "author": event.author, "chars": len(final_response),
+            }})
         else:
-            print(
-                f"\n{Colors.BG_RED}{Colors.WHITE}{Colors.BOLD}==> Final Agent Response: [No text content in final event]{Colors.RESET}\n"
-            )
+            logger.warning("Final agent event has no text content", extra={"fields": {
+                "user_id": user_id, "author": event.author,
+            }})
 
     return final_response
 
 
-async def call_agent_async(runner, user_id, session_id, query):
-    """Call the agent asynchronously with the user's query."""
+# What the client is told while each tool runs
+TOOL_PROGRESS = {
+    "create_event": "Creating the event…",
+    "create_recurrent_events": "Creating your training plan…",
+    "list_events": "Checking your calendar…",
+    "check_type_of_event": "Looking up the event…",
+    "delete_event": "Deleting the event…",
+    "reschedule_event": "Rescheduling the event…",
+    "reschedule_recurrent_event": "Rescheduling the training sessions…",
+    "adjust_planning": "Adjusting your training plan…",
+    "transfer_to_agent": "Handing over to the planning manager…",
+}
+
+
+async def stream_agent_async(runner, user_id, session_id, query, stream_text=True):
+    """Run the agent on the user's query, yielding progress as it happens.
+
+    Args:
+        stream_text: Ask the model to stream its answer so "text" chunks are
+            yielded while it is written
+
+    Yields dicts with a "type":
+        - "text": a chunk of the answer being written ("text")
+        - "status": a tool call starting or reporting progress ("message", "tool")
+        - "final": the final answer ("response") and the turn's "trace_id"
+          (see /traces/<trace_id>), always the last item
+    """
     content = types.Content(role="user", parts=[types.Part(text=query)])
-    print(
-        f"\n{Colors.BG_GREEN}{Colors.BLACK}{Colors.BOLD}--- Running Query: {query} ---{Colors.RESET}"
-    )
+    # The turn's root span: the ADK's agent, LLM and tool spans nest inside it
+    turn = tracing.start_span("chat_turn", user=user_ref(user_id), session_id=session_id, query_chars=len(query))
+    logger.info("Running query", extra={"fields": {"user_id": user_id, "session_id": session_id, "chars": len(query)}})
+    logger.debug("Query text", extra={"fields": {"user_id": user_id, "query": query}})
     final_response_text = None
     agent_name = None
 
-    # Display state before processing the message
-    await display_state(
+    # Log the state before processing the message
+    await log_session_state(
         runner.session_service,
         runner.app_name,
         user_id,
@@ -269,41 +256,97 @@ async def call_agent_async(runner, user_id, session_id, query):
         "State BEFORE processing",
     )
 
+    # Runner events and tool progress (reported from tool threads) share one queue
+    loop = asyncio.get_running_loop()
+    updates = asyncio.Queue()
+    done = object()
+
+    def on_progress(message):
+        loop.call_soon_threadsafe(updates.put_nowait, {"type": "status", "message": message})
+
+    async def run():
+        try:
+            with tracing.use_span(turn), progress.listen(on_progress), log_context(user_id=user_id, session_id=session_id):
+                async for event in runner.run_async(
+                    user_id=user_id,
+                    session_id=session_id,
+                    new_message=content,
+                    run_config=RunConfig(
+                        streaming_mode=StreamingMode.SSE if stream_text else StreamingMode.NONE,
+                        tool_thread_pool_config=ToolThreadPoolConfig(max_workers=TOOL_THREADS),
+                    ),
+                ):
+                    await updates.put(event)
+        except Exception:
+            logger.exception("Error during agent run", extra={"fields": {"user_id": user_id}})
+        finally:
+            await updates.put(done)
+
+    task = asyncio.create_task(run())
     try:
-        async for event in runner.run_async(
-            user_id=user_id, session_id=session_id, new_message=content
-        ):
-            # Capture the agent name from the event if available
-            if event.author:
-                agent_name = event.author
-
-            response = await process_agent_response(event)
-            if response:
-                final_response_text = response
-    except Exception as e:
-        print(f"{Colors.BG_RED}{Colors.WHITE}ERROR during agent run: {e}{Colors.RESET}")
-
-    # Add the agent response to interaction history if we got a final response
-    if final_response_text and agent_name:
-        await add_agent_response_to_history(
+        try:
+            while (event := await updates.get()) is not done:
+                if isinstance(event, dict):
+                    yield event
+                    continue
+                if event.partial:
+                    # Chunks of text being written; the aggregated event follows
+                    if event.content and event.content.parts and not event.get_function_calls():
+                        text = "".join(part.text or "" for part in event.content.parts)
+                        if text:
+                            yield {"type": "text", "text": text}
+                    continue
+
+                # Capture the agent name from the event if available
+                if event.author:
+                    agent_name = event.author
+                for call in event.get_function_calls():
+                    yield {
+                        "type": "status",
+                        "tool": call.name,
+                        "message": TOOL_PROGRESS.get(call.name, f"Running {call.name}…"),
+                    }
+
+                response = process_agent_response(event, user_id)
+                if response:
+                    final_response_text = response
+        finally:
+            # The client went away: stop the turn instead of running it unobserved
+            if not task.done():
+                task.cancel()
+                turn.set_attribute("cancelled", True)
+
+        # Add the agent response to interaction history if we got a final response
+        if final_response_text and agent_name:
+            await add_agent_response_to_history(
+                runner.session_service,
+                runner.app_name,
+                user_id,
+                session_id,
+                agent_name,
+                final_response_text,
+            )
+
+        # Log the state after processing the message
+        await log_session_state(
             runner.session_service,
             runner.app_name,
             user_id,
             session_id,
-            agent_name,
-            final_response_text,
+            "State AFTER processing",
         )
+    finally:
+        turn.set_attribute("answered", final_response_text is not None)
+        turn.end()
+    yield {"type": "final", "response": final_response_text, "trace_id": tracing.get_trace_id(turn)}
 
-    # Display state after processing the message
-    await display_state(
-        runner.session_service,
-        runner.app_name,
-        user_id,
-        session_id,
-        "State AFTER processing",
-    )
 
-    print(f"{Colors.YELLOW}{'-' * 30}{Colors.RESET}")
+async def call_agent_async(runner, user_id, session_id, query):
+    """Call the agent asynchronously with the user's query."""
+    final_response_text = None
+    async for update in stream_agent_async(runner, user_id, session_id, query, stream_text=False):
+        if update["type"] == "final":
+            final_response_text = update["response"]
     return final_response_text
 
 def process_history(history):
@@ -334,39 +377,22 @@ def process_history(history):
 
 
 def get_profile_data(user_id: str) -> dict:
-    doc_ref = db.collection("users").document(user_id)
-    doc = doc_ref.get()
-    if doc.exists:
-        user_data = doc.to_dict()
-        return user_data["general_questions"]
+    user_data = get_user_document(user_id)
+    if user_data:
+        return copy.deepcopy(user_data["general_questions"])
     return {}
 
 def get_access_token(user_id: str) -> str:
-    doc_ref = db.collection("users").document(user_id)
-    doc = doc_ref.get()
-    if doc.exists:
-        user_data = doc.to_dict()
+    user_data = get_user_document(user_id)
+    if user_data:
         return user_data["accessToken"]
     return ""
 
 def get_user_events(user_id: str) -> list:
-    doc_ref = db.collection("users").document(user_id)
-    doc = doc_ref.get()
-    if doc.exists:
-        data = doc.to_dict()
-        if "events" not in data:
-            doc_ref.set({"events": []}, merge=True)
-            return []
-        return data["events"]
-    else:
-        doc_ref.set({"events": []}, merge=True)
-        return []
-
-def save_user_events(user_id: str, events: list, max_events: int = 50):
-    # Keep only the last `max_events` elements
-    trimmed_events = events[-max_events:]
-    doc_ref = db.collection("users").document(user_id)
-    doc_ref.set({"events": trimmed_events}, merge=True)
+    return load_user_events(user_id)
+
+def save_user_events(user_id: str, events: list) -> bool:
+    return store_user_events(user_id, events)
 
 
 def remove_all_pycache():